@@ -0,0 +1,266 @@
+"""
+Adaptive Quadtree Grid
+=======================
+Variable-size grid cells: coarse far from survey data, fine around villages.
+
+Input: Trained models + survey point locations (via GridInterpolator)
+Output: data/geojson/AI_Grid_Adaptive.geojson with square cell polygons
+        (properties: interpolated fields + quadtree level + cell size)
+
+The grid starts from coarse cells over the buffered survey boundary. Each
+level, every cell is split into four children when it holds at least
+``density_threshold`` surveys, or when any Prob_* field varies by more than
+``gradient_threshold`` across its centre and four corners. Cells that do
+not split become leaves, down to ``min_resolution``. Cells that miss the
+boundary are dropped.
+
+All cells of a level are handled at once: survey counts come from integer
+binning of the survey coordinates, and centre + corner values from one
+GridInterpolator.interpolate_values() call that shares a KD-tree,
+triangulation or kriging model across levels. Leaf values are the
+interpolated centre values, as for the regular grid (no smoothing).
+"""
+
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+from scipy.spatial import cKDTree, Delaunay
+
+from interpolate_grid import GridInterpolator, field_columns, kriging_std_columns, probability_mask, HAS_SHAPELY
+from kriging import OrdinaryKriging
+
+if HAS_SHAPELY:
+    import shapely
+
+
+class QuadtreeGrid:
+    """Refine a coarse grid only where survey density or gradients call for it."""
+
+    def __init__(
+        self,
+        base_resolution: float = 0.04,  # ~4km
+        min_resolution: float = 0.0025,  # ~250m
+        density_threshold: int = 1,
+        gradient_threshold: float = 0.15,
+        method: str = 'linear',
+        max_distance: float = 0.05,
+        idw_options: Optional[Dict] = None
+    ):
+        self.base_resolution = base_resolution
+        # Finest level: base / 2^max_level, the first one not coarser than min_resolution
+        self.max_level = max(int(np.ceil(np.log2(base_resolution / min_resolution) - 1e-9)), 0)
+        self.density_threshold = density_threshold
+        self.gradient_threshold = gradient_threshold
+        self.method = method
+        self.max_distance = max_distance
+        self.idw_options = idw_options
+        self.interpolator = GridInterpolator()
+
+    def survey_counts(self, survey_xy: np.ndarray, origin: Tuple[float, float], size: float,
+                      ix: np.ndarray, iy: np.ndarray) -> np.ndarray:
+        """Surveys inside each (ix, iy) cell of side ``size`` on the lattice at ``origin``."""
+
+        px = np.floor((survey_xy[:, 0] - origin[0]) / size).astype(np.int64)
+        py = np.floor((survey_xy[:, 1] - origin[1]) / size).astype(np.int64)
+        on_lattice = (px >= 0) & (py >= 0)
+        px, py = px[on_lattice], py[on_lattice]
+        if not len(px) or not len(ix):
+            # No surveys on the lattice (e.g. an extent away from the villages)
+            return np.zeros(len(ix), dtype=np.int64)
+        width = int(max(px.max(), ix.max())) + 1
+        keys, counts = np.unique(py * width + px, return_counts=True)
+
+        cell_keys = iy.astype(np.int64) * width + ix
+        pos = np.clip(np.searchsorted(keys, cell_keys), 0, len(keys) - 1)
+        return np.where(keys[pos] == cell_keys, counts[pos], 0)
+
+    def evaluate(self, x0: np.ndarray, y0: np.ndarray, size: float,
+                 shared: Dict) -> Tuple[np.ndarray, Optional[np.ndarray], np.ndarray]:
+        """Centre values, centre kriging std and max Prob_* spread over centre + corners."""
+
+        offsets = np.array([[0.5, 0.5], [0.0, 0.0], [1.0, 0.0], [0.0, 1.0], [1.0, 1.0]]) * size
+        samples = (np.column_stack([x0, y0])[None, :, :] + offsets[:, None, :]).reshape(-1, 2)
+
+        values, kriging_std = self.interpolator.interpolate_values(
+            shared['coords'], shared['values'], samples, self.method, self.max_distance,
+            tree=shared['tree'], triangulation=shared['triangulation'],
+            kriging=shared['kriging'], idw_options=self.idw_options,
+            bounded=probability_mask(shared['fields'])
+        )
+        values = values.reshape(len(offsets), len(x0), -1)
+        prob = values[:, :, shared['prob_idx']]
+        spread = (prob.max(axis=0) - prob.min(axis=0)).max(axis=1)
+
+        centre_std = kriging_std.reshape(len(offsets), len(x0), -1)[0] if kriging_std is not None else None
+        return values[0], centre_std, spread
+
+    def build(
+        self,
+        buffer: float = 0.02,
+        extent: Optional[Tuple[Tuple[float, float], Tuple[float, float]]] = None
+    ) -> pd.DataFrame:
+        """Refine level by level; returns one row per leaf cell.
+
+        ``extent`` = (lon_range, lat_range) fixes the base-cell rectangle
+        (still masked to the boundary); by default it is derived from the
+        survey boundary plus ``buffer``.
+        """
+
+        interp = self.interpolator
+        interp.load_data_and_models()
+        survey_predictions = interp.predict_survey_points()
+        fields = field_columns(survey_predictions)
+        coords, values = interp.aggregate_locations(survey_predictions, fields)
+        survey_xy = survey_predictions[['longitude', 'latitude']].values
+
+        shared = {
+            'coords': coords,
+            'values': values,
+            'tree': cKDTree(coords),
+            'triangulation': Delaunay(coords) if self.method == 'linear' else None,
+            'kriging': None,
+            'fields': fields,
+            'prob_idx': [j for j, col in enumerate(fields) if col.startswith('Prob_')]
+        }
+        columns = list(fields)
+        std_idx = []
+        if self.method == 'kriging':
+            shared['kriging'] = OrdinaryKriging(coords, values)
+            shared['kriging'].fit()
+            print("Fitted variograms:")
+            print(shared['kriging'].summary(fields))
+            std_columns = kriging_std_columns(fields)
+            std_idx = [j for j, _ in std_columns]
+            columns += [name for _, name in std_columns]
+
+        boundary = interp.study_boundary(buffer=buffer)
+        if extent is not None:
+            (lon0, lon1), (lat0, lat1) = extent
+            lon0 = np.floor(lon0 / self.base_resolution) * self.base_resolution
+            lat0 = np.floor(lat0 / self.base_resolution) * self.base_resolution
+        else:
+            (lon0, lon1), (lat0, lat1) = interp.grid_extent(self.base_resolution, buffer=buffer, boundary=boundary)
+        nx = int(np.ceil((lon1 - lon0) / self.base_resolution))
+        ny = int(np.ceil((lat1 - lat0) / self.base_resolution))
+        iy, ix = [a.ravel() for a in np.mgrid[0:ny, 0:nx]]
+
+        print(f"\nBuilding quadtree: {nx}x{ny} base cells of {self.base_resolution}°, "
+              f"{self.max_level} refinement levels (finest "
+              f"{self.base_resolution / 2 ** self.max_level:.5f}°)")
+
+        leaves = []
+        for level in range(self.max_level + 1):
+            size = self.base_resolution / 2 ** level
+            x0, y0 = lon0 + ix * size, lat0 + iy * size
+
+            if boundary is not None:
+                touches = shapely.intersects(shapely.box(x0, y0, x0 + size, y0 + size), boundary)
+                ix, iy, x0, y0 = ix[touches], iy[touches], x0[touches], y0[touches]
+            if not len(ix):
+                break
+
+            centre, centre_std, spread = self.evaluate(x0, y0, size, shared)
+            counts = self.survey_counts(survey_xy, (lon0, lat0), size, ix, iy)
+            split = (counts >= self.density_threshold) | (spread > self.gradient_threshold)
+            if level == self.max_level:
+                split[:] = False
+
+            leaf = ~split
+            cells = pd.DataFrame({
+                'west': x0[leaf], 'south': y0[leaf],
+                'east': x0[leaf] + size, 'north': y0[leaf] + size,
+                'level': level, 'size': size, 'surveys': counts[leaf]
+            })
+            block = centre[leaf] if centre_std is None else np.hstack([centre[leaf], centre_std[leaf][:, std_idx]])
+            leaves.append(pd.concat([cells, pd.DataFrame(block, columns=columns)], axis=1))
+            print(f"  Level {level} ({size:.5f}°): {len(ix)} cells, {int(leaf.sum())} leaves, "
+                  f"{int(split.sum())} split")
+
+            # Children of split cells: (2ix + dx, 2iy + dy)
+            dx, dy = np.array([0, 1, 0, 1]), np.array([0, 0, 1, 1])
+            ix = (2 * ix[split][:, None] + dx).ravel()
+            iy = (2 * iy[split][:, None] + dy).ravel()
+
+        cells = pd.concat(leaves, ignore_index=True)
+
+        # Same area covered by finest-level cells, for comparison
+        regular = int((4 ** (self.max_level - cells['level'])).sum())
+        print(f"✓ {len(cells)} adaptive cells (a regular grid at the finest level "
+              f"needs {regular}: {regular / max(len(cells), 1):.1f}x more)")
+        return cells
+
+    def export_geojson(
+        self,
+        cells: pd.DataFrame,
+        output_file: str = "data/geojson/AI_Grid_Adaptive.geojson",
+        coord_precision: int = 5,
+        value_precision: int = 3
+    ):
+        """Write leaf cells as square polygons (one %-template per feature).
+
+        Non-finite field values (NaN, ±inf) are written as null.
+        """
+
+        columns = field_columns(cells)
+        w, s, e, n = (cells[c].values for c in ('west', 'south', 'east', 'north'))
+        values = cells[columns].values.astype(float)
+        rows = np.column_stack([w, s, e, s, e, n, w, n, w, s,
+                                cells['level'].values, cells['size'].values,
+                                cells['surveys'].values, values])
+
+        ring = ','.join([f'[%.{coord_precision}f,%.{coord_precision}f]'] * 5)
+        template = (
+            '{"type":"Feature","geometry":{"type":"Polygon","coordinates":[[' + ring + ']]},'
+            '"properties":{"level":%d,"size":%.5f,"surveys":%d,'
+            + ','.join(f'"{col}":%%s' for col in columns)
+            + '}}'
+        )
+        finite = np.isfinite(values)
+        if finite.all():
+            numeric = template.replace('%%s', f'%.{value_precision}f')
+            features = [numeric % tuple(row) for row in rows.tolist()]
+        else:
+            # Format field values first so NaN/±inf become null (not invalid JSON)
+            text = np.where(finite, np.char.mod(f'%.{value_precision}f', values), 'null')
+            text_cells = template.replace('%%s', '%s')
+            features = [text_cells % (*head, *labels)
+                        for head, labels in zip(rows[:, :13].tolist(), text.tolist())]
+
+        output_path = Path(output_file)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(output_path, 'w', encoding='utf-8') as f:
+            f.write('{"type":"FeatureCollection","features":[\n')
+            f.write(',\n'.join(features))
+            f.write('\n]}\n')
+
+        print(f"\n✓ Exported {len(rows)} adaptive cells to {output_path}")
+        print(f"  File size: {output_path.stat().st_size / 1024:.1f} KB")
+
+    def run_pipeline(
+        self,
+        buffer: float = 0.02,
+        extent: Optional[Tuple[Tuple[float, float], Tuple[float, float]]] = None
+    ) -> pd.DataFrame:
+        """Build the quadtree and export it."""
+
+        print("\n=== Starting Adaptive Grid Interpolation ===\n")
+
+        cells = self.build(buffer=buffer, extent=extent)
+        self.export_geojson(cells)
+
+        print("\n=== Adaptive Grid Interpolation Complete ===")
+        return cells
+
+
+if __name__ == "__main__":
+    import sys
+
+    # e.g. python adaptive_grid.py 0.04 0.0025 --method=idw
+    args = [a for a in sys.argv[1:] if not a.startswith('--')]
+    method = next((a.split('=', 1)[1] for a in sys.argv if a.startswith('--method=')), 'linear')
+    base_resolution = float(args[0]) if args else 0.04
+    min_resolution = float(args[1]) if len(args) > 1 else 0.0025
+
+    quadtree = QuadtreeGrid(base_resolution=base_resolution, min_resolution=min_resolution, method=method)
+    quadtree.run_pipeline()
@@ -0,0 +1,215 @@
+"""
+Counterfactual Recommendations
+===============================
+Find, per flagged farmer, the cheapest feasible change that flips a prediction.
+
+Input: Prepared dataset + trained models
+Output: data/counterfactual_recommendations.json (per featureId, per target)
+
+A farmer is flagged for a target when the survey label shows the undesired
+outcome (e.g. target_water_risk = 1) and the model agrees. Candidate changes
+are combinations of small steps on actionable features. Every candidate for
+every flagged farmer is scored in one batched predict_proba per model, and
+the cheapest candidate that crosses the 0.5 threshold is kept.
+
+Pruning keeps the candidate set small:
+    - only improving steps within each feature's valid range
+    - features the model never splits on are skipped for that target
+    - at most ``max_changes`` features changed at once, total cost ≤ ``max_cost``
+"""
+
+import json
+import itertools
+import pandas as pd
+import numpy as np
+from pathlib import Path
+from typing import Dict, List
+import warnings
+warnings.filterwarnings('ignore')
+
+from model_store import load_feature_list, load_target_models, compile_model, TARGET_SHORT_NAMES
+from scenario_engine import DERIVED_FEATURES
+
+
+# Allowed improving steps, valid range and cost per unit step
+ACTIONABLE_FEATURES = {
+    'has_solar': {'deltas': [1], 'min': 0, 'max': 1, 'cost': 2.0},
+    'fertilizer_reliance_score': {'deltas': [-1, -2], 'min': 0, 'max': 2, 'cost': 1.0},
+    'pesticide_reliance_score': {'deltas': [-1, -2], 'min': 0, 'max': 2, 'cost': 1.0},
+    'regen_technique_count': {'deltas': [1, 2, 3], 'min': 0, 'max': None, 'cost': 1.0},
+    'water_sufficiency_score': {'deltas': [1, 2], 'min': 0, 'max': 4, 'cost': 1.5},
+}
+
+# Undesired class per model: flip risks down, regen adoption up
+UNDESIRED_CLASS = {
+    'Regen': 0,
+    'Water': 1,
+    'Econ': 1,
+    'Labor': 1,
+    'Climate': 1
+}
+
+
+class CounterfactualSearch:
+    """Batched search for minimal prediction-flipping changes."""
+
+    def __init__(
+        self,
+        data_path: str = "data/ml_prepared_data.csv",
+        models_dir: str = "data/models",
+        max_changes: int = 3,
+        max_cost: float = 6.0
+    ):
+        self.data_path = Path(data_path)
+        self.models_dir = Path(models_dir)
+        self.max_changes = max_changes
+        self.max_cost = max_cost
+        self.df = None
+        self.features = []
+        self.models = {}
+
+    def load_data_and_models(self):
+        """Load prepared data, feature list and models."""
+
+        if not self.data_path.exists():
+            raise FileNotFoundError(f"Data not found: {self.data_path}")
+
+        self.df = pd.read_csv(self.data_path)
+        print(f"✓ Loaded {len(self.df)} farmers")
+
+        self.features = load_feature_list(self.models_dir)
+        self.models = load_target_models(self.models_dir)
+
+    def candidate_steps(self, model) -> List[str]:
+        """Actionable features worth perturbing for this model."""
+
+        actionable = [f for f in ACTIONABLE_FEATURES if f in self.features]
+        importances = getattr(model, 'feature_importances_', None)
+        if importances is None:
+            return actionable
+
+        # A feature with zero importance never appears in a split: changing it cannot flip
+        importance = dict(zip(self.features, importances))
+        return [f for f in actionable if importance.get(f, 0) > 0]
+
+    def step_grid(self, actionable: List[str]) -> np.ndarray:
+        """All delta combinations (rows) within max_changes and max_cost."""
+
+        options = [[0] + ACTIONABLE_FEATURES[f]['deltas'] for f in actionable]
+        grid = np.array(list(itertools.product(*options)), dtype=float)
+        grid = grid[(grid != 0).any(axis=1)]
+
+        costs = np.abs(grid) @ np.array([ACTIONABLE_FEATURES[f]['cost'] for f in actionable])
+        keep = ((grid != 0).sum(axis=1) <= self.max_changes) & (costs <= self.max_cost)
+        return grid[keep]
+
+    def search_target(self, name: str, model) -> Dict[str, Dict]:
+        """Search counterfactuals for one target over all its flagged farmers."""
+
+        target = next(t for t, short in TARGET_SHORT_NAMES.items() if short == name)
+        undesired = UNDESIRED_CLASS[name]
+
+        X = self.df[self.features].astype(float)
+        predictor = compile_model(model)
+        base_proba = predictor.predict_proba(X.values)[:, 1]
+        predicted_class = (base_proba >= 0.5).astype(int)
+
+        flagged = predicted_class == undesired
+        if target in self.df.columns:
+            flagged &= (self.df[target].values == undesired)
+        flagged_idx = np.flatnonzero(flagged)
+
+        actionable = self.candidate_steps(model)
+        if not len(flagged_idx) or not actionable:
+            print(f"  {name}: {len(flagged_idx)} flagged, nothing actionable")
+            return {}
+
+        grid = self.step_grid(actionable)
+        cols = [self.features.index(f) for f in actionable]
+
+        # (farmers, combos, actionable) proposed values, pruned to valid ranges
+        base = X.values[flagged_idx][:, cols]
+        proposed = base[:, None, :] + grid[None, :, :]
+        lower = np.array([ACTIONABLE_FEATURES[f]['min'] for f in actionable], dtype=float)
+        upper = np.array([np.inf if ACTIONABLE_FEATURES[f]['max'] is None else ACTIONABLE_FEATURES[f]['max']
+                          for f in actionable], dtype=float)
+        valid = ((proposed >= lower) & (proposed <= upper)).all(axis=2)
+        farmer_pos, combo_idx = np.nonzero(valid)
+
+        candidates = X.values[flagged_idx[farmer_pos]].copy()
+        candidates[:, cols] = proposed[farmer_pos, combo_idx]
+        candidates = self._recompute_derived(pd.DataFrame(candidates, columns=self.features), actionable)
+
+        # One batched inference over every candidate of every flagged farmer
+        proba = predictor.predict_proba(candidates.values)[:, 1]
+        flips = (proba >= 0.5).astype(int) != undesired
+
+        unit_costs = np.array([ACTIONABLE_FEATURES[f]['cost'] for f in actionable])
+        costs = np.abs(grid[combo_idx]) @ unit_costs
+        margin = np.abs(proba - 0.5)
+        print(f"  {name}: {len(flagged_idx)} flagged, {len(actionable)} actionable features, "
+              f"{len(candidates)} candidates scored, {int(flips.sum())} flip")
+
+        # Cheapest flip per farmer (ties → larger margin past the threshold)
+        order = np.lexsort((-margin, costs, farmer_pos))
+        order = order[flips[order]]
+        _, first = np.unique(farmer_pos[order], return_index=True)
+
+        recommendations = {}
+        for i in order[first]:
+            row = flagged_idx[farmer_pos[i]]
+            changes = {
+                f: float(proposed[farmer_pos[i], combo_idx[i], j])
+                for j, f in enumerate(actionable) if grid[combo_idx[i], j] != 0
+            }
+            recommendations[str(self.df['feature_id'].iloc[row])] = {
+                'changes': changes,
+                'cost': float(costs[i]),
+                'prob_before': round(float(base_proba[row]), 4),
+                'prob_after': round(float(proba[i]), 4)
+            }
+        return recommendations
+
+    def _recompute_derived(self, candidates: pd.DataFrame, changed: List[str]) -> pd.DataFrame:
+        """Refresh derived features whose inputs were perturbed."""
+
+        touched = set(changed)
+        for feature, inputs, compute in DERIVED_FEATURES:
+            if feature in candidates.columns and touched.intersection(inputs) \
+                    and all(col in candidates.columns for col in inputs):
+                candidates[feature] = compute(candidates)
+                touched.add(feature)
+        return candidates
+
+    def run_pipeline(self, output_file: str = "data/counterfactual_recommendations.json"):
+        """Search all targets and write the per-featureId recommendation file."""
+
+        print("\n=== Starting Counterfactual Search ===\n")
+
+        self.load_data_and_models()
+
+        by_farmer = {}
+        for name, model in self.models.items():
+            for feature_id, rec in self.search_target(name, model).items():
+                by_farmer.setdefault(feature_id, {})[name] = rec
+
+        output_path = Path(output_file)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(output_path, 'w', encoding='utf-8') as f:
+            json.dump(by_farmer, f, sort_keys=True, separators=(',', ':'))
+
+        n_recs = sum(len(v) for v in by_farmer.values())
+        print(f"\n✓ Exported {n_recs} recommendations for {len(by_farmer)} farmers to {output_path}")
+        print(f"  File size: {output_path.stat().st_size / 1024:.1f} KB")
+
+        print("\n=== Counterfactual Search Complete ===")
+
+
+if __name__ == "__main__":
+    import sys
+
+    # Parse command line arguments
+    max_changes = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+
+    search = CounterfactualSearch(max_changes=max_changes)
+    search.run_pipeline()
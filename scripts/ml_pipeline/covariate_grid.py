@@ -0,0 +1,172 @@
+"""
+Covariate Grid Inference
+=========================
+Predict every grid cell directly from interpolated model inputs.
+
+Input: Prepared dataset + trained models + feature_list.json
+Output: data/geojson/AI_Grid_Covariates.geojson with Prob_*/Std_* per cell
+        data/rasters/covariates/Covariates.npy + .json   interpolated feature stack
+        data/rasters/covariates/AI_Grid_Covariates.npy   + Prob_* PNG overlays
+
+The default grid (interpolate_grid.py) predicts at survey points and
+interpolates the resulting probabilities. Here the covariates in
+feature_list.json are interpolated instead (one shared KD-tree /
+triangulation for all features), derived features are recomputed from
+their interpolated inputs, and the persisted models run on every cell in
+chunked predict_proba calls. All targets therefore see the same input
+surface at each cell.
+
+Probabilities get the same distance pull toward 0.5 and smoothing as the
+point-interpolated grid, and both grids share one lattice, so the run ends
+with a per-field comparison against point interpolation.
+"""
+
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+from scipy.spatial import cKDTree
+
+from interpolate_grid import GridInterpolator, field_columns, probability_mask
+from raster_io import write_raster
+from scenario_engine import DERIVED_FEATURES
+
+
+class CovariateGridPredictor:
+    """Interpolate model inputs to the grid and run the models per cell."""
+
+    def __init__(
+        self,
+        method: str = 'linear',
+        max_distance: float = 0.05,
+        idw_options: Optional[Dict] = None,
+        chunk_size: int = 65536
+    ):
+        self.method = method
+        self.max_distance = max_distance
+        self.idw_options = idw_options
+        self.chunk_size = chunk_size
+        self.interpolator = GridInterpolator()
+
+    def interpolate_covariates(self, grid_points: np.ndarray) -> Tuple[pd.DataFrame, np.ndarray]:
+        """Model inputs at every grid point, plus the distance to the nearest survey."""
+
+        interp = self.interpolator
+        features = interp.features
+        coords, values = interp.aggregate_locations(interp.df, features)
+        tree = cKDTree(coords)
+
+        print(f"\nInterpolating {len(features)} covariates to {len(grid_points)} cells "
+              f"({len(coords)} unique survey locations, {self.method})...")
+        grid_values, _ = interp.interpolate_values(
+            coords, values, grid_points, self.method, self.max_distance,
+            tree=tree, idw_options=self.idw_options, bounded=False
+        )
+        covariates = pd.DataFrame(grid_values, columns=features)
+
+        # Derived features follow their interpolated inputs (same order as scenario_engine)
+        for feature, inputs, compute in DERIVED_FEATURES:
+            if feature in covariates.columns and all(col in covariates.columns for col in inputs):
+                covariates[feature] = compute(covariates)
+
+        min_distances, _ = tree.query(grid_points, k=1, workers=-1)
+        return covariates, min_distances
+
+    def predict_cells(self, covariates: pd.DataFrame) -> Dict[str, np.ndarray]:
+        """Prob_*/Std_* per cell, in chunks of ``chunk_size`` rows per predict call."""
+
+        n = len(covariates)
+        results = {}
+        for name in self.interpolator.models:
+            results[f'Prob_{name}'] = np.empty(n)
+            results[f'Std_{name}'] = np.empty(n)
+
+        for start in range(0, n, self.chunk_size):
+            chunk = covariates.iloc[start:start + self.chunk_size]
+            for name, model in self.interpolator.models.items():
+                proba, spread = self.interpolator.predict_with_spread(model, chunk)
+                results[f'Prob_{name}'][start:start + len(chunk)] = proba
+                results[f'Std_{name}'][start:start + len(chunk)] = spread
+
+        n_chunks = -(-n // self.chunk_size)
+        print(f"✓ Scored {n} cells with {len(self.interpolator.models)} models "
+              f"in {n_chunks} chunk(s) of ≤{self.chunk_size}")
+        return results
+
+    def compare(self, covariate_df: pd.DataFrame, point_df: pd.DataFrame):
+        """Print per-field agreement between covariate and point interpolation grids."""
+
+        print("\n=== Covariate vs Point Interpolation ===")
+        for col in [c for c in field_columns(covariate_df) if c.startswith('Prob_')]:
+            a, b = covariate_df[col].values, point_df[col].values
+            mae = np.abs(a - b).mean()
+            corr = np.corrcoef(a, b)[0, 1] if a.std() > 0 and b.std() > 0 else float('nan')
+            print(f"{col}: MAE={mae:.3f}  r={corr:.3f}  "
+                  f"mean {a.mean():.3f} (covariates) vs {b.mean():.3f} (points)")
+
+    def run_pipeline(
+        self,
+        resolution: float = 0.005,
+        apply_smoothing: bool = True,
+        extent: Optional[Tuple[Tuple[float, float], Tuple[float, float]]] = None,
+        buffer: float = 0.02,
+        output_dir: str = "data",
+        compare: bool = True
+    ) -> pd.DataFrame:
+        """Covariate interpolation → per-cell inference → GeoJSON + rasters."""
+
+        print("\n=== Starting Covariate Grid Inference ===\n")
+
+        interp = self.interpolator
+        interp.load_data_and_models()
+
+        boundary = interp.study_boundary(buffer=buffer)
+        lon_range, lat_range = extent if extent is not None else (None, None)
+        grid_points = interp.generate_grid(lon_range, lat_range, resolution=resolution, boundary=boundary)
+
+        covariates, min_distances = self.interpolate_covariates(grid_points)
+        predictions = self.predict_cells(covariates)
+
+        grid_df = pd.DataFrame({'longitude': grid_points[:, 0], 'latitude': grid_points[:, 1]})
+        columns = list(predictions)
+        grid_df[columns] = interp.distance_weighted(
+            np.column_stack([predictions[c] for c in columns]), min_distances, self.max_distance,
+            mask=probability_mask(columns)
+        )
+        if apply_smoothing:
+            grid_df = interp.smooth_probabilities(grid_df)
+
+        out = Path(output_dir)
+        raster_dir = out / "rasters" / "covariates"
+        stack = pd.concat([grid_df[['longitude', 'latitude']], covariates], axis=1)
+        bands, georef = interp.to_raster(stack, columns=list(covariates.columns))
+        write_raster(bands, georef, str(raster_dir / "Covariates"))
+        print(f"\n✓ Exported {len(covariates.columns)}-band covariate stack to {raster_dir}/Covariates.npy")
+
+        interp.export_geojson(grid_df, str(out / "geojson" / "AI_Grid_Covariates.geojson"))
+        interp.export_rasters(grid_df, str(raster_dir), name="AI_Grid_Covariates")
+
+        if compare:
+            # The default grid on the same cells, smoothed the same way
+            point_df = interp.interpolate_to_grid(
+                interp.predict_survey_points(), grid_points, method=self.method,
+                max_distance=self.max_distance, idw_options=self.idw_options
+            )
+            if apply_smoothing:
+                point_df = interp.smooth_probabilities(point_df)
+            self.compare(grid_df, point_df)
+
+        print("\n=== Covariate Grid Inference Complete ===")
+        return grid_df
+
+
+if __name__ == "__main__":
+    import sys
+
+    # e.g. python covariate_grid.py 0.005 --method=idw
+    args = [a for a in sys.argv[1:] if not a.startswith('--')]
+    method = next((a.split('=', 1)[1] for a in sys.argv if a.startswith('--method=')), 'linear')
+    resolution = float(args[0]) if args else 0.005
+
+    predictor = CovariateGridPredictor(method=method)
+    predictor.run_pipeline(resolution=resolution)
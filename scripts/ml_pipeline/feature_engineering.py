@@ -19,9 +19,14 @@ warnings.filterwarnings('ignore')
 class FeatureEngineer:
     """Transform raw survey data into ML-ready features."""
     
-    def __init__(self, data_dir: str = "data/geojson/canonical"):
+    def __init__(self, data_dir: str = "data/geojson/canonical", verbose: bool = True):
         self.data_dir = Path(data_dir)
+        self.verbose = verbose
         self.features_df = None
+        # Fitted state reused when scoring new surveys (see save_transform_state)
+        self.categorical_levels = {}
+        self.dummy_columns = {}
+        self.median_fills = {}
         
     def load_canonical_data(self) -> Dict[str, pd.DataFrame]:
         """Load all canonical GeoJSON files into DataFrames (including new Beqaa data)."""
@@ -249,7 +254,8 @@ class FeatureEngineer:
             (df.get('manual_labor_pct', 50) / 50)  # Normalize to 0-2
         ) / 3
         
-        print(f"✓ Engineered {len([c for c in df.columns if c.endswith('_score') or c.endswith('_count')])} derived features")
+        if self.verbose:
+            print(f"✓ Engineered {len([c for c in df.columns if c.endswith('_score') or c.endswith('_count')])} derived features")
         return df
     
     def create_target_variables(self, df: pd.DataFrame) -> pd.DataFrame:
@@ -337,6 +343,8 @@ class FeatureEngineer:
             df['target_climate_vuln'] = 0
         
         # Report target distributions
+        if not self.verbose:
+            return df
         targets = [c for c in df.columns if c.startswith('target_')]
         print("\n=== Target Variable Distributions ===")
         for target in targets:
@@ -349,8 +357,12 @@ class FeatureEngineer:
         
         return df
     
-    def encode_categorical_features(self, df: pd.DataFrame) -> pd.DataFrame:
-        """One-hot encode categorical variables."""
+    def encode_categorical_features(self, df: pd.DataFrame, fitted: bool = False) -> pd.DataFrame:
+        """One-hot encode categorical variables.
+        
+        With ``fitted=True`` the top-k levels and dummy columns learned at
+        training time are reused, so new data lines up column-for-column.
+        """
         
         # Key categorical columns to encode
         categorical_cols = {
@@ -362,7 +374,17 @@ class FeatureEngineer:
         encoded_dfs = [df]
         
         for col, prefix in categorical_cols.items():
-            if col in df.columns:
+            if fitted:
+                if col not in self.dummy_columns:
+                    continue
+                top_cats = self.categorical_levels[col]
+                values = df[col] if col in df.columns else pd.Series(np.nan, index=df.index)
+                df[col] = values.apply(lambda x: x if x in top_cats else 'other')
+                dummies = pd.get_dummies(df[col], prefix=prefix).reindex(
+                    columns=self.dummy_columns[col], fill_value=False
+                )
+                encoded_dfs.append(dummies)
+            elif col in df.columns:
                 # Get top 5 categories (others become 'other')
                 top_cats = df[col].value_counts().head(5).index
                 df[col] = df[col].apply(lambda x: x if x in top_cats else 'other')
@@ -370,10 +392,14 @@ class FeatureEngineer:
                 # One-hot encode
                 dummies = pd.get_dummies(df[col], prefix=prefix, drop_first=True)
                 encoded_dfs.append(dummies)
-                print(f"✓ One-hot encoded {col} into {len(dummies.columns)} features")
+                self.categorical_levels[col] = top_cats.tolist()
+                self.dummy_columns[col] = dummies.columns.tolist()
+                if self.verbose:
+                    print(f"✓ One-hot encoded {col} into {len(dummies.columns)} features")
         
         result = pd.concat(encoded_dfs, axis=1)
-        print(f"✓ Total features after encoding: {len(result.columns)}")
+        if self.verbose:
+            print(f"✓ Total features after encoding: {len(result.columns)}")
         return result
     
     def prepare_ml_dataset(self) -> Tuple[pd.DataFrame, List[str], List[str]]:
@@ -405,7 +431,9 @@ class FeatureEngineer:
         target_cols = [c for c in df.columns if c.startswith('target_')]
         
         # Handle missing values in features
-        df[feature_cols] = df[feature_cols].fillna(df[feature_cols].median())
+        medians = df[feature_cols].median()
+        df[feature_cols] = df[feature_cols].fillna(medians)
+        self.median_fills = {col: float(val) for col, val in medians.items() if pd.notna(val)}
         
         print(f"\n✓ Final dataset: {len(df)} samples, {len(feature_cols)} features, {len(target_cols)} targets")
         
@@ -421,6 +449,35 @@ class FeatureEngineer:
         output_file.parent.mkdir(parents=True, exist_ok=True)
         self.features_df.to_csv(output_file, index=False)
         print(f"\n✓ Saved prepared data to {output_file}")
+    
+    def save_transform_state(self, output_path: str = "data/models/feature_transforms.json"):
+        """Save fitted categorical levels and median fills for scoring new data."""
+        if not self.median_fills:
+            raise ValueError("No data prepared. Run prepare_ml_dataset() first.")
+        
+        output_file = Path(output_path)
+        output_file.parent.mkdir(parents=True, exist_ok=True)
+        with open(output_file, 'w', encoding='utf-8') as f:
+            json.dump({
+                'categorical_levels': self.categorical_levels,
+                'dummy_columns': self.dummy_columns,
+                'median_fills': self.median_fills
+            }, f, indent=2, ensure_ascii=False)
+        print(f"✓ Saved feature transforms to {output_file}")
+    
+    def load_transform_state(self, input_path: str = "data/models/feature_transforms.json"):
+        """Load transform state written by save_transform_state()."""
+        input_file = Path(input_path)
+        if not input_file.exists():
+            raise FileNotFoundError(
+                f"Feature transforms not found: {input_file} (re-run feature engineering)"
+            )
+        
+        with open(input_file, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+        self.categorical_levels = state['categorical_levels']
+        self.dummy_columns = state['dummy_columns']
+        self.median_fills = state['median_fills']
         
 
 if __name__ == "__main__":
@@ -428,6 +485,7 @@ if __name__ == "__main__":
     engineer = FeatureEngineer()
     df, features, targets = engineer.prepare_ml_dataset()
     engineer.save_prepared_data()
+    engineer.save_transform_state()
     
     print("\n=== Feature Engineering Complete ===")
     print(f"Dataset shape: {df.shape}")
@@ -3,29 +3,292 @@ Boundary Generation
 ====================
 Generate Farmers_Boundary.geojson from survey point locations.
 
-Output: GeoJSON polygon representing the geographic extent of surveyed area
+Output: GeoJSON FeatureCollection with one MultiPolygon feature per survey
+        region (properties: region, surveys, locations, area, centroid, ...)
+
+Survey points are first grouped into regions with DBSCAN (``eps_km``
+neighbourhood on a KD-tree, in metres on a local equirectangular
+projection), so separate survey areas (e.g. Chouf and Beqaa) get separate
+hulls instead of one hull spanning the mountains between them. Isolated
+surveys (fewer than ``min_samples`` within ``eps_km``) are reported and
+kept as one small padded region per survey location. Hulls of the regions
+are computed in parallel worker processes.
+
+Both methods work on numpy coordinate arrays (duplicate village
+coordinates removed) in O(N log N):
+    - convex_hull: Qhull convex hull
+    - alpha_shape: concave hull from the Delaunay triangulation. Triangles
+      with a circumradius above ``alpha`` degrees are dropped (vectorized
+      over all triangles); edges used by exactly one remaining triangle
+      form the boundary, and are chained into rings. Every part of the
+      shape is kept, with its holes. Points left outside every kept
+      triangle are joined to the shape padded by ``min_radius`` degrees,
+      so no survey falls outside its region.
+
+Regions with fewer than three distinct locations (or collinear ones) get
+the hull of their points padded by ``min_radius`` degrees. interpolate_grid
+masks the grid to the union of all regions.
 """
 
+import os
 import json
 import pandas as pd
 import numpy as np
 from pathlib import Path
-from typing import List, Tuple
+from typing import List, Optional, Tuple
+from concurrent.futures import ProcessPoolExecutor
+from scipy.spatial import ConvexHull, Delaunay, QhullError
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+from sklearn.cluster import DBSCAN
 
 try:
-    from shapely.geometry import Point, MultiPoint, Polygon
-    from shapely.ops import unary_union
+    import shapely
+    from shapely.geometry.polygon import orient
     HAS_SHAPELY = True
 except ImportError:
     HAS_SHAPELY = False
-    print("Warning: Shapely not installed, using simple convex hull")
+
+
+EARTH_RADIUS_M = 6371008.8
+
+# Polygon = [outer ring, *holes]; ring = closed [[lon, lat], ...]
+Polygon = List[List[List[float]]]
+
+
+def unique_points(coords: np.ndarray) -> np.ndarray:
+    """Distinct (lon, lat) rows; surveys in one village share a coordinate."""
+
+    points = np.asarray(coords, dtype=float)
+    order = np.lexsort((points[:, 1], points[:, 0]))
+    points = points[order]
+    distinct = np.ones(len(points), dtype=bool)
+    distinct[1:] = np.any(points[1:] != points[:-1], axis=1)
+    return points[distinct]
+
+
+def circumradii(points: np.ndarray, simplices: np.ndarray) -> np.ndarray:
+    """Circumradius of every triangle: abc / (4 · area)."""
+
+    a, b, c = (points[simplices[:, i]] for i in range(3))
+    la = np.linalg.norm(b - c, axis=1)
+    lb = np.linalg.norm(c - a, axis=1)
+    lc = np.linalg.norm(a - b, axis=1)
+    cross = (b[:, 0] - a[:, 0]) * (c[:, 1] - a[:, 1]) - (b[:, 1] - a[:, 1]) * (c[:, 0] - a[:, 0])
+    with np.errstate(divide='ignore'):
+        return np.where(cross != 0, la * lb * lc / (2 * np.abs(cross)), np.inf)
+
+
+def project_metres(coords: np.ndarray) -> np.ndarray:
+    """Local equirectangular projection of (lon, lat) to metres."""
+
+    lat0 = np.radians(coords[:, 1].mean())
+    return np.column_stack([
+        np.radians(coords[:, 0]) * np.cos(lat0),
+        np.radians(coords[:, 1])
+    ]) * EARTH_RADIUS_M
+
+
+def boundary_edges(simplices: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Directed edges that belong to exactly one triangle, and that triangle.
+
+    Triangles are oriented counter-clockwise first, so outer rings run
+    counter-clockwise and holes clockwise.
+    """
+
+    edges = np.concatenate([simplices[:, [0, 1]], simplices[:, [1, 2]], simplices[:, [2, 0]]])
+    # One integer key per undirected edge
+    n = int(simplices.max()) + 1
+    keys = np.minimum(edges[:, 0], edges[:, 1]).astype(np.int64) * n + np.maximum(edges[:, 0], edges[:, 1])
+    _, inverse, counts = np.unique(keys, return_inverse=True, return_counts=True)
+    single = counts[inverse] == 1
+    return edges[single], np.tile(np.arange(len(simplices)), 3)[single]
+
+
+def trace_rings(edges: np.ndarray, points: np.ndarray) -> List[List[int]]:
+    """Chain directed boundary edges into closed vertex rings.
+
+    Where the shape touches itself at a vertex, the walk leaves it along
+    the first outgoing edge counter-clockwise from the way back, i.e. it
+    keeps to the same gap (outside or hole) on its right, so holes that
+    touch the outer ring become their own rings. A ring that still reaches
+    a vertex twice is split there, so every ring is simple.
+    """
+
+    outgoing = {}
+    for start, end in edges.tolist():
+        outgoing.setdefault(start, []).append(end)
+
+    def next_vertex(previous: Optional[int], vertex: int, targets: List[int]) -> int:
+        if previous is None or len(targets) == 1:
+            return targets.pop()
+        back = points[previous] - points[vertex]
+        out = points[targets] - points[vertex]
+        turn = (np.arctan2(out[:, 1], out[:, 0]) - np.arctan2(back[1], back[0])) % (2 * np.pi)
+        return targets.pop(int(np.argmin(turn)))
+
+    rings = []
+    while outgoing:
+        vertex = next(iter(outgoing))
+        path, position, previous = [vertex], {vertex: 0}, None
+        while outgoing:
+            targets = outgoing.get(vertex)
+            if not targets:
+                break  # Open chain (should not happen for a triangulation)
+            nxt = next_vertex(previous, vertex, targets)
+            if not targets:
+                del outgoing[vertex]
+            if nxt in position:
+                i = position[nxt]
+                ring = path[i:]
+                for v in ring[1:]:
+                    del position[v]
+                del path[i + 1:]
+                rings.append(ring + [nxt])
+                if i == 0 and nxt not in outgoing:
+                    break
+            else:
+                position[nxt] = len(path)
+                path.append(nxt)
+            previous, vertex = vertex, nxt
+    return rings
+
+
+def ring_area(ring: np.ndarray) -> float:
+    """Signed shoelace area (positive for counter-clockwise rings)."""
+
+    x, y = ring[:, 0], ring[:, 1]
+    return 0.5 * float(np.dot(x[:-1], y[1:]) - np.dot(x[1:], y[:-1]))
+
+
+def octagons(points: np.ndarray, min_radius: float = 0.005) -> np.ndarray:
+    """(n, 8, 2) counter-clockwise octagon vertices of radius ``min_radius`` around each point."""
+
+    angles = np.arange(8) * np.pi / 4
+    octagon = min_radius * np.column_stack([np.cos(angles), np.sin(angles)])
+    return points[:, None, :] + octagon[None, :, :]
+
+
+def convex_hull_polygon(points: np.ndarray, min_radius: float = 0.005) -> Polygon:
+    """Convex hull of distinct points as a counter-clockwise polygon.
+
+    Fewer than three points, or collinear ones, are padded with an octagon
+    of ``min_radius`` degrees around each point first.
+    """
+
+    try:
+        if len(points) < 3:
+            raise QhullError("fewer than 3 points")
+        hull = ConvexHull(points)
+    except QhullError:
+        points = octagons(points, min_radius).reshape(-1, 2)
+        hull = ConvexHull(points)
+    # 2-D hull vertices are already in counter-clockwise order
+    return [points[np.append(hull.vertices, hull.vertices[0])].tolist()]
+
+
+def pad_points(polygons: List[Polygon], points: np.ndarray, min_radius: float = 0.005) -> List[Polygon]:
+    """Union of ``polygons`` and an octagon of ``min_radius`` degrees around each point.
+
+    Parts come back counter-clockwise with clockwise holes. Without
+    shapely the octagons are added as separate (possibly overlapping) parts.
+    """
+
+    if not len(points):
+        return polygons
+    pads = [[ring.tolist() + [ring[0].tolist()]] for ring in octagons(points, min_radius)]
+    if not HAS_SHAPELY:
+        return polygons + pads
+
+    merged = shapely.union_all([shapely.Polygon(p[0], p[1:]) for p in polygons + pads])
+    return [
+        [np.asarray(part.exterior.coords).tolist()] + [np.asarray(r.coords).tolist() for r in part.interiors]
+        for part in (orient(part, 1.0) for part in shapely.get_parts(merged))
+    ]
+
+
+def alpha_shape_polygons(points: np.ndarray, alpha: float = 0.05, min_radius: float = 0.005) -> List[Polygon]:
+    """Parts of the alpha shape of distinct points, each with its holes.
+
+    Keeps Delaunay triangles whose circumradius is at most ``alpha``
+    degrees. Rings are traced per edge-connected triangle component: the
+    counter-clockwise ring is the outer boundary of the part, clockwise
+    rings are its holes. Points that are a vertex of no kept triangle are
+    outside the shape and get padded by ``min_radius`` (pad_points), like
+    isolated surveys. Falls back to the convex hull when no triangle is
+    kept.
+    """
+
+    try:
+        triangulation = Delaunay(points)
+    except (QhullError, ValueError):
+        return [convex_hull_polygon(points)]
+    keep = circumradii(points, triangulation.simplices) <= alpha
+    if not keep.any():
+        return [convex_hull_polygon(points)]
+    kept = triangulation.simplices[keep]
+
+    # Orient counter-clockwise so boundary edges inherit the ring direction
+    a, b, c = (points[kept[:, i]] for i in range(3))
+    clockwise = ((b[:, 0] - a[:, 0]) * (c[:, 1] - a[:, 1]) - (b[:, 1] - a[:, 1]) * (c[:, 0] - a[:, 0])) < 0
+    kept[clockwise] = kept[clockwise][:, [0, 2, 1]]
+
+    # Kept triangles connected through shared edges form one part
+    index = np.full(len(keep), -1)
+    index[keep] = np.arange(len(kept))
+    neighbours = triangulation.neighbors[keep]
+    neighbours = np.where(neighbours >= 0, index[neighbours], -1)
+    rows, cols = np.nonzero(neighbours >= 0)
+    adjacency = coo_matrix((np.ones(len(rows)), (rows, neighbours[rows, cols])), shape=(len(kept),) * 2)
+    _, component = connected_components(adjacency, directed=False)
+
+    edges, owner = boundary_edges(kept)
+    edge_component = component[owner]
+    order = np.argsort(edge_component, kind='stable')
+    splits = np.flatnonzero(np.diff(edge_component[order])) + 1
+
+    polygons = []
+    # Traced per part, so rings of parts touching at a vertex never mix
+    for part_edges in np.split(edges[order], splits):
+        rings = [(ring_area(points[ring]), points[ring].tolist()) for ring in trace_rings(part_edges, points)]
+        shells = sorted([r for r in rings if r[0] > 0], key=lambda r: -r[0])
+        holes = [coords for area, coords in rings if area < 0]
+        polygons.append([shells[0][1]] + holes)
+        polygons.extend([coords] for _, coords in shells[1:])
+
+    # Every point is a triangulation vertex, so it is covered iff a kept triangle uses it
+    covered = np.zeros(len(points), dtype=bool)
+    covered[kept.ravel()] = True
+    return pad_points(polygons, points[~covered], min_radius)
+
+
+def region_polygons(task: Tuple[np.ndarray, str, float]) -> List[Polygon]:
+    """Hull polygons of one region (worker entry point)."""
+
+    coords, method, alpha = task
+    points = unique_points(coords)
+    if method == 'alpha_shape':
+        return alpha_shape_polygons(points, alpha)
+    return [convex_hull_polygon(points)]
+
+
+def polygon_area_km2(polygon: Polygon) -> float:
+    """Area of a polygon (outer ring minus holes) in km²."""
+
+    total = 0.0
+    for ring in polygon:
+        ring = np.array(ring)
+        # Shoelace in local metres; counter-clockwise outer rings are positive
+        total += ring_area(project_metres(ring)) if len(ring) > 2 else 0.0
+    return total / 1e6
 
 
 class BoundaryGenerator:
     """Generate geographic boundary from survey points."""
     
-    def __init__(self, data_path: str = "data/ml_prepared_data.csv"):
+    def __init__(self, data_path: str = "data/ml_prepared_data.csv", area_name: Optional[str] = None):
         self.data_path = Path(data_path)
+        self.area_name = area_name
         self.coords = None
         
     def load_coordinates(self):
@@ -37,77 +300,135 @@ class BoundaryGenerator:
         self.coords = df[['longitude', 'latitude']].values
         print(f"✓ Loaded {len(self.coords)} survey point coordinates")
     
-    def compute_convex_hull(self) -> List[List[float]]:
-        """Compute convex hull of survey points."""
+    def cluster_regions(self, eps_km: Optional[float] = 8.0, min_samples: int = 3) -> np.ndarray:
+        """Region label per survey point.
         
-        if HAS_SHAPELY:
-            # Use Shapely for robust convex hull
-            points = MultiPoint([Point(lon, lat) for lon, lat in self.coords])
-            hull = points.convex_hull
-            
-            if hull.geom_type == 'Polygon':
-                coords_list = list(hull.exterior.coords)
-            else:
-                # Fallback if hull is a LineString or Point
-                coords_list = list(hull.coords)
-        else:
-            # Simple convex hull using scipy
-            from scipy.spatial import ConvexHull
-            hull = ConvexHull(self.coords)
-            coords_list = [self.coords[i].tolist() for i in hull.vertices]
-            coords_list.append(coords_list[0])  # Close the polygon
-        
-        print(f"✓ Computed convex hull with {len(coords_list)} vertices")
-        return coords_list
+        DBSCAN regions are numbered from 0 by decreasing survey count.
+        Isolated surveys (DBSCAN noise) follow, one region per distinct
+        location, so their hull is the padded octagon around it. Without
+        ``eps_km`` all points form one region.
+        """
+        
+        if not eps_km:
+            return np.zeros(len(self.coords), dtype=int)
+        
+        labels = DBSCAN(eps=eps_km * 1000, min_samples=min_samples,
+                        algorithm='kd_tree').fit_predict(project_metres(self.coords))
+        
+        clustered = labels >= 0
+        counts = np.bincount(labels[clustered])
+        rank = np.empty(len(counts), dtype=int)
+        rank[np.argsort(-counts, kind='stable')] = np.arange(len(counts))
+        labels[clustered] = rank[labels[clustered]]
+        
+        print(f"✓ Found {len(counts)} survey regions (DBSCAN eps={eps_km}km, min_samples={min_samples}): "
+              + ', '.join(str(n) for n in sorted(counts, reverse=True)) + " surveys")
+        if (~clustered).any():
+            _, location = np.unique(self.coords[~clustered], axis=0, return_inverse=True)
+            location = location.ravel()
+            labels[~clustered] = len(counts) + location
+            print(f"⚠️  {int((~clustered).sum())} isolated survey(s) at {location.max() + 1} location(s) "
+                  f"kept as padded single-location regions")
+        return labels
+    
+    def compute_convex_hull(self, coords: Optional[np.ndarray] = None) -> List[Polygon]:
+        """Compute convex hull of survey points (one counter-clockwise polygon)."""
+        
+        polygons = region_polygons((self.coords if coords is None else coords, 'convex_hull', 0.0))
+        
+        print(f"✓ Computed convex hull with {len(polygons[0][0])} vertices")
+        return polygons
     
-    def compute_alpha_shape(self, alpha: float = 0.05) -> List[List[float]]:
-        """Compute alpha shape (tighter boundary than convex hull)."""
-        
-        if not HAS_SHAPELY:
-            print("⚠️  Shapely not available, falling back to convex hull")
-            return self.compute_convex_hull()
-        
-        # Create buffer around points and merge
-        points = [Point(lon, lat) for lon, lat in self.coords]
-        buffered = [p.buffer(alpha) for p in points]
-        merged = unary_union(buffered)
-        
-        if merged.geom_type == 'Polygon':
-            coords_list = list(merged.exterior.coords)
-        elif merged.geom_type == 'MultiPolygon':
-            # Use largest polygon
-            largest = max(merged.geoms, key=lambda p: p.area)
-            coords_list = list(largest.exterior.coords)
+    def compute_alpha_shape(self, alpha: float = 0.05, coords: Optional[np.ndarray] = None) -> List[Polygon]:
+        """Compute alpha shape (tighter boundary than convex hull), one polygon per part."""
+        
+        polygons = region_polygons((self.coords if coords is None else coords, 'alpha_shape', alpha))
+        
+        vertices = sum(len(ring) for polygon in polygons for ring in polygon)
+        print(f"✓ Computed alpha shape with {len(polygons)} part(s), {vertices} vertices (alpha={alpha})")
+        return polygons
+    
+    def compute_regions(
+        self,
+        labels: np.ndarray,
+        method: str = 'convex_hull',
+        alpha: float = 0.05,
+        workers: Optional[int] = None
+    ) -> List[List[Polygon]]:
+        """Hull polygons per region, computed in parallel worker processes.
+        
+        A region's surveys that its hull misses are padded into it
+        (pad_points), so the outline always covers every survey.
+        """
+        
+        n_regions = int(labels.max()) + 1 if len(labels) else 0
+        if n_regions == 0:
+            print("⚠️  No survey regions to outline")
+            return []
+        tasks = [(self.coords[labels == region], method, alpha) for region in range(n_regions)]
+        
+        if n_regions == 1 or workers == 1:
+            regions = [region_polygons(task) for task in tasks]
         else:
-            # Fallback to convex hull
-            return self.compute_convex_hull()
+            workers = max(min(workers or os.cpu_count() or 1, n_regions), 1)
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                regions = list(pool.map(region_polygons, tasks))
+        
+        # Every survey must lie in its own region, whatever the method
+        if HAS_SHAPELY:
+            for region, (coords, _, _) in enumerate(tasks):
+                outline = shapely.union_all([shapely.Polygon(p[0], p[1:]) for p in regions[region]])
+                missed = ~shapely.intersects_xy(outline, coords[:, 0], coords[:, 1])
+                if missed.any():
+                    print(f"⚠️  Region {region + 1}: {int(missed.sum())} survey(s) outside the outline, padded in")
+                    regions[region] = pad_points(regions[region], unique_points(coords[missed]))
         
-        print(f"✓ Computed alpha shape with {len(coords_list)} vertices (alpha={alpha})")
-        return coords_list
+        for region, polygons in enumerate(regions):
+            vertices = sum(len(ring) for polygon in polygons for ring in polygon)
+            print(f"  Region {region + 1}: {len(polygons)} part(s), {vertices} vertices")
+        return regions
+    
+    def description(self) -> str:
+        """Feature description, naming ``area_name`` when one was given."""
+        if self.area_name:
+            return f"Geographic extent of surveyed agricultural area in {self.area_name}"
+        return "Geographic extent of surveyed agricultural area"
     
     def export_geojson(
         self,
-        boundary_coords: List[List[float]],
+        regions: List[List[Polygon]],
+        labels: np.ndarray,
         output_file: str = "data/geojson/Farmers_Boundary.geojson",
         method: str = "convex_hull"
     ):
-        """Export boundary as GeoJSON."""
+        """Export boundary as GeoJSON (one MultiPolygon feature per region)."""
         
-        geojson = {
-            "type": "FeatureCollection",
-            "features": [{
+        features = []
+        for region, polygons in enumerate(regions):
+            coords = self.coords[labels == region]
+            features.append({
                 "type": "Feature",
                 "geometry": {
-                    "type": "Polygon",
-                    "coordinates": [boundary_coords]
+                    "type": "MultiPolygon",
+                    "coordinates": polygons
                 },
                 "properties": {
-                    "name": "Farmers Survey Boundary",
+                    "name": f"Farmers Survey Region {region + 1}",
+                    "region": region + 1,
                     "method": method,
-                    "n_points": len(self.coords),
-                    "description": "Geographic extent of surveyed agricultural area in Mount Lebanon"
+                    "n_points": len(coords),
+                    "n_locations": len(unique_points(coords)),
+                    "n_parts": len(polygons),
+                    "area_km2": round(sum(polygon_area_km2(polygon) for polygon in polygons), 2),
+                    "centroid": [round(v, 5) for v in coords.mean(axis=0).tolist()],
+                    "bbox": [round(v, 5) for v in np.concatenate([coords.min(axis=0), coords.max(axis=0)]).tolist()],
+                    "description": self.description()
                 }
-            }]
+            })
+        
+        geojson = {
+            "type": "FeatureCollection",
+            "features": features
         }
         
         output_path = Path(output_file)
@@ -116,12 +437,15 @@ class BoundaryGenerator:
         with open(output_path, 'w') as f:
             json.dump(geojson, f, indent=2)
         
-        print(f"✓ Exported boundary to {output_path}")
+        print(f"✓ Exported {len(features)} boundary region(s) to {output_path}")
     
     def generate_boundary(
         self,
         method: str = 'convex_hull',
-        alpha: float = 0.05
+        alpha: float = 0.05,
+        eps_km: Optional[float] = 8.0,
+        min_samples: int = 3,
+        workers: Optional[int] = None
     ):
         """Complete boundary generation pipeline."""
         
@@ -130,14 +454,12 @@ class BoundaryGenerator:
         # Load coordinates
         self.load_coordinates()
         
-        # Compute boundary
-        if method == 'alpha_shape':
-            boundary_coords = self.compute_alpha_shape(alpha)
-        else:
-            boundary_coords = self.compute_convex_hull()
+        # Group into regions, then one hull per region
+        labels = self.cluster_regions(eps_km, min_samples)
+        regions = self.compute_regions(labels, method=method, alpha=alpha, workers=workers)
         
         # Export
-        self.export_geojson(boundary_coords, method=method)
+        self.export_geojson(regions, labels, method=method)
         
         print("\n=== Boundary Generation Complete ===")
 
@@ -145,13 +467,16 @@ class BoundaryGenerator:
 if __name__ == "__main__":
     import sys
     
-    # Parse command line arguments
-    method = sys.argv[1] if len(sys.argv) > 1 else 'convex_hull'
-    alpha = float(sys.argv[2]) if len(sys.argv) > 2 else 0.05
+    # e.g. python generate_boundary.py alpha_shape 0.05 --eps-km=8 --area="Mount Lebanon"   (--eps-km=0: one region)
+    args = [a for a in sys.argv[1:] if not a.startswith('--')]
+    method = args[0] if args else 'convex_hull'
+    alpha = float(args[1]) if len(args) > 1 else 0.05
+    eps_km = float(next((a.split('=', 1)[1] for a in sys.argv if a.startswith('--eps-km=')), 8.0))
+    area_name = next((a.split('=', 1)[1] for a in sys.argv if a.startswith('--area=')), None)
     
     print(f"Boundary method: {method}")
     if method == 'alpha_shape':
         print(f"Alpha parameter: {alpha}")
     
-    generator = BoundaryGenerator()
-    generator.generate_boundary(method=method, alpha=alpha)
+    generator = BoundaryGenerator(area_name=area_name)
+    generator.generate_boundary(method=method, alpha=alpha, eps_km=eps_km)
@@ -0,0 +1,171 @@
+"""
+Grid Pyramid
+=============
+Coarser copies of the finest grid raster for zoom-dependent map layers.
+
+Input: <name>.npy + <name>.json raster from GridInterpolator (finest level)
+Output: pyramid/L<k>/<name>.npy + .json   level k raster (cells 2^k × finest)
+        pyramid/L<k>/<field>.png + .json  Prob_* overlays per level
+        <name>_pyramid.json               zoom range → level index
+
+Interpolation runs once, at the finest resolution. Each coarser level is
+the mean over 2×2 blocks of the level below it (NaN cells are ignored; a
+block with no data stays NaN). Blocks are anchored at the north-west
+corner, so every level shares the finest raster's top-left edge and an odd
+last row/column becomes a partial block.
+
+Levels are built strip by strip from memory-mapped rasters, so the pyramid
+of a tiled run never loads the full finest raster. The index maps each
+level to the MapLibre zooms at which one of its cells spans between
+``pixels_per_cell`` and twice that many screen pixels; the finest level
+keeps every zoom above its range, the coarsest every zoom below.
+"""
+
+import json
+import numpy as np
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from raster_io import georeference, create_raster, write_overlay
+
+
+# MapLibre tile size: the world is 512 · 2^zoom pixels wide
+TILE_SIZE = 512
+MAX_ZOOM = 24
+
+
+def downsample(bands: np.ndarray) -> np.ndarray:
+    """Mean over 2×2 blocks of a (bands, ny, nx) array, ignoring NaN."""
+
+    n_bands, ny, nx = bands.shape
+    padded = np.full((n_bands, ny + ny % 2, nx + nx % 2), np.nan, dtype=np.float32)
+    padded[:, :ny, :nx] = bands
+    blocks = padded.reshape(n_bands, padded.shape[1] // 2, 2, padded.shape[2] // 2, 2)
+
+    valid = ~np.isnan(blocks)
+    counts = valid.sum(axis=(2, 4))
+    sums = np.where(valid, blocks, 0.0).sum(axis=(2, 4))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(counts > 0, sums / counts, np.nan).astype(np.float32)
+
+
+def zoom_for_resolution(resolution: float, pixels_per_cell: float = 1.0) -> float:
+    """Zoom at which one ``resolution``° cell is ``pixels_per_cell`` pixels wide."""
+
+    return float(np.log2(pixels_per_cell * 360.0 / (TILE_SIZE * resolution)))
+
+
+def downsample_raster(source: Path, georef: Dict, output_stem: str, strip_rows: int = 256) -> Dict:
+    """Write the 2×2-mean level of an on-disk raster; returns its georeference."""
+
+    ny, nx = georef['shape']
+    resolution = georef['resolution'] * 2
+    west, north = georef['geotransform'][0], georef['geotransform'][3]
+    level_shape = ((ny + 1) // 2, (nx + 1) // 2)
+    level_georef = georeference(west, north, resolution, level_shape, georef['bands'])
+    level_path = create_raster(level_georef, output_stem)
+
+    # Even strip height keeps every 2×2 block inside one strip
+    strip_rows += strip_rows % 2
+    for r0 in range(0, ny, strip_rows):
+        # Fresh mappings per strip so pages already written are released
+        src = np.load(source, mmap_mode='r')
+        out = np.load(level_path, mmap_mode='r+')
+        out[:, r0 // 2:(min(r0 + strip_rows, ny) + 1) // 2] = downsample(src[:, r0:r0 + strip_rows])
+        out.flush()
+        del src, out
+
+    return level_georef
+
+
+def build_pyramid(
+    raster_stem: str,
+    levels: Optional[int] = None,
+    min_size: int = 16,
+    pixels_per_cell: float = 1.0,
+    overlays: bool = True
+) -> Dict:
+    """Build coarser levels of ``raster_stem`` and write the zoom index.
+
+    ``levels`` counts the coarser levels to add; by default levels are
+    added until the smaller raster side would drop below ``min_size``
+    cells (the default 0.005° study grid, 138x68, gets two). Returns the
+    index (also written to ``<name>_pyramid.json``).
+    """
+
+    stem = Path(raster_stem)
+    out_dir = stem.parent
+    with open(stem.with_suffix('.json'), 'r', encoding='utf-8') as f:
+        georef = json.load(f)
+
+    if levels is None:
+        levels = 0
+        while min((side + 1) // 2 ** (levels + 1) for side in georef['shape']) >= min_size:
+            levels += 1
+
+    prob_fields = [field for field in georef['bands'] if field.startswith('Prob_')]
+    entries = [_level_entry(0, georef, stem.with_suffix('.npy'), out_dir, prob_fields, out_dir)]
+
+    source = stem.with_suffix('.npy')
+    for level in range(1, levels + 1):
+        level_dir = out_dir / 'pyramid' / f"L{level}"
+        georef = downsample_raster(source, georef, str(level_dir / stem.name))
+        source = (level_dir / stem.name).with_suffix('.npy')
+
+        if overlays:
+            for i, field in enumerate(georef['bands']):
+                if field in prob_fields:
+                    raster = np.load(source, mmap_mode='r')
+                    write_overlay(raster[i], georef, field, str(level_dir))
+                    del raster
+        entries.append(_level_entry(level, georef, source, level_dir,
+                                    prob_fields if overlays else [], out_dir))
+
+    # Zoom ranges: level k while its cells span [1, 2) × pixels_per_cell pixels
+    for entry in entries:
+        entry['minzoom'] = round(max(zoom_for_resolution(entry['resolution'], pixels_per_cell), 0.0), 2)
+        entry['maxzoom'] = round(max(zoom_for_resolution(entry['resolution'], 2 * pixels_per_cell), 0.0), 2)
+    entries[0]['maxzoom'] = MAX_ZOOM
+    entries[-1]['minzoom'] = 0.0
+
+    index = {
+        'name': stem.name,
+        'bounds': entries[0]['bounds'],
+        'pixels_per_cell': pixels_per_cell,
+        # Coarsest first, so the list reads in increasing zoom order
+        'levels': entries[::-1]
+    }
+    index_path = out_dir / f"{stem.name}_pyramid.json"
+    with open(index_path, 'w', encoding='utf-8') as f:
+        json.dump(index, f, indent=2)
+
+    print(f"\n✓ Built {len(entries)}-level pyramid ({index_path.name})")
+    for entry in index['levels']:
+        ny, nx = entry['shape']
+        print(f"  L{entry['level']}: {nx}x{ny} @ {entry['resolution']:.5f}° "
+              f"→ zoom {entry['minzoom']:.2f}-{entry['maxzoom']:.2f}")
+    return index
+
+
+def _level_entry(level: int, georef: Dict, raster_path: Path, level_dir: Path,
+                 fields: List[str], root: Path) -> Dict:
+    """Index entry for one level; paths are relative to the index file."""
+
+    return {
+        'level': level,
+        'resolution': georef['resolution'],
+        'shape': georef['shape'],
+        'bounds': georef['bounds'],
+        'raster': raster_path.relative_to(root).as_posix(),
+        'overlays': {field: (level_dir / f"{field}.json").relative_to(root).as_posix() for field in fields}
+    }
+
+
+if __name__ == "__main__":
+    import sys
+
+    # e.g. python grid_pyramid.py data/rasters/AI_Grid_Predictions 4
+    raster_stem = sys.argv[1] if len(sys.argv) > 1 else "data/rasters/AI_Grid_Predictions"
+    levels = int(sys.argv[2]) if len(sys.argv) > 2 else None
+
+    build_pyramid(raster_stem, levels)
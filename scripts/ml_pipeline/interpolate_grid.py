@@ -5,19 +5,72 @@ Convert point predictions to grid-based probability heatmaps.
 
 Input: Trained models + survey point locations
 Output: AI_Grid_Predictions.geojson with regular grid and interpolated probabilities
+        data/rasters/ multi-band raster + per-field PNG overlays (see raster_io.py)
+        AI_Grid_Isobands.geojson with classified probability polygons (see isobands.py)
+        data/rasters/pyramid/ coarser 2×2-mean zoom levels with --pyramid (see grid_pyramid.py)
+
+Tiled mode (run_tiled) covers large extents at fine resolution: the lattice
+is split into tiles that are interpolated and smoothed in worker processes,
+each with a halo as wide as the smoothing radius, and written straight into
+a memory-mapped raster. Peak memory depends on the tile size, not on the
+extent, and the result matches the in-memory pipeline.
 """
 
 import json
+import time
 import pandas as pd
 import numpy as np
 from pathlib import Path
-from typing import Dict, List, Tuple
-import joblib
+from typing import Dict, List, Optional, Tuple
+from concurrent.futures import ProcessPoolExecutor
 import warnings
 warnings.filterwarnings('ignore')
 
-from scipy.interpolate import griddata
-from scipy.spatial import distance_matrix
+from scipy import ndimage, signal
+from scipy.interpolate import LinearNDInterpolator
+from scipy.spatial import cKDTree, Delaunay
+
+from model_store import load_feature_list, load_target_models
+from raster_io import georeference, write_raster, write_overlay, create_raster
+from kriging import OrdinaryKriging
+from grid_pyramid import build_pyramid
+from isobands import HAS_CONTOURPY, HAS_SHAPELY, DEFAULT_BREAKS, isoband_features, load_boundary
+
+if HAS_SHAPELY:
+    import shapely
+    from shapely.geometry import MultiPoint
+
+# Inverse distance weighting defaults (method='idw'): weight = 1 / d^power over
+# the k nearest survey locations within radius degrees (None = unlimited)
+IDW_DEFAULTS = {'power': 2.0, 'k': 12, 'radius': None}
+
+# Fixed extents (lon_range, lat_range); by default the grid extent is derived
+# from the survey boundary instead (GridInterpolator.grid_extent)
+STUDY_EXTENT = ((35.40, 35.70), (33.58, 33.80))
+LEBANON_EXTENT = ((35.10, 36.65), (33.05, 34.70))
+
+# Grid fields carried through interpolation, smoothing and export:
+# Prob_* = ensemble mean probability, Std_* = spread across ensemble members,
+# KrigStd_* = kriging standard deviation of Prob_* (method='kriging' only)
+FIELD_PREFIXES = ('Prob_', 'Std_', 'KrigStd_', 'Comp_')
+
+# Uncertainty fields: in the rasters, opt-in for the point GeoJSON
+SPREAD_PREFIXES = ('Std_', 'KrigStd_')
+
+
+def field_columns(df: pd.DataFrame) -> List[str]:
+    """Return the per-target field columns (Prob_*/Std_*/KrigStd_*/Comp_*) of a frame."""
+    return [c for c in df.columns if c.startswith(FIELD_PREFIXES)]
+
+
+def probability_mask(columns: List[str]) -> np.ndarray:
+    """True for Prob_* columns: the only fields clipped to [0, 1] and pulled toward 0.5."""
+    return np.array([col.startswith('Prob_') for col in columns], dtype=bool)
+
+
+def kriging_std_columns(columns: List[str]) -> List[Tuple[int, str]]:
+    """(index, KrigStd_* name) for each Prob_* column among interpolated fields."""
+    return [(j, 'KrigStd_' + col[len('Prob_'):]) for j, col in enumerate(columns) if col.startswith('Prob_')]
 
 
 class GridInterpolator:
@@ -44,37 +97,33 @@ class GridInterpolator:
         self.df = pd.read_csv(self.data_path)
         print(f"✓ Loaded {len(self.df)} survey points")
         
-        # Load feature list
-        features_file = self.models_dir / "feature_list.json"
-        if features_file.exists():
-            with open(features_file, 'r') as f:
-                feature_data = json.load(f)
-                self.features = feature_data['features']
-        else:
-            raise FileNotFoundError(f"Feature list not found: {features_file}")
-        
-        # Load models
-        target_mapping = {
-            'target_regen_adoption': 'Regen',
-            'target_water_risk': 'Water',
-            'target_economic_vuln': 'Econ',
-            'target_labor_shortage': 'Labor',
-            'target_climate_vuln': 'Climate'
-        }
-        
-        for target, short_name in target_mapping.items():
-            model_file = self.models_dir / f"{target}_model.joblib"
-            if model_file.exists():
-                self.models[short_name] = joblib.load(model_file)
-                print(f"✓ Loaded model: {short_name}")
-            else:
-                print(f"⚠️  Model not found: {model_file.name}")
-        
-        if not self.models:
-            raise ValueError("No models loaded")
+        # Load feature list and models
+        self.features = load_feature_list(self.models_dir)
+        self.models = load_target_models(self.models_dir)
+    
+    @staticmethod
+    def predict_with_spread(model, X: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+        """Positive-class probability and its spread across ensemble members.
+        
+        For bagged ensembles (RandomForest) the per-tree probabilities are
+        stacked in a single pass and reduced to mean/std, so the mean equals
+        ``predict_proba`` without running inference twice. Models without
+        member estimators (XGBoost, logistic) report zero spread.
+        """
+        estimators = getattr(model, 'estimators_', None)
+        if estimators is None or not all(hasattr(e, 'predict_proba') for e in estimators):
+            proba = model.predict_proba(X)[:, 1]
+            return proba, np.zeros_like(proba)
+        
+        X_arr = np.ascontiguousarray(np.asarray(X, dtype=np.float32))
+        stacked = np.stack([
+            tree.predict_proba(X_arr, check_input=False)[:, 1]
+            for tree in estimators
+        ])  # (n_trees, n_points)
+        return stacked.mean(axis=0), stacked.std(axis=0)
     
     def predict_survey_points(self) -> pd.DataFrame:
-        """Generate predictions for all survey points."""
+        """Generate predictions (mean and ensemble spread) for all survey points."""
         
         X = self.df[self.features]
         coords = self.df[['longitude', 'latitude']].values
@@ -85,19 +134,71 @@ class GridInterpolator:
         })
         
         for name, model in self.models.items():
-            proba = model.predict_proba(X)[:, 1]
+            proba, spread = self.predict_with_spread(model, X)
             predictions[f'Prob_{name}'] = proba
-            print(f"✓ Predicted {name}: mean={proba.mean():.3f}, std={proba.std():.3f}")
+            predictions[f'Std_{name}'] = spread
+            print(f"✓ Predicted {name}: mean={proba.mean():.3f}, std={proba.std():.3f}, "
+                  f"tree spread={spread.mean():.3f}")
         
         return predictions
     
+    def study_boundary(
+        self,
+        boundary_file: str = "data/geojson/Farmers_Boundary.geojson",
+        buffer: float = 0.02  # ~2km
+    ):
+        """Survey boundary polygon grown by ``buffer`` degrees.
+        
+        Uses Farmers_Boundary.geojson when present, otherwise the convex
+        hull of the survey points. None without shapely.
+        """
+        
+        if not HAS_SHAPELY:
+            return None
+        boundary = load_boundary(boundary_file)
+        if boundary is None:
+            boundary = MultiPoint(self.df[['longitude', 'latitude']].values).convex_hull
+        return boundary.buffer(buffer)
+    
+    def grid_extent(
+        self,
+        resolution: float = 0.005,
+        buffer: float = 0.02,
+        boundary=None
+    ) -> Tuple[Tuple[float, float], Tuple[float, float]]:
+        """Grid extent covering the boundary (or survey points) plus buffer.
+        
+        The south-west origin is snapped to a multiple of the resolution, so
+        grids of the same resolution always share one lattice.
+        """
+        
+        if boundary is not None:
+            # Boundary from study_boundary() is already buffered
+            west, south, east, north = boundary.bounds
+        else:
+            west, south = self.df[['longitude', 'latitude']].min().values - buffer
+            east, north = self.df[['longitude', 'latitude']].max().values + buffer
+        
+        lon0 = np.floor(west / resolution) * resolution
+        lat0 = np.floor(south / resolution) * resolution
+        return (lon0, east + resolution), (lat0, north + resolution)
+    
     def generate_grid(
         self,
-        lon_range: Tuple[float, float] = (35.40, 35.70),
-        lat_range: Tuple[float, float] = (33.58, 33.80),
-        resolution: float = 0.005  # ~500m at this latitude
+        lon_range: Optional[Tuple[float, float]] = None,
+        lat_range: Optional[Tuple[float, float]] = None,
+        resolution: float = 0.005,  # ~500m at this latitude
+        boundary=None
     ) -> np.ndarray:
-        """Generate regular grid covering study area."""
+        """Generate regular grid covering study area.
+        
+        Without explicit ranges the extent comes from grid_extent(). Cells
+        outside ``boundary`` (a shapely polygon) are dropped here, before any
+        interpolation, with one vectorized contains_xy call.
+        """
+        
+        if lon_range is None or lat_range is None:
+            lon_range, lat_range = self.grid_extent(resolution, boundary=boundary)
         
         lon_grid = np.arange(lon_range[0], lon_range[1], resolution)
         lat_grid = np.arange(lat_range[0], lat_range[1], resolution)
@@ -105,135 +206,491 @@ class GridInterpolator:
         lon_mesh, lat_mesh = np.meshgrid(lon_grid, lat_grid)
         grid_points = np.column_stack([lon_mesh.ravel(), lat_mesh.ravel()])
         
-        print(f"✓ Generated grid: {len(grid_points)} points ({len(lon_grid)}x{len(lat_grid)})")
+        print(f"✓ Generated grid: {len(grid_points)} points ({len(lon_grid)}x{len(lat_grid)}) "
+              f"over {lon_range[0]:.3f}-{lon_range[1]:.3f}°E, {lat_range[0]:.3f}-{lat_range[1]:.3f}°N")
+        
+        if boundary is not None:
+            inside = shapely.contains_xy(boundary, grid_points[:, 0], grid_points[:, 1])
+            grid_points = grid_points[inside]
+            print(f"✓ Masked to boundary: {len(grid_points)} of {len(inside)} cells kept")
+        
         return grid_points
     
+    @staticmethod
+    def aggregate_locations(
+        survey_predictions: pd.DataFrame,
+        columns: List[str]
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Average fields of surveys that share a coordinate (village centroids).
+        
+        Returns unique (lon, lat) coordinates and a (locations, fields) array.
+        """
+        grouped = survey_predictions.groupby(['longitude', 'latitude'], sort=True)[columns].mean()
+        coords = grouped.index.to_frame(index=False).values
+        return coords, grouped.values
+    
+    @staticmethod
+    def idw_values(
+        tree: cKDTree,
+        values: np.ndarray,
+        grid_points: np.ndarray,
+        power: float = 2.0,
+        k: int = 12,
+        radius: Optional[float] = None,
+        chunk_size: int = 65536,
+        leave_one_out: bool = False
+    ) -> np.ndarray:
+        """Inverse-distance-weighted (points, fields) values; NaN where no survey is within radius.
+        
+        One k-nearest KD-tree query and one weighted sum over all fields per
+        chunk, so memory is bounded by chunk_size × k × fields. With
+        ``leave_one_out`` the points are the survey locations and each one's
+        own sample (its nearest neighbour) is left out.
+        """
+        
+        k = min(k, tree.n - int(leave_one_out))
+        bound = np.inf if radius is None else radius
+        result = np.empty((len(grid_points), values.shape[1]))
+        
+        for start in range(0, len(grid_points), chunk_size):
+            points = grid_points[start:start + chunk_size]
+            distances, idx = tree.query(points, k=k + leave_one_out, distance_upper_bound=bound, workers=-1)
+            distances = distances.reshape(len(points), k + leave_one_out)[:, int(leave_one_out):]
+            idx = idx.reshape(len(points), k + leave_one_out)[:, int(leave_one_out):]
+            
+            # Missing neighbours (beyond radius) come back as inf / index n
+            found = np.isfinite(distances)
+            weights = np.where(found, 1.0 / np.maximum(distances, 1e-12) ** power, 0.0)
+            # A cell on a survey location takes that location's value
+            exact = distances[:, 0] < 1e-12
+            weights[exact] = 0.0
+            weights[exact, 0] = 1.0
+            
+            total = weights.sum(axis=1)
+            sums = np.einsum('pk,pkf->pf', weights, values[np.where(found, idx, 0)])
+            with np.errstate(invalid='ignore', divide='ignore'):
+                result[start:start + len(points)] = sums / total[:, None]
+        
+        return result
+    
+    @staticmethod
+    def interpolate_values(
+        survey_coords: np.ndarray,
+        values: np.ndarray,
+        grid_points: np.ndarray,
+        method: str = 'linear',
+        max_distance: float = 0.05,
+        tree: cKDTree = None,
+        triangulation: Delaunay = None,
+        kriging: OrdinaryKriging = None,
+        idw_options: Optional[Dict] = None,
+        bounded=True
+    ) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        """Interpolate (locations, fields) values at grid points.
+        
+        Returns (points, fields) values and, for ``kriging``, the (points,
+        fields) kriging standard deviation (None for other methods).
+        ``tree``, ``triangulation`` and a fitted ``kriging`` model can be
+        passed in when the same survey locations are interpolated
+        repeatedly (e.g. once per tile). ``idw_options`` overrides
+        IDW_DEFAULTS for ``idw``. ``bounded`` selects the fields that are
+        probabilities (clipped to [0, 1] and pulled toward 0.5 away from
+        the data): True for all, False for none, or a per-field mask such
+        as probability_mask(columns). Other fields are returned as
+        interpolated.
+        """
+        
+        # One KD-tree query gives the nearest-neighbour fallback and the
+        # distance weighting for every field, with memory at O(G + N)
+        tree = tree if tree is not None else cKDTree(survey_coords)
+        min_distances, nearest_idx = tree.query(grid_points, k=1, workers=-1)
+        
+        kriging_std = None
+        if method == 'nearest':
+            grid_values = values[nearest_idx]
+        elif method == 'kriging':
+            kriging = kriging if kriging is not None else OrdinaryKriging(survey_coords, values)
+            grid_values, kriging_std = kriging.predict(grid_points)
+        elif method == 'idw':
+            # Cells with no survey within the search radius fall back to nearest
+            grid_values = GridInterpolator.idw_values(
+                tree, values, grid_points, **{**IDW_DEFAULTS, **(idw_options or {})}
+            )
+            nan_mask = np.isnan(grid_values).any(axis=1)
+            grid_values[nan_mask] = values[nearest_idx[nan_mask]]
+        else:
+            # Linear interpolation with fallback to nearest for points outside convex hull
+            triangulation = triangulation if triangulation is not None else Delaunay(survey_coords)
+            grid_values = LinearNDInterpolator(triangulation, values)(grid_points)
+            nan_mask = np.isnan(grid_values).any(axis=1)
+            grid_values[nan_mask] = values[nearest_idx[nan_mask]]
+        
+        mask = np.broadcast_to(np.asarray(bounded, dtype=bool), (grid_values.shape[1],))
+        grid_values = GridInterpolator.distance_weighted(grid_values, min_distances, max_distance, mask)
+        return grid_values, kriging_std
+    
+    @staticmethod
+    def distance_weighted(
+        grid_values: np.ndarray,
+        min_distances: np.ndarray,
+        max_distance: float = 0.05,
+        mask: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """Clip probabilities to [0, 1] and pull them toward 0.5 away from survey data.
+        
+        ``mask`` (per field) limits this to the probability fields; the
+        others (Std_* spread) are returned unchanged.
+        """
+        
+        mask = np.ones(grid_values.shape[1], dtype=bool) if mask is None else np.asarray(mask, dtype=bool)
+        if not mask.any():
+            return grid_values
+        
+        # Distance-based weighting: reduce confidence for points far from survey data
+        distance_weight = np.exp(-min_distances / (max_distance / 3))[:, None]
+        
+        # Clip to [0, 1] and apply weighting
+        weighted = np.clip(grid_values[:, mask], 0, 1) * distance_weight + 0.5 * (1 - distance_weight)
+        if mask.all():
+            return weighted
+        grid_values = grid_values.copy()
+        grid_values[:, mask] = weighted
+        return grid_values
+    
     def interpolate_to_grid(
         self,
         survey_predictions: pd.DataFrame,
         grid_points: np.ndarray,
         method: str = 'linear',
-        max_distance: float = 0.05  # ~5km
+        max_distance: float = 0.05,  # ~5km
+        idw_options: Optional[Dict] = None
     ) -> pd.DataFrame:
-        """Interpolate survey point predictions to grid using spatial interpolation."""
+        """Interpolate survey point predictions to grid using spatial interpolation.
+        
+        Std_* fields are interpolated like Prob_* fields, but only Prob_*
+        fields are pulled toward 0.5 away from survey points: Std_* stays
+        the interpolated ensemble spread of the nearby surveys, not a
+        blend with the probability background.
+        
+        All fields are interpolated together: duplicate coordinates are
+        averaged, one KD-tree gives nearest neighbours and distances, and for
+        ``linear`` one Delaunay triangulation is shared by every field.
+        
+        ``idw`` weights the k nearest survey locations by 1 / d^power (see
+        IDW_DEFAULTS; ``idw_options`` overrides power, k and radius).
+        ``kriging`` fits a variogram per field (see kriging.py) and adds a
+        KrigStd_* column per Prob_* field; Prob_* ± 1.96 · KrigStd_* is the
+        95% band of the kriged surface (before the distance pull to 0.5).
+        """
         
-        survey_coords = survey_predictions[['longitude', 'latitude']].values
-        prob_columns = [c for c in survey_predictions.columns if c.startswith('Prob_')]
+        prob_columns = field_columns(survey_predictions)
+        survey_coords, values = self.aggregate_locations(survey_predictions, prob_columns)
         
         grid_df = pd.DataFrame({
             'longitude': grid_points[:, 0],
             'latitude': grid_points[:, 1]
         })
         
-        print(f"\nInterpolating {len(prob_columns)} probability fields to grid...")
+        print(f"\nInterpolating {len(prob_columns)} fields to grid "
+              f"({len(survey_coords)} unique survey locations)...")
         
-        for prob_col in prob_columns:
-            print(f"  {prob_col}...", end=' ')
-            
-            values = survey_predictions[prob_col].values
-            
-            # Interpolate using griddata
-            if method == 'nearest':
-                grid_values = griddata(survey_coords, values, grid_points, method='nearest')
-            else:
-                # Linear interpolation with fallback to nearest for points outside convex hull
-                grid_values = griddata(survey_coords, values, grid_points, method='linear')
-                nan_mask = np.isnan(grid_values)
-                if nan_mask.any():
-                    grid_values[nan_mask] = griddata(
-                        survey_coords, values, grid_points[nan_mask], method='nearest'
-                    )
-            
-            # Distance-based weighting: reduce confidence for points far from survey data
-            distances = distance_matrix(grid_points, survey_coords)
-            min_distances = distances.min(axis=1)
-            
-            # Apply distance penalty (exponential decay)
-            distance_weight = np.exp(-min_distances / (max_distance / 3))
-            
-            # Clip to [0, 1] and apply weighting
-            grid_values = np.clip(grid_values, 0, 1)
-            grid_values = grid_values * distance_weight + 0.5 * (1 - distance_weight)
-            
-            grid_df[prob_col] = grid_values
-            print(f"✓ (mean={grid_values.mean():.3f})")
+        kriging = None
+        if method == 'kriging':
+            kriging = OrdinaryKriging(survey_coords, values)
+            kriging.fit()
+            print("Fitted variograms:")
+            print(kriging.summary(prob_columns))
+        
+        grid_values, kriging_std = self.interpolate_values(
+            survey_coords, values, grid_points, method, max_distance,
+            kriging=kriging, idw_options=idw_options, bounded=probability_mask(prob_columns)
+        )
+        
+        for j, prob_col in enumerate(prob_columns):
+            grid_df[prob_col] = grid_values[:, j]
+            print(f"  {prob_col}... ✓ (mean={grid_values[:, j].mean():.3f})")
+        
+        if kriging_std is not None:
+            for j, std_col in kriging_std_columns(prob_columns):
+                grid_df[std_col] = kriging_std[:, j]
+                print(f"  {std_col}... ✓ (mean={kriging_std[:, j].mean():.3f})")
         
         return grid_df
     
-    def smooth_probabilities(self, grid_df: pd.DataFrame, window_size: int = 3) -> pd.DataFrame:
-        """Apply spatial smoothing to reduce noise."""
+    @staticmethod
+    def lattice_index(grid_df: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray, Tuple[int, int], float]:
+        """Row/column of each grid cell on its regular lattice.
+        
+        Works from the coordinates alone, so grids with masked (dropped)
+        cells still map onto the full lattice. Returns rows, cols,
+        (ny, nx) and the lattice spacing in degrees.
+        """
+        lon = grid_df['longitude'].values
+        lat = grid_df['latitude'].values
+        
+        steps = np.concatenate([np.diff(np.unique(lon)), np.diff(np.unique(lat))])
+        steps = steps[steps > 1e-9]
+        resolution = steps.min() if len(steps) else 1.0
+        
+        rows = np.rint((lat - lat.min()) / resolution).astype(int)
+        cols = np.rint((lon - lon.min()) / resolution).astype(int)
+        return rows, cols, (rows.max() + 1, cols.max() + 1), resolution
+    
+    @staticmethod
+    def smoothing_reach(resolution: float, radius: float = 0.01) -> int:
+        """Smoothing kernel half-width in cells (also the halo a tile needs)."""
+        return int(np.ceil(radius / resolution))
+    
+    @classmethod
+    def neighbourhood_sums(
+        cls,
+        raster: np.ndarray,
+        valid: np.ndarray,
+        resolution: float,
+        radius: float = 0.01
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Sum of values and of valid cells within ``radius`` of every cell.
+        
+        ``raster`` and ``valid`` are (ny, nx, fields); cells outside the
+        raster count as missing.
+        """
+        
+        # Circular footprint; the small tolerance keeps cells exactly at radius out
+        reach = cls.smoothing_reach(resolution, radius)
+        di, dj = np.mgrid[-reach:reach + 1, -reach:reach + 1]
+        kernel = (np.hypot(di, dj) * resolution < radius * (1 - 1e-9)).astype(float)[:, :, None]
+        
+        if kernel.size > 49:
+            # Large kernels (fine grids): FFT convolution is much cheaper
+            sums = signal.fftconvolve(raster, kernel, mode='same', axes=(0, 1))
+            counts = np.rint(signal.fftconvolve(valid, kernel, mode='same', axes=(0, 1)))
+        else:
+            sums = ndimage.convolve(raster, kernel, mode='constant', cval=0.0)
+            counts = ndimage.convolve(valid, kernel, mode='constant', cval=0.0)
+        return sums, counts
+    
+    def smooth_probabilities(
+        self,
+        grid_df: pd.DataFrame,
+        window_size: int = 3,
+        radius: float = 0.01  # ~1km
+    ) -> pd.DataFrame:
+        """Apply spatial smoothing to reduce noise.
+        
+        Each cell becomes the mean of the cells within ``radius``. Fields are
+        stacked into a (ny, nx, k) raster and averaged with one normalized
+        convolution over a circular kernel, so cells missing from the grid
+        (masked outside the study area) or NaN never contribute.
+        """
         
-        prob_columns = [c for c in grid_df.columns if c.startswith('Prob_')]
+        prob_columns = field_columns(grid_df)
         
         print(f"\nApplying spatial smoothing (window={window_size})...")
         
+        rows, cols, shape, resolution = self.lattice_index(grid_df)
+        
+        raster = np.zeros(shape + (len(prob_columns),))
+        valid = np.zeros(shape + (len(prob_columns),))
+        values = grid_df[prob_columns].values
+        present = ~np.isnan(values)
+        raster[rows, cols] = np.where(present, values, 0.0)
+        valid[rows, cols] = present
+        
+        sums, counts = self.neighbourhood_sums(raster, valid, resolution, radius)
+        
+        neighbours = counts[rows, cols]
+        smoothed = np.where(
+            (neighbours > 1) & present,
+            sums[rows, cols] / np.maximum(neighbours, 1),
+            values
+        )
+        grid_df[prob_columns] = smoothed
+        
         for prob_col in prob_columns:
-            values = grid_df[prob_col].values
-            
-            # Simple moving average smoothing
-            smoothed = np.copy(values)
-            for i in range(len(values)):
-                # Find nearby points (simple distance-based)
-                coords_i = grid_df.iloc[i][['longitude', 'latitude']].values
-                
-                # Use vectorized distance calculation
-                all_coords = grid_df[['longitude', 'latitude']].values
-                dists = np.sqrt(((all_coords - coords_i) ** 2).sum(axis=1))
-                
-                nearby_idx = dists < 0.01  # ~1km radius
-                if nearby_idx.sum() > 1:
-                    smoothed[i] = values[nearby_idx].mean()
-            
-            grid_df[prob_col] = smoothed
             print(f"  {prob_col}: ✓")
         
         return grid_df
     
-    def export_geojson(
+    def to_raster(self, grid_df: pd.DataFrame, columns: Optional[List[str]] = None) -> Tuple[np.ndarray, Dict]:
+        """Grid fields as a north-up (fields, ny, nx) raster plus georeference.
+        
+        Lattice cells missing from the grid (masked) are NaN. ``columns``
+        defaults to the Prob_*/Std_* fields.
+        """
+        
+        prob_columns = columns if columns is not None else field_columns(grid_df)
+        rows, cols, (ny, nx), resolution = self.lattice_index(grid_df)
+        
+        bands = np.full((len(prob_columns), ny, nx), np.nan, dtype=np.float32)
+        # lattice_index counts rows from the south; rasters are stored north-up
+        bands[:, ny - 1 - rows, cols] = grid_df[prob_columns].values.T
+        
+        west = grid_df['longitude'].min() - resolution / 2
+        north = grid_df['latitude'].max() + resolution / 2
+        return bands, georeference(west, north, resolution, (ny, nx), prob_columns)
+    
+    def export_rasters(
         self,
         grid_df: pd.DataFrame,
-        output_file: str = "data/geojson/AI_Grid_Predictions.geojson"
+        output_dir: str = "data/rasters",
+        name: str = "AI_Grid_Predictions"
     ):
-        """Export grid predictions as GeoJSON."""
+        """Export grid fields as one multi-band raster and Prob_* PNG overlays."""
         
-        features = []
+        bands, georef = self.to_raster(grid_df)
         
-        for _, row in grid_df.iterrows():
-            feature = {
-                "type": "Feature",
-                "geometry": {
-                    "type": "Point",
-                    "coordinates": [row['longitude'], row['latitude']]
-                },
-                "properties": {
-                    col: float(row[col]) 
-                    for col in grid_df.columns 
-                    if col.startswith('Prob_')
-                }
-            }
-            features.append(feature)
-        
-        geojson = {
-            "type": "FeatureCollection",
-            "features": features
-        }
+        written = write_raster(bands, georef, str(Path(output_dir) / name))
+        for i, field in enumerate(georef['bands']):
+            if field.startswith('Prob_'):
+                written += write_overlay(bands[i], georef, field, output_dir)
+        
+        ny, nx = georef['shape']
+        print(f"\n✓ Exported {len(georef['bands'])}-band {nx}x{ny} raster to {output_dir}/")
+        for path in written:
+            print(f"  {path.name}: {path.stat().st_size / 1024:.1f} KB")
+    
+    def export_geojson(
+        self,
+        grid_df: pd.DataFrame,
+        output_file: str = "data/geojson/AI_Grid_Predictions.geojson",
+        coord_precision: int = 5,
+        value_precision: int = 3,
+        drop_no_signal: bool = False,
+        chunk_size: int = 20000,
+        include_spread: bool = False,
+        survey_coords: Optional[np.ndarray] = None,
+        signal_distance: float = 0.05
+    ):
+        """Export grid predictions as GeoJSON, streamed in chunks from numpy arrays.
+        
+        Coordinates and field values are written with fixed precision
+        (5 decimals ≈ 1m; 3 decimals is finer than the PNG overlays).
+        Non-finite values (NaN, ±inf) are written as null. With
+        ``drop_no_signal``, cells farther than ``signal_distance`` from
+        every ``survey_coords`` location are left out: at the default
+        (the interpolation max_distance) the distance weight is e^-3, so
+        their Prob_* values are ≥95% the 0.5 background. Spread fields
+        (Std_*/KrigStd_*) stay in the raster and are only written here
+        with ``include_spread``.
+        """
+        
+        prob_columns = [col for col in field_columns(grid_df)
+                        if include_spread or not col.startswith(SPREAD_PREFIXES)]
+        coords = grid_df[['longitude', 'latitude']].values
+        values = grid_df[prob_columns].values.astype(float)
+        
+        keep = np.ones(len(grid_df), dtype=bool)
+        if drop_no_signal:
+            if survey_coords is None:
+                raise ValueError("drop_no_signal needs the survey_coords to measure distance from")
+            distances, _ = cKDTree(survey_coords).query(coords, k=1, workers=-1)
+            keep = distances <= signal_distance
+        coords, values = coords[keep], values[keep]
+        
+        # One %-template per feature: no per-row dicts or json.dumps calls
+        coordinates = f'[%.{coord_precision}f,%.{coord_precision}f]'
+        template = (
+            '{"type":"Feature","geometry":{"type":"Point","coordinates":%s},"properties":{'
+            + ','.join(f'"{col}":%s' for col in prob_columns)
+            + '}}'
+        )
+        numeric = template % (coordinates, *[f'%.{value_precision}f'] * len(prob_columns))
+        text_cells = template % ('[%s,%s]', *['%s'] * len(prob_columns))
         
         output_path = Path(output_file)
         output_path.parent.mkdir(parents=True, exist_ok=True)
         
-        with open(output_path, 'w') as f:
-            json.dump(geojson, f)
+        with open(output_path, 'w', encoding='utf-8') as f:
+            f.write('{"type":"FeatureCollection","features":[\n')
+            for start in range(0, len(coords), chunk_size):
+                chunk = values[start:start + chunk_size]
+                rows = np.column_stack([coords[start:start + chunk_size], chunk])
+                finite = np.isfinite(chunk)
+                if finite.all():
+                    text = ',\n'.join(numeric % tuple(row) for row in rows.tolist())
+                else:
+                    # Format per value so NaN/±inf become null (not invalid JSON)
+                    cells = np.column_stack([
+                        np.char.mod(f'%.{coord_precision}f', rows[:, :2]),
+                        np.where(finite, np.char.mod(f'%.{value_precision}f', chunk), 'null')
+                    ])
+                    text = ',\n'.join(text_cells % tuple(row) for row in cells.tolist())
+                f.write((',\n' if start else '') + text)
+            f.write('\n]}\n')
+        
+        dropped = f" ({int((~keep).sum())} no-signal cells dropped)" if drop_no_signal else ""
+        print(f"\n✓ Exported {len(coords)} grid points to {output_path}{dropped}")
+        print(f"  File size: {output_path.stat().st_size / 1024:.1f} KB")
+    
+    def export_isobands(
+        self,
+        grid_df: pd.DataFrame,
+        output_file: str = "data/geojson/AI_Grid_Isobands.geojson",
+        breaks: Tuple[float, ...] = DEFAULT_BREAKS,
+        boundary_file: str = "data/geojson/Farmers_Boundary.geojson",
+        simplify_tolerance: float = 0.001  # ~100m
+    ):
+        """Export Prob_* fields as classified isoband polygons.
+        
+        One feature per field and class (``field``/``class``/``lower``/
+        ``upper`` properties), clipped to the survey boundary when the
+        boundary file exists.
+        """
         
-        print(f"\n✓ Exported {len(features)} grid points to {output_path}")
+        if not (HAS_CONTOURPY and HAS_SHAPELY):
+            print("⚠️  contourpy/shapely not available, skipping isobands")
+            return
+        
+        rows, cols, (ny, nx), resolution = self.lattice_index(grid_df)
+        x = grid_df['longitude'].min() + np.arange(nx) * resolution
+        y = grid_df['latitude'].min() + np.arange(ny) * resolution
+        boundary = load_boundary(boundary_file)
+        
+        features = []
+        for col in [c for c in field_columns(grid_df) if c.startswith('Prob_')]:
+            z = np.full((ny, nx), np.nan)
+            z[rows, cols] = grid_df[col].values
+            layer = isoband_features(col, x, y, z, breaks, boundary, simplify_tolerance)
+            features.extend(layer)
+            print(f"  {col}: {len(layer)} classes")
+        
+        output_path = Path(output_file)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(output_path, 'w', encoding='utf-8') as f:
+            json.dump({"type": "FeatureCollection", "features": features}, f, ensure_ascii=False)
+        
+        clipped = "clipped to boundary" if boundary is not None else "no boundary found"
+        print(f"\n✓ Exported {len(features)} isoband features to {output_path} ({clipped})")
         print(f"  File size: {output_path.stat().st_size / 1024:.1f} KB")
     
     def run_pipeline(
         self,
         resolution: float = 0.005,
         interpolation_method: str = 'linear',
-        apply_smoothing: bool = True
+        apply_smoothing: bool = True,
+        export_raster: bool = True,
+        idw_options: Optional[Dict] = None,
+        extent: Optional[Tuple[Tuple[float, float], Tuple[float, float]]] = None,
+        mask_to_boundary: bool = True,
+        buffer: float = 0.02,
+        pyramid: bool = False,
+        pyramid_levels: Optional[int] = None,
+        output_dir: str = "data",
+        export_bands: bool = True,
+        export_spread: bool = False,
+        drop_no_signal: bool = False
     ):
-        """Complete interpolation pipeline."""
+        """Complete interpolation pipeline.
+        
+        ``extent`` = (lon_range, lat_range) fixes the grid rectangle;
+        by default it is derived from the survey boundary plus ``buffer``.
+        With ``pyramid`` the raster also gets 2×2-mean coarser levels
+        (see grid_pyramid.build_pyramid). Outputs go to ``output_dir``/geojson
+        and ``output_dir``/rasters (a staging directory for previews);
+        ``export_bands=False`` skips the isoband polygons; ``export_spread``
+        adds the Std_*/KrigStd_* fields to the point GeoJSON and
+        ``drop_no_signal`` leaves cells far from every survey out of it.
+        """
         
         print("\n=== Starting Grid Interpolation Pipeline ===\n")
         
@@ -243,22 +700,34 @@ class GridInterpolator:
         # Step 2: Predict at survey points
         survey_predictions = self.predict_survey_points()
         
-        # Step 3: Generate grid
-        grid_points = self.generate_grid(resolution=resolution)
+        # Step 3: Generate grid (masked to the buffered survey boundary)
+        boundary = self.study_boundary(buffer=buffer) if mask_to_boundary else None
+        lon_range, lat_range = extent if extent is not None else (None, None)
+        grid_points = self.generate_grid(lon_range, lat_range, resolution=resolution, boundary=boundary)
         
         # Step 4: Interpolate to grid
         grid_df = self.interpolate_to_grid(
             survey_predictions,
             grid_points,
-            method=interpolation_method
+            method=interpolation_method,
+            idw_options=idw_options
         )
         
         # Step 5: Optional smoothing
         if apply_smoothing:
             grid_df = self.smooth_probabilities(grid_df)
         
-        # Step 6: Export GeoJSON
-        self.export_geojson(grid_df)
+        # Step 6: Export GeoJSON (and raster overlays for the map)
+        out = Path(output_dir)
+        self.export_geojson(grid_df, str(out / "geojson" / "AI_Grid_Predictions.geojson"),
+                            include_spread=export_spread, drop_no_signal=drop_no_signal,
+                            survey_coords=survey_predictions[['longitude', 'latitude']].values)
+        if export_raster:
+            self.export_rasters(grid_df, str(out / "rasters"))
+            if pyramid:
+                build_pyramid(str(out / "rasters" / "AI_Grid_Predictions"), pyramid_levels)
+        if export_bands:
+            self.export_isobands(grid_df, str(out / "geojson" / "AI_Grid_Isobands.geojson"))
         
         print("\n=== Grid Interpolation Complete ===")
         
@@ -272,14 +741,242 @@ class GridInterpolator:
             print(f"  Min:  {grid_df[col].min():.3f}")
             print(f"  Max:  {grid_df[col].max():.3f}")
 
+    def run_tiled(
+        self,
+        resolution: float = 0.0005,  # ~50m
+        lon_range: Optional[Tuple[float, float]] = None,
+        lat_range: Optional[Tuple[float, float]] = None,
+        tile_size: int = 512,
+        interpolation_method: str = 'linear',
+        max_distance: float = 0.05,
+        apply_smoothing: bool = True,
+        radius: float = 0.01,
+        workers: Optional[int] = None,
+        output_dir: str = "data/rasters",
+        name: str = "AI_Grid_Predictions",
+        idw_options: Optional[Dict] = None,
+        mask_to_boundary: bool = True,
+        buffer: float = 0.02,
+        pyramid: bool = False,
+        pyramid_levels: Optional[int] = None
+    ) -> Dict:
+        """Tiled, bounded-memory interpolation pipeline writing rasters only.
+        
+        The lattice is the one generate_grid() builds for the same extent
+        (derived from the survey boundary unless ranges are given). Each
+        tile is computed with a halo of smoothing_reach() cells, so
+        smoothing across tile edges sees the same neighbours as a full-grid
+        run; only the tile core is written to the output raster. Cells
+        outside the boundary stay NaN, and tiles entirely outside it are
+        skipped.
+        """
+        
+        print("\n=== Starting Tiled Grid Interpolation ===\n")
+        
+        self.load_data_and_models()
+        survey_predictions = self.predict_survey_points()
+        fields = field_columns(survey_predictions)
+        survey_coords, values = self.aggregate_locations(survey_predictions, fields)
+        
+        # Output bands: interpolated fields, plus KrigStd_* when kriging
+        prob_columns = list(fields)
+        kriging = None
+        if interpolation_method == 'kriging':
+            # Variograms are global: fitted once here, shipped to every worker
+            kriging = OrdinaryKriging(survey_coords, values)
+            kriging.fit()
+            print("Fitted variograms:")
+            print(kriging.summary(fields))
+            prob_columns += [name for _, name in kriging_std_columns(fields)]
+        
+        boundary = self.study_boundary(buffer=buffer) if mask_to_boundary else None
+        if lon_range is None or lat_range is None:
+            lon_range, lat_range = self.grid_extent(resolution, buffer=buffer, boundary=boundary)
+        
+        # Same lattice as np.arange in generate_grid, without materializing it
+        nx = int(np.ceil((lon_range[1] - lon_range[0]) / resolution))
+        ny = int(np.ceil((lat_range[1] - lat_range[0]) / resolution))
+        lattice = (lon_range[0], lat_range[0], resolution, ny, nx)
+        halo = self.smoothing_reach(resolution, radius) if apply_smoothing else 0
+        
+        tiles = [
+            (r0, min(r0 + tile_size, ny), c0, min(c0 + tile_size, nx))
+            for r0 in range(0, ny, tile_size)
+            for c0 in range(0, nx, tile_size)
+        ]
+        print(f"✓ Lattice {nx}x{ny} ({nx * ny:,} cells) in {len(tiles)} tiles of "
+              f"≤{tile_size}x{tile_size} (halo {halo} cells)")
+        
+        georef = georeference(
+            lon_range[0] - resolution / 2,
+            lat_range[0] + (ny - 0.5) * resolution,
+            resolution, (ny, nx), prob_columns
+        )
+        raster_path = create_raster(georef, str(Path(output_dir) / name))
+        
+        start_time = time.time()
+        totals = {col: {'n': 0, 'sum': 0.0, 'sumsq': 0.0, 'min': np.inf, 'max': -np.inf}
+                  for col in prob_columns}
+        init_args = (survey_coords, values, interpolation_method, max_distance,
+                     radius, apply_smoothing, halo, lattice, str(raster_path), fields, kriging,
+                     idw_options, boundary)
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_tile_worker,
+                                 initargs=init_args) as pool:
+            for done, tile_stats in enumerate(pool.map(_process_tile, tiles), start=1):
+                for col, stats in zip(prob_columns, tile_stats):
+                    total = totals[col]
+                    total['n'] += stats[0]
+                    total['sum'] += stats[1]
+                    total['sumsq'] += stats[2]
+                    total['min'] = min(total['min'], stats[3])
+                    total['max'] = max(total['max'], stats[4])
+                if done == len(tiles) or done % max(len(tiles) // 10, 1) == 0:
+                    print(f"  {done}/{len(tiles)} tiles ({time.time() - start_time:.1f}s)")
+        
+        for i, field in enumerate(prob_columns):
+            if field.startswith('Prob_'):
+                # Fresh mapping per band so pages read for one overlay are released
+                raster = np.load(raster_path, mmap_mode='r')
+                write_overlay(raster[i], georef, field, output_dir)
+                del raster
+        
+        print(f"\n✓ Exported {len(prob_columns)}-band {nx}x{ny} raster + overlays to {output_dir}/")
+        print(f"  {raster_path.name}: {raster_path.stat().st_size / 1024 ** 2:.1f} MB")
+        
+        if pyramid:
+            build_pyramid(str(Path(output_dir) / name), pyramid_levels)
+        
+        print("\n=== Tiled Grid Interpolation Complete ===")
+        
+        print("\n=== Grid Statistics ===")
+        summary = {}
+        for col, total in totals.items():
+            if not total['n']:
+                continue
+            mean = total['sum'] / total['n']
+            std = np.sqrt(max(total['sumsq'] / total['n'] - mean ** 2, 0.0))
+            summary[col] = {'mean': mean, 'std': std, 'min': total['min'], 'max': total['max']}
+            if col.startswith('Prob_'):
+                print(f"{col}:")
+                print(f"  Mean: {mean:.3f}")
+                print(f"  Std:  {std:.3f}")
+                print(f"  Min:  {total['min']:.3f}")
+                print(f"  Max:  {total['max']:.3f}")
+        return summary
+
+
+# Per-process state for tiled runs, set once by _init_tile_worker
+_TILE_STATE = {}
+
+
+def _init_tile_worker(survey_coords, values, method, max_distance, radius, smooth, halo,
+                      lattice, raster_path, columns, kriging=None, idw_options=None, boundary=None):
+    """Build the KD-tree/triangulation once per worker."""
+    _TILE_STATE.update(
+        coords=survey_coords,
+        values=values,
+        method=method,
+        max_distance=max_distance,
+        radius=radius,
+        smooth=smooth,
+        halo=halo,
+        lattice=lattice,
+        tree=cKDTree(survey_coords),
+        triangulation=Delaunay(survey_coords) if method == 'linear' else None,
+        columns=columns,
+        kriging=kriging,
+        idw_options=idw_options,
+        boundary=boundary,
+        n_bands=len(columns) + (len(kriging_std_columns(columns)) if kriging is not None else 0),
+        raster_path=raster_path
+    )
+
+
+def _process_tile(tile: Tuple[int, int, int, int]) -> List[Tuple[int, float, float, float, float]]:
+    """Interpolate and smooth one tile plus halo; write its core to the raster.
+    
+    ``tile`` is (row0, row1, col0, col1) on the south-up lattice. Returns
+    per-field (count, sum, sum of squares, min, max) over the core.
+    """
+    state = _TILE_STATE
+    lon0, lat0, resolution, ny, nx = state['lattice']
+    r0, r1, c0, c1 = tile
+    halo = state['halo']
+    hr0, hr1 = max(r0 - halo, 0), min(r1 + halo, ny)
+    hc0, hc1 = max(c0 - halo, 0), min(c1 + halo, nx)
+    
+    lon_mesh, lat_mesh = np.meshgrid(
+        lon0 + np.arange(hc0, hc1) * resolution,
+        lat0 + np.arange(hr0, hr1) * resolution
+    )
+    points = np.column_stack([lon_mesh.ravel(), lat_mesh.ravel()])
+    
+    boundary = state['boundary']
+    inside = (np.ones(len(points), dtype=bool) if boundary is None
+              else shapely.contains_xy(boundary, points[:, 0], points[:, 1]))
+    if not inside.any():
+        # Whole tile (with halo) outside the boundary: raster stays NaN
+        return [(0, 0.0, 0.0, np.inf, -np.inf)] * state['n_bands']
+    
+    values = np.full((len(points), state['n_bands']), np.nan)
+    grid_values, kriging_std = GridInterpolator.interpolate_values(
+        state['coords'], state['values'], points[inside], state['method'], state['max_distance'],
+        tree=state['tree'], triangulation=state['triangulation'], kriging=state['kriging'],
+        idw_options=state['idw_options'], bounded=probability_mask(state['columns'])
+    )
+    if kriging_std is not None:
+        # Band order matches run_tiled: fields, then KrigStd_* per Prob_* field
+        std_idx = [j for j, _ in kriging_std_columns(state['columns'])]
+        grid_values = np.column_stack([grid_values, kriging_std[:, std_idx]])
+    values[inside] = grid_values
+    raster = values.reshape(hr1 - hr0, hc1 - hc0, -1)
+    
+    if state['smooth']:
+        # Same rule as smooth_probabilities: masked cells never contribute
+        valid = ~np.isnan(raster)
+        sums, counts = GridInterpolator.neighbourhood_sums(
+            np.where(valid, raster, 0.0), valid.astype(float), resolution, state['radius']
+        )
+        raster = np.where((counts > 1) & valid, sums / np.maximum(counts, 1), raster)
+    
+    core = raster[r0 - hr0:r1 - hr0, c0 - hc0:c1 - hc0]
+    # Output raster is north-up: flip rows and move fields to the band axis.
+    # Mapped per tile so written pages are released instead of accumulating.
+    out = np.load(state['raster_path'], mmap_mode='r+')
+    out[:, ny - r1:ny - r0, c0:c1] = core[::-1].transpose(2, 0, 1)
+    out.flush()
+    del out
+    
+    stats = []
+    for col in core.reshape(-1, core.shape[-1]).T:
+        col = col[~np.isnan(col)]
+        stats.append((len(col), float(col.sum()), float((col ** 2).sum()),
+                      float(col.min()) if len(col) else np.inf,
+                      float(col.max()) if len(col) else -np.inf))
+    return stats
 
 if __name__ == "__main__":
     import sys
     
     # Parse command line arguments
-    resolution = float(sys.argv[1]) if len(sys.argv) > 1 else 0.005
+    args = [a for a in sys.argv[1:] if not a.startswith('--')]
+    tiled = '--tiled' in sys.argv
+    pyramid = '--pyramid' in sys.argv
+    # e.g. python interpolate_grid.py 0.005 --method=kriging
+    method = next((a.split('=', 1)[1] for a in sys.argv if a.startswith('--method=')), 'linear')
+    resolution = float(args[0]) if args else (0.0005 if tiled else 0.005)
     
     print(f"Grid resolution: {resolution}° (~{resolution * 111:.1f}km)")
     
+    # Extent defaults to the survey boundary; --lebanon fixes it to the whole country
+    extent = LEBANON_EXTENT if '--lebanon' in sys.argv else None
+    
     interpolator = GridInterpolator()
-    interpolator.run_pipeline(resolution=resolution)
+    if tiled:
+        # e.g. python interpolate_grid.py 0.0005 --tiled --lebanon
+        lon_range, lat_range = extent if extent is not None else (None, None)
+        interpolator.run_tiled(resolution=resolution, lon_range=lon_range, lat_range=lat_range,
+                               interpolation_method=method, pyramid=pyramid)
+    else:
+        interpolator.run_pipeline(resolution=resolution, interpolation_method=method, extent=extent,
+                                  pyramid=pyramid)
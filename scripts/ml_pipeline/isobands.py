@@ -0,0 +1,145 @@
+"""
+Isoband Polygons
+=================
+Classify probability grids into filled contour polygons.
+
+Input: Regular-lattice field (ny, nx) + lattice origin/spacing from GridInterpolator
+Output: GeoJSON features, one (Multi)Polygon per field × probability class
+
+Bands are traced with marching squares (contourpy) between consecutive
+breaks, clipped to the study boundary and simplified. When shapely
+supports coverage simplification, all classes of a field are simplified
+together so neighbouring bands keep shared edges (no gaps or overlaps).
+"""
+
+import json
+import numpy as np
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+try:
+    from contourpy import contour_generator, FillType
+    HAS_CONTOURPY = True
+except ImportError:
+    HAS_CONTOURPY = False
+
+try:
+    import shapely
+    from shapely.geometry import Polygon, MultiPolygon, mapping, shape
+    HAS_SHAPELY = True
+except ImportError:
+    HAS_SHAPELY = False
+
+
+# Default class breaks for Prob_* fields
+DEFAULT_BREAKS = (0.2, 0.4, 0.6, 0.8)
+
+
+def band_polygons(x: np.ndarray, y: np.ndarray, z: np.ndarray, lower: float, upper: float):
+    """Filled region lower < z <= upper as a shapely geometry (NaN cells excluded)."""
+
+    generator = contour_generator(
+        x, y, np.ma.masked_invalid(z), fill_type=FillType.OuterOffset
+    )
+    rings_list, offsets_list = generator.filled(lower, upper)
+
+    polygons = []
+    for points, offsets in zip(rings_list, offsets_list):
+        rings = [points[offsets[i]:offsets[i + 1]] for i in range(len(offsets) - 1)]
+        if len(rings[0]) >= 4:
+            polygons.append(Polygon(rings[0], [r for r in rings[1:] if len(r) >= 4]))
+
+    return shapely.make_valid(MultiPolygon(polygons)) if polygons else None
+
+
+def polygonal(geom) -> MultiPolygon:
+    """Polygon parts of a geometry (clipping can leave lines/points on edges)."""
+
+    if geom.geom_type == 'Polygon':
+        return MultiPolygon([geom] if not geom.is_empty else [])
+    if geom.geom_type in ('MultiPolygon', 'GeometryCollection'):
+        return MultiPolygon([p for part in geom.geoms for p in polygonal(part).geoms])
+    return MultiPolygon([])
+
+
+def isoband_features(
+    field: str,
+    x: np.ndarray,
+    y: np.ndarray,
+    z: np.ndarray,
+    breaks: Sequence[float] = DEFAULT_BREAKS,
+    boundary=None,
+    simplify_tolerance: float = 0.001,
+    precision: int = 5
+) -> List[Dict]:
+    """GeoJSON features for one field: one feature per non-empty class.
+
+    ``x``/``y`` are the lattice cell centres (ascending) and ``z`` is the
+    (len(y), len(x)) field with NaN for missing cells. A field with no
+    finite value (e.g. a fully masked tile) gives no features.
+    """
+
+    finite = np.isfinite(z)
+    if not finite.any():
+        print(f"⚠️  {field} has no finite values, skipping isobands")
+        return []
+
+    # Outer edges widened so values exactly at 0 or 1 fall inside a class
+    values = z[finite]
+    edges = [min(0.0, float(values.min())) - 1e-9] + list(breaks) + [max(1.0, float(values.max())) + 1e-9]
+
+    classes, geoms = [], []
+    for i in range(len(edges) - 1):
+        geom = band_polygons(x, y, z, edges[i], edges[i + 1])
+        if geom is None:
+            continue
+        if boundary is not None:
+            geom = geom.intersection(boundary)
+        geom = polygonal(geom)
+        if geom.is_empty:
+            continue
+        classes.append(i)
+        geoms.append(geom)
+
+    if not geoms:
+        return []
+
+    if hasattr(shapely, 'coverage_simplify'):
+        # Shared band edges are traced separately per class; snapping makes
+        # their vertices identical, which coverage simplification requires
+        geoms = shapely.set_precision(np.array(geoms, dtype=object), 1e-9)
+        geoms = list(shapely.coverage_simplify(geoms, simplify_tolerance))
+    else:
+        geoms = [g.simplify(simplify_tolerance, preserve_topology=True) for g in geoms]
+
+    features = []
+    for i, geom in zip(classes, geoms):
+        geom = shapely.transform(geom, lambda c: np.round(c, precision))
+        if geom.is_empty:
+            continue
+        lower = max(edges[i], 0.0)
+        upper = min(edges[i + 1], 1.0)
+        features.append({
+            "type": "Feature",
+            "geometry": mapping(geom),
+            "properties": {
+                "field": field,
+                "class": i,
+                "lower": round(lower, 4),
+                "upper": round(upper, 4),
+                "label": f"{lower:.2f}–{upper:.2f}"
+            }
+        })
+    return features
+
+
+def load_boundary(boundary_file: str) -> Optional[object]:
+    """Union of the polygons in a boundary GeoJSON, or None if unavailable."""
+
+    path = Path(boundary_file)
+    if not path.exists():
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        collection = json.load(f)
+    geoms = [shape(feature['geometry']) for feature in collection.get('features', [])]
+    return shapely.union_all(geoms) if geoms else None
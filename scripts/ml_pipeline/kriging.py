@@ -0,0 +1,199 @@
+"""
+Ordinary Kriging
+=================
+Local-neighbourhood ordinary kriging for survey fields, with kriging variance.
+
+Input: Unique survey coordinates (N, 2) + field values (N, fields)
+Output: Kriged estimates and kriging standard deviation at grid points
+
+The empirical semivariogram is binned from point pairs found with one
+KD-tree range query (sparse_distance_matrix up to the maximum lag), so no
+all-pairs distance matrix is built. Spherical, exponential and gaussian
+models are fitted per field by pair-count-weighted least squares, and the
+best one is kept (``model='auto'``).
+
+Each grid point is solved from its ``n_neighbours`` nearest survey points.
+Points are processed in batches: one KD-tree query per batch, then the
+kriging matrix, which depends only on the neighbour set, is inverted once
+per distinct set in the batch (adjacent cells mostly share one) and applied
+to every point's right-hand side with a single einsum. Memory is bounded by
+the batch size, not by the grid size.
+"""
+
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+from scipy.optimize import curve_fit
+from scipy.spatial import cKDTree
+
+
+def spherical(h, nugget, psill, rng):
+    h = np.minimum(h / rng, 1.0)
+    return nugget + psill * (1.5 * h - 0.5 * h ** 3)
+
+
+def exponential(h, nugget, psill, rng):
+    return nugget + psill * (1.0 - np.exp(-3.0 * h / rng))
+
+
+def gaussian(h, nugget, psill, rng):
+    return nugget + psill * (1.0 - np.exp(-3.0 * (h / rng) ** 2))
+
+
+VARIOGRAM_MODELS = {
+    'spherical': spherical,
+    'exponential': exponential,
+    'gaussian': gaussian
+}
+
+
+class OrdinaryKriging:
+    """Fit semivariograms per field and krige from k nearest neighbours."""
+
+    def __init__(
+        self,
+        coords: np.ndarray,
+        values: np.ndarray,
+        n_neighbours: int = 12,
+        n_lags: int = 12,
+        max_lag: Optional[float] = None,
+        model: str = 'auto',
+        batch_size: int = 4096
+    ):
+        self.coords = np.asarray(coords, dtype=float)
+        self.values = np.asarray(values, dtype=float).reshape(len(self.coords), -1)
+        self.n_neighbours = min(n_neighbours, len(self.coords))
+        self.n_lags = n_lags
+        # Default: half the diagonal of the survey extent
+        extent = self.coords.max(axis=0) - self.coords.min(axis=0)
+        self.max_lag = max_lag if max_lag is not None else float(np.hypot(*extent)) / 2
+        self.model = model
+        self.batch_size = batch_size
+        self.tree = cKDTree(self.coords)
+        self.variograms = []  # per field: {'model', 'params', 'lags', 'gamma', 'counts'}
+
+    def empirical_variogram(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Binned semivariance for all fields.
+
+        Returns lag centres (n_lags,), semivariance (n_lags, fields) and pair
+        counts (n_lags,). Empty bins have zero count.
+        """
+
+        pairs = self.tree.sparse_distance_matrix(self.tree, self.max_lag, output_type='ndarray')
+        pairs = pairs[pairs['i'] < pairs['j']]
+
+        edges = np.linspace(0.0, self.max_lag, self.n_lags + 1)
+        bins = np.clip(np.digitize(pairs['v'], edges) - 1, 0, self.n_lags - 1)
+        counts = np.bincount(bins, minlength=self.n_lags)
+
+        sq_diff = 0.5 * (self.values[pairs['i']] - self.values[pairs['j']]) ** 2
+        gamma = np.zeros((self.n_lags, self.values.shape[1]))
+        np.add.at(gamma, bins, sq_diff)
+        gamma /= np.maximum(counts, 1)[:, None]
+
+        lag_sums = np.bincount(bins, weights=pairs['v'], minlength=self.n_lags)
+        lags = np.where(counts > 0, lag_sums / np.maximum(counts, 1), (edges[:-1] + edges[1:]) / 2)
+        return lags, gamma, counts
+
+    def fit(self) -> List[Dict]:
+        """Fit a variogram model per field (best weighted fit when model='auto')."""
+
+        lags, gamma, counts = self.empirical_variogram()
+        used = counts > 0
+        candidates = list(VARIOGRAM_MODELS) if self.model == 'auto' else [self.model]
+
+        self.variograms = []
+        for f in range(self.values.shape[1]):
+            g = gamma[used, f]
+            variance = max(float(self.values[:, f].var()), 1e-12)
+            best = None
+            for name in candidates:
+                p0 = [0.1 * variance, variance, self.max_lag / 2]
+                bounds = ([0.0, 0.0, 1e-6], [np.inf, np.inf, 4 * self.max_lag])
+                try:
+                    params, _ = curve_fit(
+                        VARIOGRAM_MODELS[name], lags[used], g, p0=p0, bounds=bounds,
+                        sigma=1.0 / np.sqrt(counts[used]), maxfev=5000
+                    )
+                except (RuntimeError, ValueError):
+                    continue
+                sse = float(np.sum(counts[used] * (VARIOGRAM_MODELS[name](lags[used], *params) - g) ** 2))
+                if best is None or sse < best['sse']:
+                    best = {'model': name, 'params': params, 'sse': sse}
+
+            if best is None or best['params'][1] <= 0:
+                # Flat variogram: pure nugget at the sample variance
+                best = {'model': 'spherical', 'params': np.array([variance, 0.0, self.max_lag]), 'sse': 0.0}
+
+            self.variograms.append({
+                **best,
+                'lags': lags[used],
+                'gamma': g,
+                'counts': counts[used]
+            })
+        return self.variograms
+
+    def _semivariance(self, h: np.ndarray) -> np.ndarray:
+        """γ(h) for every field: (fields,) + h.shape; γ(0) = 0."""
+
+        out = np.stack([
+            VARIOGRAM_MODELS[v['model']](h, *v['params']) for v in self.variograms
+        ])
+        return np.where(h > 0, out, 0.0)
+
+    def predict(self, points: np.ndarray, leave_one_out: bool = False) -> Tuple[np.ndarray, np.ndarray]:
+        """Kriged estimates and kriging std at points; both (points, fields).
+
+        With ``leave_one_out`` the points are the survey locations themselves
+        and each is kriged without its own sample (the nearest neighbour is
+        dropped), for cross-validation without refitting.
+        """
+
+        if not self.variograms:
+            self.fit()
+
+        n_fields = self.values.shape[1]
+        k = min(self.n_neighbours, len(self.coords) - 1) if leave_one_out else self.n_neighbours
+        estimates = np.empty((len(points), n_fields))
+        std = np.empty((len(points), n_fields))
+        # Small diagonal jitter keeps nugget-free (gaussian) systems solvable
+        jitter = 1e-10 * max(float(self.values.var(axis=0).max()), 1e-12)
+
+        for start in range(0, len(points), self.batch_size):
+            batch = points[start:start + self.batch_size]
+            _, idx = self.tree.query(batch, k=k + leave_one_out, workers=-1)
+            idx = idx.reshape(len(batch), k + leave_one_out)[:, int(leave_one_out):]
+            # Neighbour order does not matter; sorting lets equal sets share one inverse
+            idx = np.sort(idx, axis=1)
+            sets, inverse = np.unique(idx, axis=0, return_inverse=True)
+            inverse = inverse.ravel()
+
+            nb = self.coords[sets]  # (S, k, 2)
+            between = np.linalg.norm(nb[:, :, None, :] - nb[:, None, :, :], axis=-1)  # (S, k, k)
+            A = np.ones((n_fields, len(sets), k + 1, k + 1))
+            A[:, :, :k, :k] = self._semivariance(between) + jitter * np.eye(k)
+            A[:, :, k, k] = 0.0
+            A_inv = np.linalg.inv(A)  # (F, S, k+1, k+1)
+
+            to_point = np.linalg.norm(self.coords[idx] - batch[:, None, :], axis=-1)  # (B, k)
+            b = np.ones((n_fields, len(batch), k + 1))
+            b[:, :, :k] = self._semivariance(to_point)
+
+            solution = np.einsum('fbij,fbj->fbi', A_inv[:, inverse], b)  # (F, B, k+1)
+            weights, mu = solution[..., :k], solution[..., k]
+
+            z = np.moveaxis(self.values[idx], -1, 0)  # (F, B, k)
+            estimates[start:start + len(batch)] = np.einsum('fbk,fbk->fb', weights, z).T
+            variance = np.einsum('fbk,fbk->fb', weights, b[:, :, :k]) + mu
+            std[start:start + len(batch)] = np.sqrt(np.maximum(variance, 0.0)).T
+
+        return estimates, std
+
+    def summary(self, names: List[str]) -> str:
+        """One line per field describing the fitted variogram."""
+
+        lines = []
+        for name, v in zip(names, self.variograms):
+            nugget, psill, rng = v['params']
+            lines.append(f"  {name}: {v['model']} nugget={nugget:.4f} sill={nugget + psill:.4f} "
+                         f"range={rng:.4f}° ({rng * 111:.1f}km)")
+        return "\n".join(lines)
@@ -0,0 +1,141 @@
+"""
+Prediction Service Load Test
+=============================
+Drive prediction_service.py at a target request rate and report latency.
+
+Input: A running prediction service + prepared dataset (for realistic featureIds)
+Output: Achieved QPS, p50/p90/p99/max latency, error count, cache hit share
+
+Requests are featureId + override what-if queries sampled from the prepared
+data; --repeat-share controls how many repeat an earlier query (cache hits).
+
+Usage:
+    python prediction_service.py &
+    python load_test_service.py --qps 200 --duration 10
+"""
+
+import json
+import time
+import random
+import asyncio
+import argparse
+import pandas as pd
+import numpy as np
+from typing import Dict, List
+
+
+# Actionable features varied in generated what-if queries
+OVERRIDE_CHOICES = {
+    'has_solar': [0, 1],
+    'fertilizer_reliance_score': [0, 1, 2],
+    'pesticide_reliance_score': [0, 1, 2],
+    'regen_technique_count': [0, 1, 2, 3, 4, 5],
+    'water_sufficiency_score': [0, 1, 2, 3, 4],
+}
+
+
+def build_payloads(data_path: str, n: int, repeat_share: float, seed: int = 42) -> List[bytes]:
+    """Generate request bodies; a share of them repeat earlier queries."""
+
+    rng = random.Random(seed)
+    feature_ids = pd.read_csv(data_path)['feature_id'].astype(str).tolist()
+
+    payloads = []
+    for _ in range(n):
+        if payloads and rng.random() < repeat_share:
+            payloads.append(rng.choice(payloads))
+            continue
+        overrides = {
+            name: rng.choice(values)
+            for name, values in rng.sample(sorted(OVERRIDE_CHOICES.items()), k=2)
+        }
+        body = {'featureId': rng.choice(feature_ids), 'overrides': overrides}
+        payloads.append(json.dumps(body).encode('utf-8'))
+    return payloads
+
+
+async def send_request(host: str, port: int, body: bytes) -> Dict:
+    """POST one /predict request on a fresh connection; returns latency and status."""
+
+    start = time.perf_counter()
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        writer.write(
+            f"POST /predict HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode('ascii') + body
+        )
+        await writer.drain()
+        status_line = await reader.readline()
+        response = await reader.read()
+    finally:
+        writer.close()
+
+    status = int(status_line.split()[1]) if status_line else 0
+    payload = response.split(b'\r\n\r\n', 1)[-1]
+    cached = status == 200 and json.loads(payload).get('cached', False)
+    return {'latency': time.perf_counter() - start, 'status': status, 'cached': cached}
+
+
+async def run_load_test(host: str, port: int, qps: float, duration: float, payloads: List[bytes]) -> Dict:
+    """Fire requests on a fixed schedule (open loop) and collect results."""
+
+    n_requests = len(payloads)
+    interval = 1.0 / qps
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+
+    tasks = []
+    for i, body in enumerate(payloads):
+        delay = start + i * interval - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(send_request(host, port, body)))
+
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    elapsed = loop.time() - start
+
+    ok = [r for r in results if isinstance(r, dict) and r['status'] == 200]
+    latencies_ms = np.array([r['latency'] for r in ok]) * 1000.0
+    return {
+        'requests': n_requests,
+        'errors': n_requests - len(ok),
+        'target_qps': qps,
+        'achieved_qps': n_requests / elapsed if elapsed > 0 else 0.0,
+        'p50_ms': float(np.percentile(latencies_ms, 50)) if len(ok) else None,
+        'p90_ms': float(np.percentile(latencies_ms, 90)) if len(ok) else None,
+        'p99_ms': float(np.percentile(latencies_ms, 99)) if len(ok) else None,
+        'max_ms': float(latencies_ms.max()) if len(ok) else None,
+        'cache_hit_share': (sum(r['cached'] for r in ok) / len(ok)) if ok else 0.0
+    }
+
+
+def main():
+    """CLI entry point."""
+
+    parser = argparse.ArgumentParser(description="Load test for prediction_service.py")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--qps', type=float, default=200.0, help='Target requests per second')
+    parser.add_argument('--duration', type=float, default=10.0, help='Test length in seconds')
+    parser.add_argument('--repeat-share', type=float, default=0.3, help='Share of repeated queries')
+    parser.add_argument('--data', default='data/ml_prepared_data.csv', help='Prepared dataset')
+    args = parser.parse_args()
+
+    payloads = build_payloads(args.data, int(args.qps * args.duration), args.repeat_share)
+    print(f"Load test: {len(payloads)} requests at {args.qps:.0f} QPS against {args.host}:{args.port}")
+
+    stats = asyncio.run(run_load_test(args.host, args.port, args.qps, args.duration, payloads))
+
+    print("\n=== Load Test Results ===")
+    print(f"  Requests:      {stats['requests']} ({stats['errors']} errors)")
+    print(f"  Achieved QPS:  {stats['achieved_qps']:.1f} (target {stats['target_qps']:.0f})")
+    if stats['p50_ms'] is not None:
+        print(f"  Latency p50:   {stats['p50_ms']:.2f} ms")
+        print(f"  Latency p90:   {stats['p90_ms']:.2f} ms")
+        print(f"  Latency p99:   {stats['p99_ms']:.2f} ms")
+        print(f"  Latency max:   {stats['max_ms']:.2f} ms")
+    print(f"  Cache hits:    {stats['cache_hit_share'] * 100:.1f}%")
+
+
+if __name__ == "__main__":
+    main()
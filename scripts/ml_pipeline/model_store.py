@@ -0,0 +1,110 @@
+"""
+Persisted Model Store
+======================
+Shared loading of the artefacts written at training time.
+
+Input: data/models/ (target_*_model.joblib, feature_list.json)
+Output: Feature list and fitted models keyed by short layer name (Regen, Water, ...)
+"""
+
+import json
+from pathlib import Path
+from typing import Dict, List
+import numpy as np
+import joblib
+import warnings
+warnings.filterwarnings('ignore')
+
+
+# Training target → short layer name used in grid fields (Prob_Regen, ...)
+TARGET_SHORT_NAMES = {
+    'target_regen_adoption': 'Regen',
+    'target_water_risk': 'Water',
+    'target_economic_vuln': 'Econ',
+    'target_labor_shortage': 'Labor',
+    'target_climate_vuln': 'Climate'
+}
+
+
+def load_feature_list(models_dir: str = "data/models") -> List[str]:
+    """Load the ordered model feature columns from feature_list.json."""
+
+    features_file = Path(models_dir) / "feature_list.json"
+    if not features_file.exists():
+        raise FileNotFoundError(f"Feature list not found: {features_file}")
+
+    with open(features_file, 'r') as f:
+        return json.load(f)['features']
+
+
+def load_target_models(models_dir: str = "data/models", verbose: bool = True) -> Dict[str, object]:
+    """Load every available target model, keyed by short layer name."""
+
+    models = {}
+    for target, short_name in TARGET_SHORT_NAMES.items():
+        model_file = Path(models_dir) / f"{target}_model.joblib"
+        if model_file.exists():
+            models[short_name] = joblib.load(model_file)
+            if verbose:
+                print(f"✓ Loaded model: {short_name}")
+        elif verbose:
+            print(f"⚠️  Model not found: {model_file.name}")
+
+    if not models:
+        raise ValueError("No models loaded")
+
+    return models
+
+
+class FlatForest:
+    """RandomForest packed into flat node arrays for fast small-batch inference.
+    
+    All trees are walked together level by level with numpy indexing, which
+    avoids the per-call and per-tree overhead of ``predict_proba`` when a
+    request batch has only a handful of rows. Results match ``predict_proba``.
+    """
+
+    def __init__(self, model):
+        trees = [estimator.tree_ for estimator in model.estimators_]
+        offsets = np.cumsum([0] + [tree.node_count for tree in trees[:-1]])
+
+        left, right, feature, threshold, positive = [], [], [], [], []
+        for tree, offset in zip(trees, offsets):
+            node_ids = np.arange(tree.node_count) + offset
+            is_leaf = tree.children_left == -1
+            # Leaves point at themselves so extra levels are no-ops
+            left.append(np.where(is_leaf, node_ids, tree.children_left + offset))
+            right.append(np.where(is_leaf, node_ids, tree.children_right + offset))
+            feature.append(np.where(is_leaf, 0, tree.feature))
+            threshold.append(np.where(is_leaf, 0.0, tree.threshold))
+            counts = tree.value[:, 0, :]
+            positive.append(counts[:, 1] / counts.sum(axis=1))
+
+        self.roots = offsets
+        self.left = np.concatenate(left)
+        self.right = np.concatenate(right)
+        self.feature = np.concatenate(feature)
+        self.threshold = np.concatenate(threshold)
+        self.positive = np.concatenate(positive)
+        self.depth = max(tree.max_depth for tree in trees)
+
+    def predict_proba(self, X) -> np.ndarray:
+        # Trees compare float32-cast inputs, as in sklearn
+        X = np.asarray(X, dtype=np.float32).astype(np.float64)
+        rows = np.arange(len(X))[None, :]
+        node = np.repeat(self.roots[:, None], len(X), axis=1)  # (n_trees, n_rows)
+        for _ in range(self.depth):
+            go_left = X[rows, self.feature[node]] <= self.threshold[node]
+            node = np.where(go_left, self.left[node], self.right[node])
+        proba = self.positive[node].mean(axis=0)
+        return np.column_stack([1 - proba, proba])
+
+
+def compile_model(model):
+    """Return a FlatForest for RandomForest-style models, else the model itself."""
+
+    estimators = getattr(model, 'estimators_', None)
+    if estimators is not None and all(hasattr(e, 'tree_') for e in estimators) \
+            and len(getattr(model, 'classes_', [])) == 2:
+        return FlatForest(model)
+    return model
@@ -0,0 +1,335 @@
+"""
+Local Prediction Service
+=========================
+Low-latency what-if predictions over HTTP, with the models kept warm.
+
+Input: Prepared dataset + trained models + feature_list.json (loaded once at startup)
+Output: JSON probabilities per target for each request
+
+Endpoints (bound to 127.0.0.1 by default):
+    GET  /health    → {"status": "ok", "models": [...], "features": [...]}
+    POST /predict   → body is either
+                        {"features": {"has_solar": 1, ...}}   (missing features use medians)
+                        {"features": [0.0, 1.0, ...]}         (full vector, feature_list order)
+                        {"featureId": "Water_0_ad3baeef", "overrides": {"has_solar": 1}}
+                      response {"Prob_Regen": 0.41, ..., "cached": false}
+
+Concurrent requests are coalesced into micro-batches so each model runs one
+predict_proba per batch, and an LRU cache answers repeated queries without
+touching the models. RandomForest models are flattened (model_store.FlatForest)
+so a micro-batch costs well under a millisecond. Uses only the standard
+library for HTTP (asyncio streams).
+"""
+
+import json
+import asyncio
+import argparse
+from collections import OrderedDict
+import pandas as pd
+import numpy as np
+from pathlib import Path
+from typing import Dict, Optional
+import warnings
+warnings.filterwarnings('ignore')
+
+from model_store import load_feature_list, load_target_models, compile_model
+
+
+class LRUCache:
+    """Fixed-size least-recently-used cache for prediction results."""
+
+    def __init__(self, max_size: int = 4096):
+        self.max_size = max_size
+        self._items = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key) -> Optional[Dict]:
+        if key in self._items:
+            self._items.move_to_end(key)
+            self.hits += 1
+            return self._items[key]
+        self.misses += 1
+        return None
+
+    def put(self, key, value: Dict):
+        self._items[key] = value
+        self._items.move_to_end(key)
+        if len(self._items) > self.max_size:
+            self._items.popitem(last=False)
+
+
+class MicroBatcher:
+    """Coalesce concurrent prediction requests into batched predict_proba calls."""
+
+    def __init__(self, models: Dict[str, object], max_batch: int = 64, max_wait_ms: float = 2.0):
+        self.models = models
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self.queue = None
+        self.batches = 0
+        self.rows = 0
+
+    def start(self):
+        """Start the background batching task on the running loop."""
+        self.queue = asyncio.Queue()
+        return asyncio.get_running_loop().create_task(self._run())
+
+    async def predict(self, vector: np.ndarray) -> Dict[str, float]:
+        """Queue one feature vector and wait for its batched result."""
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((vector, future))
+        return await future
+
+    def _predict_batch(self, X: np.ndarray) -> Dict[str, np.ndarray]:
+        return {name: model.predict_proba(X)[:, 1] for name, model in self.models.items()}
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            items = [await self.queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(items) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    items.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            X = np.vstack([vector for vector, _ in items])
+            try:
+                # Off the event loop so new requests keep queueing during inference
+                probabilities = await loop.run_in_executor(None, self._predict_batch, X)
+            except Exception as e:
+                for _, future in items:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            self.batches += 1
+            self.rows += len(items)
+            for i, (_, future) in enumerate(items):
+                if not future.done():
+                    future.set_result({
+                        f'Prob_{name}': round(float(proba[i]), 4)
+                        for name, proba in probabilities.items()
+                    })
+
+
+class PredictionService:
+    """HTTP front end: request parsing, caching and micro-batched inference."""
+
+    def __init__(
+        self,
+        data_path: str = "data/ml_prepared_data.csv",
+        models_dir: str = "data/models",
+        max_batch: int = 64,
+        max_wait_ms: float = 2.0,
+        cache_size: int = 4096
+    ):
+        self.data_path = Path(data_path)
+        self.models_dir = Path(models_dir)
+        self.features = []
+        self.feature_index = {}
+        self.models = {}
+        self.defaults = None
+        self.farmers = {}
+        self.cache = LRUCache(cache_size)
+        self.max_batch = max_batch
+        self.max_wait_ms = max_wait_ms
+        self.batcher = None
+
+    def load(self):
+        """Load models, feature list and per-farmer vectors once."""
+
+        self.features = load_feature_list(self.models_dir)
+        self.feature_index = {name: i for i, name in enumerate(self.features)}
+        # Forests are flattened once; small batches then skip predict_proba overhead
+        self.models = {
+            name: compile_model(model)
+            for name, model in load_target_models(self.models_dir).items()
+        }
+
+        if not self.data_path.exists():
+            raise FileNotFoundError(f"Data not found: {self.data_path}")
+        df = pd.read_csv(self.data_path)
+        X = df[self.features].astype(float)
+        self.defaults = X.median().values
+        self.farmers = dict(zip(df['feature_id'].astype(str), X.values))
+        print(f"✓ Indexed {len(self.farmers)} farmers by featureId")
+
+        # Warm-up pass so the first request does not pay lazy initialisation
+        self.batcher = MicroBatcher(self.models, self.max_batch, self.max_wait_ms)
+        self.batcher._predict_batch(self.defaults.reshape(1, -1))
+
+    @staticmethod
+    def _as_float(name: str, value) -> float:
+        """Validate one feature value from a request body."""
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise ValueError(f"Feature {name} must be a number, got {type(value).__name__}")
+        if not np.isfinite(value):
+            raise ValueError(f"Feature {name} must be finite")
+        return float(value)
+
+    def build_vector(self, payload: Dict) -> np.ndarray:
+        """Turn a request body into a feature vector in feature_list order."""
+
+        if not isinstance(payload, dict):
+            raise ValueError("Body must be a JSON object")
+
+        if 'featureId' in payload:
+            base = self.farmers.get(str(payload['featureId']))
+            if base is None:
+                raise KeyError(f"Unknown featureId: {payload['featureId']}")
+            vector = base.copy()
+            updates = payload.get('overrides', {})
+            if not isinstance(updates, dict):
+                raise ValueError("'overrides' must be an object of feature values")
+        elif isinstance(payload.get('features'), list):
+            if len(payload['features']) != len(self.features):
+                raise ValueError(f"Expected {len(self.features)} feature values")
+            values = [self._as_float(name, value) for name, value in zip(self.features, payload['features'])]
+            return np.asarray(values, dtype=float).reshape(1, -1)
+        elif isinstance(payload.get('features'), dict):
+            vector = self.defaults.copy()
+            updates = payload['features']
+        else:
+            raise ValueError("Body needs 'features' (list or object) or 'featureId'")
+
+        unknown = [name for name in updates if name not in self.feature_index]
+        if unknown:
+            raise ValueError(f"Unknown features: {unknown}")
+        for name, value in updates.items():
+            vector[self.feature_index[name]] = self._as_float(name, value)
+        return vector.reshape(1, -1)
+
+    async def predict(self, payload: Dict) -> Dict:
+        """Cached, micro-batched prediction for one request body."""
+
+        vector = self.build_vector(payload)
+        key = np.round(vector, 6).tobytes()
+        cached = self.cache.get(key)
+        if cached is not None:
+            return {**cached, 'cached': True}
+
+        result = await self.batcher.predict(vector)
+        self.cache.put(key, result)
+        return {**result, 'cached': False}
+
+    def health(self) -> Dict:
+        return {
+            'status': 'ok',
+            'models': list(self.models),
+            'features': self.features,
+            'cache': {'hits': self.cache.hits, 'misses': self.cache.misses},
+            'batches': self.batcher.batches,
+            'batched_rows': self.batcher.rows
+        }
+
+    @staticmethod
+    def _response(status: int, body: Dict, keep_alive: bool) -> bytes:
+        reasons = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed'}
+        payload = json.dumps(body).encode('utf-8')
+        headers = (
+            f"HTTP/1.1 {status} {reasons.get(status, 'Error')}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(payload)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+        )
+        return headers.encode('ascii') + payload
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Serve HTTP/1.1 requests on one (keep-alive) connection."""
+
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, path, _ = request_line.decode('ascii').split(' ', 2)
+                except ValueError:
+                    writer.write(self._response(400, {'error': 'Malformed request line'}, False))
+                    break
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                body = b''
+                if 'content-length' in headers:
+                    length = headers['content-length']
+                    if not length.isdigit():
+                        # Body framing is unknown, so the connection cannot be reused
+                        writer.write(self._response(400, {'error': f'Invalid Content-Length: {length!r}'}, False))
+                        break
+                    body = await reader.readexactly(int(length))
+                keep_alive = headers.get('connection', '').lower() != 'close'
+
+                if path == '/health' and method == 'GET':
+                    status, result = 200, self.health()
+                elif path == '/predict' and method == 'POST':
+                    try:
+                        status, result = 200, await self.predict(json.loads(body or b'{}'))
+                    except (KeyError, ValueError, TypeError, AttributeError) as e:
+                        status, result = 400, {'error': str(e).strip('"')}
+                elif path in ('/health', '/predict'):
+                    status, result = 405, {'error': f'{method} not allowed on {path}'}
+                else:
+                    status, result = 404, {'error': f'Unknown path {path}'}
+
+                writer.write(self._response(status, result, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionResetError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host: str = '127.0.0.1', port: int = 8765):
+        """Run the service until cancelled."""
+
+        if self.batcher is None:
+            self.load()
+        batch_task = self.batcher.start()
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        print(f"✓ Prediction service listening on http://{host}:{port} "
+              f"(batch≤{self.max_batch}, wait {self.max_wait_ms}ms, cache {self.cache.max_size})")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            batch_task.cancel()
+
+
+def main():
+    """CLI entry point."""
+
+    parser = argparse.ArgumentParser(description="Local low-latency prediction service")
+    parser.add_argument('--host', default='127.0.0.1', help='Bind address (default: local only)')
+    parser.add_argument('--port', type=int, default=8765, help='Port (default: 8765)')
+    parser.add_argument('--max-batch', type=int, default=64, help='Maximum micro-batch size')
+    parser.add_argument('--max-wait-ms', type=float, default=2.0, help='Micro-batch collection window')
+    parser.add_argument('--cache-size', type=int, default=4096, help='LRU cache entries')
+    args = parser.parse_args()
+
+    service = PredictionService(
+        max_batch=args.max_batch,
+        max_wait_ms=args.max_wait_ms,
+        cache_size=args.cache_size
+    )
+    try:
+        asyncio.run(service.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        print("\n✓ Prediction service stopped")
+
+
+if __name__ == "__main__":
+    main()
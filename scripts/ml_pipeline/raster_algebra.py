@@ -0,0 +1,327 @@
+"""
+Raster Algebra
+===============
+Composite risk layers from expressions over the grid's Prob_* fields.
+
+Input: data/rasters/AI_Grid_Predictions.npy + .json (or the grid GeoJSON)
+       optional JSON list of layer definitions
+Output: data/rasters/composites/Composites.npy + .json   one band per layer
+        data/rasters/composites/Comp_<name>.png + .json  overlays
+        data/geojson/AI_Grid_Composites.geojson           Comp_* per grid cell
+
+Layer file format (JSON list, evaluated in order):
+
+    [
+      {"name": "Compound_Risk",
+       "label": "Weighted water / climate / economic risk",
+       "expression": "weighted(Prob_Water, 0.4, Prob_Climate, 0.4, Prob_Econ, 0.2)"},
+      {"name": "Hotspot",
+       "expression": "mask(Compound_Risk, Compound_Risk >= 0.6)"}
+    ]
+
+Expressions use the raster's band names (Prob_*, Std_*, KrigStd_*) and
+earlier layers by name, numbers, ``nan``, the operators ``+ - * / **``,
+comparisons (``<`` ``>=`` ..., chains allowed), ``&`` ``|`` ``~`` (or
+``and`` ``or`` ``not``) and these functions:
+    - where(cond, a, b), mask(x, cond): x where cond, else no data
+    - threshold(x, t): 1 where x >= t, else 0
+    - weighted(x1, w1, x2, w2, ...): sum(w·x) / sum(w)
+    - clip(x, lo, hi), min(...), max(...), mean(...)
+    - abs, sqrt, exp, log
+
+Expressions are parsed with ``ast`` and only the nodes above are accepted
+(no attribute access, subscripts or other names; function names only as
+calls, with the right number of arguments), then evaluated as whole
+(ny, nx) numpy arrays. Boolean results become 1/0. Cells that are no data
+in every input band (outside the grid mask) stay NaN. Overlays use the
+[0, 1] ramp of the probability layers; values outside it are clipped in
+the PNG only.
+"""
+
+import ast
+import json
+import time
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from interpolate_grid import GridInterpolator
+from raster_io import write_raster, write_overlay, read_raster
+
+
+DEFAULT_LAYERS = [
+    {
+        'name': 'Compound_Risk',
+        'label': 'Weighted water / climate / economic risk',
+        'expression': 'weighted(Prob_Water, 0.4, Prob_Climate, 0.4, Prob_Econ, 0.2)'
+    },
+    {
+        'name': 'Risk_Count',
+        'label': 'Share of risks above 0.6',
+        'expression': '(threshold(Prob_Water, 0.6) + threshold(Prob_Climate, 0.6) + threshold(Prob_Econ, 0.6)) / 3'
+    },
+    {
+        'name': 'Water_Climate_Hotspot',
+        'label': 'Joint water and climate risk where both exceed 0.6',
+        'expression': 'mask(Prob_Water * Prob_Climate, (Prob_Water >= 0.6) & (Prob_Climate >= 0.6))'
+    },
+    {
+        'name': 'Regen_Opportunity',
+        'label': 'Climate-vulnerable and not yet adopting regenerative practices',
+        'expression': 'Prob_Climate * (1 - Prob_Regen)'
+    },
+]
+
+# Layer names are prefixed in the outputs so they count as grid fields
+LAYER_PREFIX = 'Comp_'
+
+
+def _variadic(reduce: Callable) -> Callable:
+    def apply(*args):
+        if not args:
+            raise ValueError("expects at least one argument")
+        return reduce(np.broadcast_arrays(*args))
+    return apply
+
+
+def _weighted(*args):
+    if not args or len(args) % 2:
+        raise ValueError("weighted() expects value, weight pairs")
+    values, weights = args[0::2], args[1::2]
+    return sum(w * v for v, w in zip(values, weights)) / sum(weights)
+
+
+FUNCTIONS = {
+    'where': lambda cond, a, b: np.where(cond, a, b),
+    'mask': lambda x, cond: np.where(cond, x, np.nan),
+    'threshold': lambda x, t: np.where(np.isnan(x), np.nan, x >= t),
+    'weighted': _weighted,
+    'clip': lambda x, lo, hi: np.clip(x, lo, hi),
+    'min': _variadic(lambda arrays: np.minimum.reduce(arrays)),
+    'max': _variadic(lambda arrays: np.maximum.reduce(arrays)),
+    'mean': _variadic(lambda arrays: np.add.reduce(arrays) / len(arrays)),
+    'abs': np.abs,
+    'sqrt': np.sqrt,
+    'exp': np.exp,
+    'log': np.log,
+}
+
+# (min, max) positional arguments; max None = any number
+ARITY = {
+    'where': (3, 3), 'mask': (2, 2), 'threshold': (2, 2), 'weighted': (2, None), 'clip': (3, 3),
+    'min': (1, None), 'max': (1, None), 'mean': (1, None),
+    'abs': (1, 1), 'sqrt': (1, 1), 'exp': (1, 1), 'log': (1, 1),
+}
+
+CONSTANTS = {'nan': np.nan}
+
+BINARY_OPS = {
+    ast.Add: np.add, ast.Sub: np.subtract, ast.Mult: np.multiply,
+    ast.Div: np.divide, ast.Pow: np.power,
+    ast.BitAnd: np.logical_and, ast.BitOr: np.logical_or,
+}
+UNARY_OPS = {ast.USub: np.negative, ast.UAdd: np.positive, ast.Invert: np.logical_not, ast.Not: np.logical_not}
+COMPARE_OPS = {
+    ast.Lt: np.less, ast.LtE: np.less_equal, ast.Gt: np.greater,
+    ast.GtE: np.greater_equal, ast.Eq: np.equal, ast.NotEq: np.not_equal,
+}
+BOOL_OPS = {ast.And: np.logical_and, ast.Or: np.logical_or}
+
+
+def parse_expression(expression: str) -> Tuple[ast.AST, List[str]]:
+    """Parse and check one expression; returns the tree and the names it reads."""
+
+    tree = ast.parse(expression, mode='eval')
+    names, callees = [], set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Call):
+            if not isinstance(node.func, ast.Name) or node.func.id not in FUNCTIONS or node.keywords:
+                raise ValueError(f"unsupported call in {expression!r}")
+            name, count = node.func.id, len(node.args)
+            low, high = ARITY[name]
+            if count < low or (high is not None and count > high):
+                expected = f"{low}" if low == high else f"at least {low}" if high is None else f"{low}-{high}"
+                raise ValueError(f"{name}() takes {expected} argument(s), got {count} in {expression!r}")
+            if name == 'weighted' and count % 2:
+                raise ValueError(f"weighted() expects value, weight pairs in {expression!r}")
+            callees.add(id(node.func))
+        elif isinstance(node, ast.Name):
+            if node.id in FUNCTIONS:
+                if id(node) not in callees:
+                    raise ValueError(f"function {node.id} used as a value in {expression!r}")
+            elif node.id not in CONSTANTS:
+                names.append(node.id)
+        elif isinstance(node, ast.Constant):
+            if isinstance(node.value, bool) or not isinstance(node.value, (int, float)):
+                raise ValueError(f"only numeric constants are allowed in {expression!r}")
+        elif not isinstance(node, (ast.Expression, ast.BinOp, ast.UnaryOp, ast.Compare, ast.BoolOp,
+                                   ast.Load, *BINARY_OPS, *UNARY_OPS, *COMPARE_OPS, *BOOL_OPS)):
+            raise ValueError(f"unsupported syntax ({type(node).__name__}) in {expression!r}")
+    return tree, list(dict.fromkeys(names))
+
+
+def evaluate(node: ast.AST, fields: Dict[str, np.ndarray]):
+    """Evaluate a checked expression tree over whole arrays."""
+
+    if isinstance(node, ast.Expression):
+        return evaluate(node.body, fields)
+    if isinstance(node, ast.Constant):
+        return float(node.value)
+    if isinstance(node, ast.Name):
+        return CONSTANTS[node.id] if node.id in CONSTANTS else fields[node.id]
+    if isinstance(node, ast.BinOp):
+        return BINARY_OPS[type(node.op)](evaluate(node.left, fields), evaluate(node.right, fields))
+    if isinstance(node, ast.UnaryOp):
+        return UNARY_OPS[type(node.op)](evaluate(node.operand, fields))
+    if isinstance(node, ast.BoolOp):
+        values = [evaluate(v, fields) for v in node.values]
+        return BOOL_OPS[type(node.op)].reduce(np.broadcast_arrays(*values))
+    if isinstance(node, ast.Compare):
+        # a < b <= c → (a < b) & (b <= c)
+        left, result = evaluate(node.left, fields), True
+        for op, comparator in zip(node.ops, node.comparators):
+            right = evaluate(comparator, fields)
+            result = np.logical_and(result, COMPARE_OPS[type(op)](left, right))
+            left = right
+        return result
+    return FUNCTIONS[node.func.id](*[evaluate(arg, fields) for arg in node.args])
+
+
+class RasterAlgebra:
+    """Evaluate composite layer expressions over grid raster bands."""
+
+    def __init__(self, raster_stem: str = "data/rasters/AI_Grid_Predictions",
+                 grid_file: str = "data/geojson/AI_Grid_Predictions.geojson"):
+        self.raster_stem = raster_stem
+        self.grid_file = grid_file
+        self.fields = {}
+        self.georef = None
+
+    @staticmethod
+    def load_layers(layer_file: Optional[str] = None) -> List[Dict]:
+        """Load layer definitions from a JSON file, or return the built-in list."""
+
+        if layer_file is None:
+            return DEFAULT_LAYERS
+
+        with open(layer_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def load_fields(self):
+        """Grid bands as (ny, nx) arrays, from the raster or else the grid GeoJSON."""
+
+        if Path(self.raster_stem).with_suffix('.npy').exists():
+            bands, self.georef = read_raster(self.raster_stem)
+            source = self.raster_stem + '.npy'
+        else:
+            # Point grid: rebuild the lattice from cell centres
+            with open(self.grid_file, 'r', encoding='utf-8') as f:
+                features = json.load(f)['features']
+            grid_df = pd.DataFrame([
+                {'longitude': ft['geometry']['coordinates'][0], 'latitude': ft['geometry']['coordinates'][1],
+                 **ft['properties']}
+                for ft in features
+            ]).astype(float)
+            bands, self.georef = GridInterpolator().to_raster(grid_df)
+            source = self.grid_file
+
+        self.fields = {name: bands[i] for i, name in enumerate(self.georef['bands'])}
+        ny, nx = self.georef['shape']
+        print(f"✓ Loaded {len(self.fields)} bands ({nx}x{ny}) from {source}")
+
+    def evaluate_layers(self, layers: List[Dict]) -> Dict[str, np.ndarray]:
+        """Evaluate layers in order; later layers may use earlier ones by name."""
+
+        nodata = np.logical_and.reduce([np.isnan(band) for band in self.fields.values()])
+        scope = dict(self.fields)
+        results = {}
+
+        print(f"\nEvaluating {len(layers)} composite layers...")
+        for layer in layers:
+            name, expression = layer['name'], layer['expression']
+            try:
+                tree, names = parse_expression(expression)
+            except (SyntaxError, ValueError) as e:
+                print(f"⚠️  {name}: {e}")
+                continue
+            missing = [n for n in names if n not in scope]
+            if missing:
+                print(f"⚠️  {name}: unknown field(s) {', '.join(missing)}, skipping")
+                continue
+
+            start = time.perf_counter()
+            try:
+                with np.errstate(invalid='ignore', divide='ignore'):
+                    value = np.asarray(evaluate(tree, scope), dtype=np.float32)
+                value = np.where(nodata, np.nan, np.broadcast_to(value, nodata.shape)).astype(np.float32)
+            except Exception as e:
+                # Checks in parse_expression catch the usual mistakes; never abort the other layers
+                print(f"⚠️  {name}: evaluation failed ({type(e).__name__}: {e}), skipping")
+                continue
+            elapsed = (time.perf_counter() - start) * 1000
+
+            scope[name] = value
+            results[name] = value
+            valid = value[~np.isnan(value)]
+            mean = f"mean={valid.mean():.3f}" if valid.size else "no data"
+            print(f"  {name}: {mean}  ({elapsed:.1f} ms)")
+
+        return results
+
+    def export(self, results: Dict[str, np.ndarray], output_dir: str = "data"):
+        """Write the layers as a raster stack, overlays and grid GeoJSON."""
+
+        out = Path(output_dir)
+        raster_dir = out / "rasters" / "composites"
+        names = [LAYER_PREFIX + name for name in results]
+        bands = np.stack(list(results.values()))
+        georef = {key: value for key, value in self.georef.items() if key not in ('file', 'dtype')}
+        georef['bands'] = names
+
+        write_raster(bands, georef, str(raster_dir / "Composites"))
+        for band, name in zip(bands, names):
+            write_overlay(band, georef, name, str(raster_dir))
+        print(f"\n✓ Exported {len(names)}-band composite raster + overlays to {raster_dir}")
+
+        # Cell centres of every cell with data in any layer
+        ny, nx = georef['shape']
+        west, _, _, north = georef['bounds']
+        resolution = georef['resolution']
+        rows, cols = np.nonzero(~np.isnan(bands).all(axis=0))
+        grid_df = pd.DataFrame({
+            'longitude': west + (cols + 0.5) * resolution,
+            'latitude': north - (rows + 0.5) * resolution
+        })
+        grid_df[names] = bands[:, rows, cols].T
+        GridInterpolator().export_geojson(grid_df, str(out / "geojson" / "AI_Grid_Composites.geojson"))
+
+    def run_pipeline(self, layer_file: Optional[str] = None, output_dir: str = "data") -> Dict[str, np.ndarray]:
+        """Load grid bands → evaluate layers → export."""
+
+        print("\n=== Starting Raster Algebra ===\n")
+
+        self.load_fields()
+        layers = self.load_layers(layer_file)
+
+        start = time.perf_counter()
+        results = self.evaluate_layers(layers)
+        print(f"✓ Evaluated {len(results)} layers in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+        if results:
+            self.export(results, output_dir)
+        else:
+            print("⚠️  No layers evaluated, nothing exported")
+
+        print("\n=== Raster Algebra Complete ===")
+        return results
+
+
+if __name__ == "__main__":
+    import sys
+
+    # e.g. python raster_algebra.py layers.json
+    layer_file = sys.argv[1] if len(sys.argv) > 1 else None
+
+    algebra = RasterAlgebra()
+    algebra.run_pipeline(layer_file=layer_file)
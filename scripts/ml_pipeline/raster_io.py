@@ -0,0 +1,198 @@
+"""
+Grid Raster Export
+===================
+Write regular-lattice grid fields as rasters instead of point features.
+
+Input: (bands, ny, nx) float arrays + georeference from GridInterpolator.to_raster()
+Output: <name>.npy + <name>.json   multi-band float32 raster (NaN = no data)
+        <field>.png + <field>.json quantized uint8 overlay + MapLibre image-source bounds
+
+Rasters are north-up (row 0 is the northern edge) in EPSG:4326. The
+georeference JSON carries a GDAL-style geotransform, so the .npy can be
+turned into a GeoTIFF later with any GDAL tool.
+
+PNG overlays are 8-bit palette images: index 0 is transparent (no data),
+indices 1-255 encode the value as ``(index - 1) / 254`` over [0, 1], and the
+palette holds the colour ramp. The sidecar is a ready-made MapLibre source:
+
+    map.addSource('ai-regen-grid', await (await fetch('Prob_Regen.json')).json());
+    map.addLayer({id: 'ai-regen-grid', type: 'raster', source: 'ai-regen-grid'});
+
+PNGs are written with zlib only, so no imaging library is required. Overlays
+are quantized and compressed block by block, and create_raster() returns a
+memory-mapped .npy, so rasters larger than memory (tiled grid runs) can be
+written and exported.
+"""
+
+import json
+import zlib
+import struct
+import numpy as np
+from pathlib import Path
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+
+# Colour stops (value, hex) for PNG overlays; same ramp as the fire heatmap in app.js
+DEFAULT_RAMP = [
+    (0.0, '#2c7fb8'),
+    (0.25, '#41b6c4'),
+    (0.5, '#a1dab4'),
+    (0.75, '#ffffbf'),
+    (0.9, '#fdae61'),
+    (1.0, '#d7191c'),
+]
+
+# Quantization: index 0 = no data, 1..255 = value levels
+QUANT_LEVELS = 254
+
+
+def georeference(west: float, north: float, resolution: float, shape: Tuple[int, int],
+                 bands: Sequence[str]) -> Dict:
+    """Georeference for a north-up lattice whose top-left cell edge is (west, north)."""
+
+    ny, nx = shape
+    return {
+        'crs': 'EPSG:4326',
+        'shape': [int(ny), int(nx)],
+        'resolution': float(resolution),
+        # GDAL geotransform: x = t0 + col * t1, y = t3 + row * t5 (cell edges)
+        'geotransform': [float(west), float(resolution), 0.0, float(north), 0.0, -float(resolution)],
+        'bounds': [float(west), float(north - ny * resolution), float(west + nx * resolution), float(north)],
+        'bands': list(bands),
+        'nodata': 'NaN'
+    }
+
+
+def write_raster(bands: np.ndarray, georef: Dict, output_stem: str) -> List[Path]:
+    """Write a (bands, ny, nx) raster as float32 .npy plus .json georeference."""
+
+    stem = Path(output_stem)
+    stem.parent.mkdir(parents=True, exist_ok=True)
+
+    npy_path = stem.with_suffix('.npy')
+    json_path = stem.with_suffix('.json')
+    np.save(npy_path, bands.astype(np.float32))
+    with open(json_path, 'w', encoding='utf-8') as f:
+        json.dump({**georef, 'file': npy_path.name, 'dtype': 'float32'}, f, indent=2)
+
+    return [npy_path, json_path]
+
+
+def create_raster(georef: Dict, output_stem: str, block_bytes: int = 1 << 24) -> Path:
+    """Create an on-disk (bands, ny, nx) float32 .npy raster for incremental writes.
+
+    The file is NaN-filled (unwritten cells read as no data) through plain
+    block writes, so creating it does not map the whole raster into memory.
+    Writers open it with ``np.load(path, mmap_mode='r+')``. The .json
+    georeference is written alongside; returns the .npy path.
+    """
+
+    stem = Path(output_stem)
+    stem.parent.mkdir(parents=True, exist_ok=True)
+
+    npy_path = stem.with_suffix('.npy')
+    shape = (len(georef['bands']),) + tuple(georef['shape'])
+    raster = np.lib.format.open_memmap(npy_path, mode='w+', dtype=np.float32, shape=shape)
+    offset, n_values = raster.offset, raster.size
+    del raster
+
+    block = np.full(block_bytes // 4, np.nan, dtype=np.float32)
+    with open(npy_path, 'r+b') as f:
+        f.seek(offset)
+        for start in range(0, n_values, len(block)):
+            f.write(block[:n_values - start].tobytes())
+
+    with open(stem.with_suffix('.json'), 'w', encoding='utf-8') as f:
+        json.dump({**georef, 'file': npy_path.name, 'dtype': 'float32'}, f, indent=2)
+    return npy_path
+
+
+def read_raster(output_stem: str) -> Tuple[np.ndarray, Dict]:
+    """Load a raster written by write_raster() or create_raster()."""
+
+    stem = Path(output_stem)
+    with open(stem.with_suffix('.json'), 'r', encoding='utf-8') as f:
+        georef = json.load(f)
+    return np.load(stem.with_suffix('.npy')), georef
+
+
+def quantize(values: np.ndarray) -> np.ndarray:
+    """Map [0, 1] values to uint8 indices 1..255; NaN becomes 0."""
+
+    levels = np.rint(np.clip(np.nan_to_num(values, nan=0.0), 0.0, 1.0) * QUANT_LEVELS) + 1
+    return np.where(np.isnan(values), 0, levels).astype(np.uint8)
+
+
+def ramp_palette(ramp: Sequence[Tuple[float, str]] = DEFAULT_RAMP) -> np.ndarray:
+    """256-entry RGB palette for quantized indices (entry 0 is the no-data slot)."""
+
+    stops = np.array([v for v, _ in ramp])
+    colours = np.array([[int(c[i:i + 2], 16) for i in (1, 3, 5)] for _, c in ramp], dtype=float)
+
+    values = np.arange(QUANT_LEVELS + 1) / QUANT_LEVELS
+    palette = np.zeros((256, 3), dtype=np.uint8)
+    palette[1:] = np.rint(np.column_stack([
+        np.interp(values, stops, colours[:, ch]) for ch in range(3)
+    ]))
+    return palette
+
+
+def write_png(path: Path, blocks: Iterable[np.ndarray], height: int, width: int,
+              palette: np.ndarray, opacity: int = 255):
+    """Write a palette PNG from (rows, width) uint8 index blocks, top to bottom.
+
+    Index 0 is fully transparent.
+    """
+
+    compressor = zlib.compressobj(9)
+    idat = []
+    for block in blocks:
+        # Each scanline starts with filter type 0 (none)
+        raw = np.concatenate([np.zeros((len(block), 1), dtype=np.uint8), block], axis=1)
+        idat.append(compressor.compress(raw.tobytes()))
+    idat.append(compressor.flush())
+
+    def chunk(tag: bytes, data: bytes) -> bytes:
+        return struct.pack('>I', len(data)) + tag + data + struct.pack('>I', zlib.crc32(tag + data))
+
+    alpha = bytes([0] + [opacity] * 255)
+    png = (
+        b'\x89PNG\r\n\x1a\n'
+        + chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 3, 0, 0, 0))
+        + chunk(b'PLTE', palette.astype(np.uint8).tobytes())
+        + chunk(b'tRNS', alpha)
+        + chunk(b'IDAT', b''.join(idat))
+        + chunk(b'IEND', b'')
+    )
+    with open(path, 'wb') as f:
+        f.write(png)
+
+
+def write_overlay(band: np.ndarray, georef: Dict, field: str, output_dir: str,
+                  ramp: Sequence[Tuple[float, str]] = DEFAULT_RAMP,
+                  block_rows: int = 1024) -> List[Path]:
+    """Write one field as a quantized PNG plus MapLibre image-source sidecar."""
+
+    out_dir = Path(output_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    png_path = out_dir / f"{field}.png"
+    json_path = out_dir / f"{field}.json"
+    height, width = band.shape
+    blocks = (quantize(band[r:r + block_rows]) for r in range(0, height, block_rows))
+    write_png(png_path, blocks, height, width, ramp_palette(ramp))
+
+    west, south, east, north = georef['bounds']
+    sidecar = {
+        'type': 'image',
+        'url': png_path.name,
+        'coordinates': [[west, north], [east, north], [east, south], [west, south]],
+        'field': field,
+        # value = (index - 1) * scale + offset; index 0 = no data
+        'encoding': {'scale': 1.0 / QUANT_LEVELS, 'offset': 0.0, 'nodata_index': 0},
+        'ramp': [[v, c] for v, c in ramp]
+    }
+    with open(json_path, 'w', encoding='utf-8') as f:
+        json.dump(sidecar, f, indent=2)
+
+    return [png_path, json_path]
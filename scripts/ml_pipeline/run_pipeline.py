@@ -7,11 +7,26 @@ Usage:
     python run_pipeline.py                    # Full pipeline
     python run_pipeline.py --features-only    # Feature engineering only
     python run_pipeline.py --train-only       # Training only
-    python run_pipeline.py --validate         # Validation only mode
+    python run_pipeline.py --validate         # Stored model metrics + interpolation cross-validation
+    python run_pipeline.py --score new.csv    # Score a new survey export
+    python run_pipeline.py --scenarios        # Model_Predictions (baseline) + Scenario_Predictions
+    python run_pipeline.py --composites       # Composite risk layers from grid expressions
+    python run_pipeline.py --service-areas    # Voronoi polygons per survey location
+    python run_pipeline.py --simplify-preservations  # Per-zoom protected-area variants
+    python run_pipeline.py --counterfactuals  # Per-farmer recommendations
+    python run_pipeline.py --interpolate-only --tiled --resolution 0.0005 --extent lebanon
+    python run_pipeline.py --interpolate-only --tiled --resolution 0.0005 --pyramid
+    python run_pipeline.py --interpolate-only --adaptive   # Quadtree cells, fine only near surveys
+    python run_pipeline.py --interpolate-only --covariates # Interpolate inputs, run models per cell
+    python run_pipeline.py --preview --refine # Preview in seconds, full run in the background
 """
 
+import os
 import sys
+import json
+import shutil
 import argparse
+import subprocess
 from pathlib import Path
 import time
 
@@ -19,15 +34,114 @@ import time
 try:
     from feature_engineering import FeatureEngineer
     from train_models import ModelTrainer
-    from interpolate_grid import GridInterpolator
+    from interpolate_grid import GridInterpolator, STUDY_EXTENT, LEBANON_EXTENT
+    from adaptive_grid import QuadtreeGrid
+    from covariate_grid import CovariateGridPredictor
+    from validate_interpolation import InterpolationValidator
+    from raster_algebra import RasterAlgebra
+    from service_areas import ServiceAreaBuilder
+    from simplify_polygons import PolygonSimplifier
     from generate_boundary import BoundaryGenerator
+    from score_survey import SurveyScorer
+    from scenario_engine import ScenarioEngine
+    from counterfactuals import CounterfactualSearch
 except ImportError:
     # If running from parent directory
     sys.path.insert(0, str(Path(__file__).parent))
     from feature_engineering import FeatureEngineer
     from train_models import ModelTrainer
-    from interpolate_grid import GridInterpolator
+    from interpolate_grid import GridInterpolator, STUDY_EXTENT, LEBANON_EXTENT
+    from adaptive_grid import QuadtreeGrid
+    from covariate_grid import CovariateGridPredictor
+    from validate_interpolation import InterpolationValidator
+    from raster_algebra import RasterAlgebra
+    from service_areas import ServiceAreaBuilder
+    from simplify_polygons import PolygonSimplifier
     from generate_boundary import BoundaryGenerator
+    from score_survey import SurveyScorer
+    from scenario_engine import ScenarioEngine
+    from counterfactuals import CounterfactualSearch
+
+
+# Id of the latest preview; a background refine only publishes while it still matches
+RUN_TOKEN = Path("data/.pipeline_run")
+
+# Previews are published here, never over data/models or data/geojson
+PREVIEW_DIR = Path("data/preview")
+
+# Written last by publish_staged: the run id and files of the last complete publish
+PUBLISHED_MANIFEST = ".published.json"
+
+
+def write_run_token(run_id: str):
+    """Record the latest preview run (atomically, like every published file)."""
+    tmp = RUN_TOKEN.with_suffix('.tmp')
+    tmp.write_text(run_id)
+    os.replace(tmp, RUN_TOKEN)
+
+
+def current_run_token() -> str:
+    return RUN_TOKEN.read_text().strip() if RUN_TOKEN.exists() else None
+
+
+def publish_staged(staging_dir: Path, target_dir: Path = Path("data"), run_id: str = None) -> int:
+    """Move every file under staging_dir over its counterpart under target_dir, as one set.
+    
+    Each move is an os.replace on the same filesystem, so readers (the map,
+    the prediction service) see either the old or the new file, never a
+    partially written one. The replaced files are kept aside until every
+    move succeeded; if one fails, they are put back and the error is
+    re-raised, so target_dir never holds a mix of two runs. The manifest
+    (target_dir/.published.json: run id + files) is written last, so it
+    only ever names a complete set. Returns the number of files published.
+    """
+    files = sorted(p.relative_to(staging_dir) for p in staging_dir.rglob('*') if p.is_file())
+    previous = staging_dir.with_name(staging_dir.name + "-previous")
+    moved = []
+    try:
+        for name in files:
+            destination = target_dir / name
+            destination.parent.mkdir(parents=True, exist_ok=True)
+            if destination.exists():
+                (previous / name).parent.mkdir(parents=True, exist_ok=True)
+                os.replace(destination, previous / name)
+            os.replace(staging_dir / name, destination)
+            moved.append(name)
+    except OSError:
+        # Roll back: restore every replaced file, remove the newly added ones
+        for name in files:
+            if (previous / name).exists():
+                os.replace(previous / name, target_dir / name)
+            elif name in moved:
+                (target_dir / name).unlink()
+        shutil.rmtree(previous, ignore_errors=True)
+        raise
+    
+    manifest = target_dir / PUBLISHED_MANIFEST
+    tmp = manifest.with_suffix('.tmp')
+    tmp.write_text(json.dumps({'run': run_id, 'files': [name.as_posix() for name in files]}, indent=2))
+    os.replace(tmp, manifest)
+    
+    shutil.rmtree(previous, ignore_errors=True)
+    shutil.rmtree(staging_dir, ignore_errors=True)
+    return len(files)
+
+
+def swap_directory(staging_dir: Path, target_dir: Path) -> int:
+    """Replace target_dir with staging_dir by renaming whole directories.
+    
+    The old directory is renamed aside before the staged one takes its
+    place, so target_dir holds one complete run or the other (at worst it
+    is briefly missing), never a mix. Returns the number of files published.
+    """
+    published = sum(1 for p in staging_dir.rglob('*') if p.is_file())
+    previous = target_dir.with_name(f".{target_dir.name}-previous")
+    shutil.rmtree(previous, ignore_errors=True)
+    if target_dir.exists():
+        os.replace(target_dir, previous)
+    os.replace(staging_dir, target_dir)
+    shutil.rmtree(previous, ignore_errors=True)
+    return published
 
 
 class PipelineOrchestrator:
@@ -48,6 +162,7 @@ class PipelineOrchestrator:
         engineer = FeatureEngineer()
         df, features, targets = engineer.prepare_ml_dataset()
         engineer.save_prepared_data()
+        engineer.save_transform_state()
         
         self.timings['feature_engineering'] = time.time() - start_time
         
@@ -68,32 +183,289 @@ class PipelineOrchestrator:
         
         self.timings['model_training'] = time.time() - start_time
     
-    def run_grid_interpolation(self, resolution: float = 0.005):
-        """Step 3: Grid interpolation."""
+    def run_grid_interpolation(
+        self,
+        resolution: float = 0.005,
+        method: str = 'linear',
+        idw_options: dict = None,
+        tiled: bool = False,
+        tile_size: int = 512,
+        workers: int = None,
+        extent: str = 'data',
+        pyramid: bool = False,
+        pyramid_levels: int = None,
+        adaptive: bool = False,
+        covariates: bool = False,
+        export_spread: bool = False,
+        drop_no_signal: bool = False
+    ):
+        """Step 4: Grid interpolation (tiled mode writes rasters with bounded memory)."""
         print("\n" + "=" * 80)
-        print("STEP 3: GRID INTERPOLATION")
+        print("STEP 4: GRID INTERPOLATION")
         print("=" * 80)
         
         start_time = time.time()
         
+        # 'data' = survey boundary + buffer; fixed rectangles otherwise
+        fixed_extent = {'study': STUDY_EXTENT, 'lebanon': LEBANON_EXTENT}.get(extent)
+        lon_range, lat_range = fixed_extent if fixed_extent is not None else (None, None)
+        
         interpolator = GridInterpolator()
-        interpolator.run_pipeline(resolution=resolution)
+        if adaptive and pyramid:
+            raise ValueError("--pyramid builds raster levels; the adaptive grid writes no raster")
+        if adaptive:
+            # 0.005 → 0.04° base cells refined down to 0.0025° near surveys
+            quadtree = QuadtreeGrid(
+                base_resolution=resolution * 8,
+                min_resolution=resolution / 2,
+                method=method,
+                idw_options=idw_options
+            )
+            quadtree.run_pipeline(extent=fixed_extent)
+        elif covariates:
+            predictor = CovariateGridPredictor(method=method, idw_options=idw_options)
+            predictor.run_pipeline(resolution=resolution, extent=fixed_extent)
+        elif tiled:
+            interpolator.run_tiled(
+                resolution=resolution,
+                lon_range=lon_range,
+                lat_range=lat_range,
+                tile_size=tile_size,
+                interpolation_method=method,
+                workers=workers,
+                idw_options=idw_options,
+                pyramid=pyramid,
+                pyramid_levels=pyramid_levels
+            )
+        else:
+            interpolator.run_pipeline(
+                resolution=resolution,
+                interpolation_method=method,
+                idw_options=idw_options,
+                extent=fixed_extent,
+                pyramid=pyramid,
+                pyramid_levels=pyramid_levels,
+                export_spread=export_spread,
+                drop_no_signal=drop_no_signal
+            )
         
         self.timings['grid_interpolation'] = time.time() - start_time
     
-    def run_boundary_generation(self, method: str = 'convex_hull'):
-        """Step 4: Boundary generation."""
+    def run_boundary_generation(self, method: str = 'convex_hull', eps_km: float = 8.0):
+        """Step 3: Boundary generation (the grid is masked to this boundary)."""
         print("\n" + "=" * 80)
-        print("STEP 4: BOUNDARY GENERATION")
+        print("STEP 3: BOUNDARY GENERATION")
         print("=" * 80)
         
         start_time = time.time()
         
-        generator = BoundaryGenerator()
-        generator.generate_boundary(method=method)
+        generator = BoundaryGenerator(area_name=self.config.get('area_name'))
+        generator.generate_boundary(method=method, eps_km=eps_km)
         
         self.timings['boundary_generation'] = time.time() - start_time
     
+    def run_validation(self, idw_options: dict = None, n_folds: int = 5):
+        """Validation only: stored model CV metrics + interpolation cross-validation."""
+        print("\n" + "=" * 80)
+        print("VALIDATION")
+        print("=" * 80)
+        
+        start_time = time.time()
+        
+        metrics_file = Path("data/models/training_metrics.json")
+        if metrics_file.exists():
+            with open(metrics_file, 'r') as f:
+                metrics = json.load(f)
+            print("\nModel metrics (from last training run):")
+            for target, m in metrics.items():
+                print(f"  {target:<28} CV F1 {m['cv_f1_mean']:.3f} ± {m['cv_f1_std']:.3f}"
+                      f"  train ROC-AUC {m.get('roc_auc', float('nan')):.3f}")
+        else:
+            print(f"⚠️  {metrics_file} not found (train models first)")
+        
+        validator = InterpolationValidator(n_folds=n_folds, idw_options=idw_options)
+        validator.run_validation()
+        
+        self.timings['validation'] = time.time() - start_time
+    
+    def run_scoring(self, input_csv: str, chunk_size: int = 5000):
+        """Score a new survey export with the persisted models."""
+        print("\n" + "=" * 80)
+        print("BATCH SCORING")
+        print("=" * 80)
+        
+        start_time = time.time()
+        
+        scorer = SurveyScorer(chunk_size=chunk_size)
+        scorer.score_file(input_csv)
+        
+        self.timings['scoring'] = time.time() - start_time
+    
+    def run_scenarios(self, scenario_file: str = None):
+        """Score what-if scenarios: baseline into Model_Predictions.geojson, the rest into Scenario_Predictions.geojson."""
+        print("\n" + "=" * 80)
+        print("SCENARIO ENGINE")
+        print("=" * 80)
+        
+        start_time = time.time()
+        
+        engine = ScenarioEngine()
+        engine.run_pipeline(scenario_file=scenario_file)
+        
+        self.timings['scenarios'] = time.time() - start_time
+    
+    def run_composites(self, layer_file: str = None):
+        """Evaluate composite layer expressions over the grid raster."""
+        print("\n" + "=" * 80)
+        print("COMPOSITE LAYERS")
+        print("=" * 80)
+        
+        start_time = time.time()
+        
+        algebra = RasterAlgebra()
+        algebra.run_pipeline(layer_file=layer_file)
+        
+        self.timings['composites'] = time.time() - start_time
+    
+    def run_service_areas(self):
+        """Voronoi service areas of unique survey locations."""
+        print("\n" + "=" * 80)
+        print("VORONOI SERVICE AREAS")
+        print("=" * 80)
+        
+        start_time = time.time()
+        
+        builder = ServiceAreaBuilder()
+        builder.run_pipeline()
+        
+        self.timings['service_areas'] = time.time() - start_time
+    
+    def run_polygon_simplification(self, input_file: str = "data/geojson/Preservations.geojson"):
+        """Per-zoom topology-preserving variants of a polygon layer."""
+        print("\n" + "=" * 80)
+        print("POLYGON SIMPLIFICATION")
+        print("=" * 80)
+        
+        start_time = time.time()
+        
+        simplifier = PolygonSimplifier(input_file)
+        simplifier.run_pipeline()
+        
+        self.timings['polygon_simplification'] = time.time() - start_time
+    
+    def run_counterfactuals(self, max_changes: int = 3):
+        """Search per-farmer changes that flip flagged predictions."""
+        print("\n" + "=" * 80)
+        print("COUNTERFACTUAL RECOMMENDATIONS")
+        print("=" * 80)
+        
+        start_time = time.time()
+        
+        search = CounterfactualSearch(max_changes=max_changes)
+        search.run_pipeline()
+        
+        self.timings['counterfactuals'] = time.time() - start_time
+    
+    def run_preview(
+        self,
+        model_type: str = 'random_forest',
+        resolution: float = 0.02,
+        sample_fraction: float = 0.5,
+        n_estimators: int = 25,
+        refine: bool = False,
+        refine_resolution: float = 0.005
+    ):
+        """Fast preview: subsampled training, fewer trees, coarse grid.
+        
+        Prepared data, models and grid are written to a staging directory
+        that then replaces PREVIEW_DIR (data/preview/) as a whole; the
+        production files in data/ are left as they are, and the map keeps
+        showing them. With ``refine`` a detached process then retrains on
+        the preview's prepared data, interpolates at ``refine_resolution``
+        and promotes the result into data/ (publish_staged).
+        """
+        print("\n" + "=" * 80)
+        print("PREVIEW")
+        print("=" * 80)
+        
+        start_time = time.time()
+        
+        # A new preview supersedes any refine still running from an older one
+        run_id = f"{int(start_time)}-{os.getpid()}"
+        write_run_token(run_id)
+        staging = Path("data") / f".staging-{run_id}"
+        data_path = str(staging / "ml_prepared_data.csv")
+        
+        # Targets are (re)defined in feature engineering, so it always runs on the full data
+        engineer = FeatureEngineer()
+        engineer.prepare_ml_dataset()
+        engineer.save_prepared_data(data_path)
+        engineer.save_transform_state(str(staging / "models" / "feature_transforms.json"))
+        
+        trainer = ModelTrainer(
+            data_path=data_path,
+            n_estimators=n_estimators,
+            sample_fraction=sample_fraction,
+            cross_validate=False
+        )
+        trainer.train_all_models(model_type=model_type)
+        trainer.save_models(str(staging / "models"))
+        
+        interpolator = GridInterpolator(data_path=data_path, models_dir=str(staging / "models"))
+        interpolator.run_pipeline(
+            resolution=resolution,
+            export_raster=False,
+            export_bands=False,
+            output_dir=str(staging)
+        )
+        
+        published = swap_directory(staging, PREVIEW_DIR)
+        self.timings['preview'] = time.time() - start_time
+        print(f"\n✓ Preview published to {PREVIEW_DIR}/ ({published} files) in {self.timings['preview']:.1f}s")
+        
+        if refine:
+            log_path = Path("data") / ".refine.log"
+            with open(log_path, 'w') as log:
+                process = subprocess.Popen(
+                    [sys.executable, str(Path(__file__).resolve()), '--refine-run', run_id,
+                     '--model', model_type, '--resolution', str(refine_resolution)],
+                    stdout=log, stderr=subprocess.STDOUT, start_new_session=True
+                )
+            print(f"✓ Refining in background (pid {process.pid}, {refine_resolution}°, log: {log_path})")
+    
+    def run_refine(self, run_id: str, model_type: str = 'random_forest', resolution: float = 0.005) -> bool:
+        """Full training + grid for preview ``run_id``; promotes into data/ only if no newer preview started."""
+        print("\n" + "=" * 80)
+        print(f"REFINE (preview {run_id})")
+        print("=" * 80)
+        
+        start_time = time.time()
+        staging = Path("data") / f".staging-{run_id}-refine"
+        
+        # Promote the preview's prepared data and transforms with the full models
+        for name in ("ml_prepared_data.csv", "models/feature_transforms.json"):
+            (staging / name).parent.mkdir(parents=True, exist_ok=True)
+            shutil.copy2(PREVIEW_DIR / name, staging / name)
+        data_path = str(staging / "ml_prepared_data.csv")
+        
+        trainer = ModelTrainer(data_path=data_path)
+        trainer.train_all_models(model_type=model_type)
+        trainer.save_models(str(staging / "models"))
+        trainer.generate_report(str(staging / "models" / "training_report.txt"))
+        
+        interpolator = GridInterpolator(data_path=data_path, models_dir=str(staging / "models"))
+        interpolator.run_pipeline(resolution=resolution, output_dir=str(staging))
+        
+        if current_run_token() != run_id:
+            shutil.rmtree(staging, ignore_errors=True)
+            print("\n⚠️  A newer preview started; refined outputs discarded")
+            return False
+        
+        published = publish_staged(staging, run_id=run_id)
+        self.timings['refine'] = time.time() - start_time
+        print(f"\n✓ Refined outputs published ({published} files) in {self.timings['refine']:.1f}s")
+        return True
+    
     def print_summary(self):
         """Print pipeline execution summary."""
         print("\n" + "=" * 80)
@@ -137,7 +509,8 @@ class PipelineOrchestrator:
         self,
         model_type: str = 'random_forest',
         grid_resolution: float = 0.005,
-        boundary_method: str = 'convex_hull'
+        boundary_method: str = 'convex_hull',
+        boundary_eps_km: float = 8.0
     ):
         """Execute complete pipeline."""
         
@@ -157,11 +530,11 @@ class PipelineOrchestrator:
             # Step 2: Model Training
             self.run_model_training(model_type=model_type)
             
-            # Step 3: Grid Interpolation
-            self.run_grid_interpolation(resolution=grid_resolution)
+            # Step 3: Boundary Generation (before the grid, which is masked to it)
+            self.run_boundary_generation(method=boundary_method, eps_km=boundary_eps_km)
             
-            # Step 4: Boundary Generation
-            self.run_boundary_generation(method=boundary_method)
+            # Step 4: Grid Interpolation
+            self.run_grid_interpolation(resolution=grid_resolution)
             
             # Summary
             self.print_summary()
@@ -197,6 +570,7 @@ Examples:
   python run_pipeline.py --resolution 0.01            # Coarser grid (faster)
   python run_pipeline.py --features-only              # Feature engineering only
   python run_pipeline.py --train-only                 # Training only (requires prepared data)
+  python run_pipeline.py --score "data/MZSurvey farmers ENGLISH_with_coords.csv"
         """
     )
     
@@ -223,6 +597,20 @@ Examples:
         help='Boundary generation method'
     )
     
+    parser.add_argument(
+        '--boundary-eps-km',
+        type=float,
+        default=8.0,
+        help='DBSCAN radius (km) grouping surveys into boundary regions; 0 = one region (default: 8)'
+    )
+    
+    parser.add_argument(
+        '--area-name',
+        type=str,
+        default=None,
+        help='Survey area named in the boundary description (e.g. "Mount Lebanon")'
+    )
+    
     parser.add_argument(
         '--features-only',
         action='store_true',
@@ -241,32 +629,238 @@ Examples:
         help='Run grid interpolation only (requires trained models)'
     )
     
+    parser.add_argument(
+        '--interpolation',
+        type=str,
+        default='linear',
+        choices=['linear', 'nearest', 'idw', 'kriging'],
+        help='Grid interpolation method (kriging also exports KrigStd_* fields)'
+    )
+    
+    parser.add_argument(
+        '--idw-power',
+        type=float,
+        default=2.0,
+        help='IDW distance exponent (default: 2)'
+    )
+    
+    parser.add_argument(
+        '--idw-k',
+        type=int,
+        default=12,
+        help='IDW neighbours per cell (default: 12)'
+    )
+    
+    parser.add_argument(
+        '--idw-radius',
+        type=float,
+        default=None,
+        help='IDW search radius in degrees (default: unlimited)'
+    )
+    
+    parser.add_argument(
+        '--tiled',
+        action='store_true',
+        help='Tiled, bounded-memory interpolation to data/rasters/ (for fine grids / large extents)'
+    )
+    
+    parser.add_argument(
+        '--tile-size',
+        type=int,
+        default=512,
+        help='Tile edge in grid cells for --tiled (default: 512)'
+    )
+    
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=None,
+        help='Worker processes for --tiled (default: all CPUs)'
+    )
+    
+    parser.add_argument(
+        '--extent',
+        type=str,
+        default='data',
+        choices=['data', 'study', 'lebanon'],
+        help='Grid extent: survey boundary + buffer (default), the original study rectangle, or all of Lebanon'
+    )
+    
+    parser.add_argument(
+        '--adaptive',
+        action='store_true',
+        help='Adaptive quadtree grid to AI_Grid_Adaptive.geojson (fine cells only near surveys / gradients)'
+    )
+    
+    parser.add_argument(
+        '--covariates',
+        action='store_true',
+        help='Interpolate model inputs to the grid and predict every cell (AI_Grid_Covariates.geojson)'
+    )
+    
+    parser.add_argument(
+        '--pyramid',
+        action='store_true',
+        help='Also write coarser 2x2-mean raster levels + zoom index (AI_Grid_Predictions_pyramid.json)'
+    )
+    
+    parser.add_argument(
+        '--pyramid-levels',
+        type=int,
+        default=None,
+        help='Coarser levels for --pyramid (default: until a side drops below 16 cells)'
+    )
+    
+    parser.add_argument(
+        '--geojson-spread',
+        action='store_true',
+        help='Also write the Std_*/KrigStd_* spread fields to AI_Grid_Predictions.geojson (always in the raster)'
+    )
+    
+    parser.add_argument(
+        '--geojson-signal-only',
+        action='store_true',
+        help='Leave cells more than ~5km from every survey out of AI_Grid_Predictions.geojson'
+    )
+    
+    parser.add_argument(
+        '--preview',
+        action='store_true',
+        help='Fast preview: half the data, 25 trees, no CV, coarse grid (published to data/preview/)'
+    )
+    
+    parser.add_argument(
+        '--preview-resolution',
+        type=float,
+        default=0.02,
+        help='Grid resolution for --preview (default: 0.02 = ~2km)'
+    )
+    
+    parser.add_argument(
+        '--refine',
+        action='store_true',
+        help='With --preview: retrain on full data at --resolution in the background, then promote into data/'
+    )
+    
+    # Internal: the background refine process started by --preview --refine
+    parser.add_argument('--refine-run', type=str, default=None, help=argparse.SUPPRESS)
+    
     parser.add_argument(
         '--validate',
         action='store_true',
-        help='Validation-only mode (no training, just report metrics)'
+        help='Validation-only mode: report model metrics and interpolation LOO / spatial k-fold errors'
+    )
+    
+    parser.add_argument(
+        '--score',
+        type=str,
+        metavar='CSV',
+        help='Score a new survey CSV with the persisted models (no retraining)'
+    )
+    
+    parser.add_argument(
+        '--scenarios',
+        nargs='?',
+        const='',
+        default=None,
+        metavar='JSON',
+        help="Score what-if scenarios: baseline into Model_Predictions.geojson, the rest into Scenario_Predictions.geojson (optional scenario file)"
+    )
+    
+    parser.add_argument(
+        '--composites',
+        nargs='?',
+        const='',
+        default=None,
+        metavar='JSON',
+        help='Composite layers from expressions over the grid raster (optional layer file)'
+    )
+    
+    parser.add_argument(
+        '--service-areas',
+        action='store_true',
+        help='Voronoi polygons of unique survey locations, clipped to the boundary (AI_Service_Areas.geojson)'
+    )
+    
+    parser.add_argument(
+        '--simplify-preservations',
+        action='store_true',
+        help='Per-zoom simplified Preservations.geojson variants + index (data/geojson/preservations/)'
+    )
+    
+    parser.add_argument(
+        '--counterfactuals',
+        action='store_true',
+        help='Write per-farmer counterfactual recommendations'
+    )
+    
+    parser.add_argument(
+        '--chunk-size',
+        type=int,
+        default=5000,
+        help='Rows per chunk when scoring (default: 5000)'
     )
     
     args = parser.parse_args()
+    if args.adaptive and args.pyramid:
+        parser.error("--pyramid builds raster levels; the adaptive grid writes no raster")
     
-    orchestrator = PipelineOrchestrator()
+    orchestrator = PipelineOrchestrator(config={'area_name': args.area_name})
     
     # Execute based on flags
-    if args.features_only:
+    if args.refine_run:
+        refined = orchestrator.run_refine(args.refine_run, model_type=args.model, resolution=args.resolution)
+        sys.exit(0 if refined else 1)
+    elif args.preview:
+        orchestrator.run_preview(
+            model_type=args.model,
+            resolution=args.preview_resolution,
+            refine=args.refine,
+            refine_resolution=args.resolution
+        )
+    elif args.score:
+        orchestrator.run_scoring(args.score, chunk_size=args.chunk_size)
+    elif args.scenarios is not None:
+        orchestrator.run_scenarios(scenario_file=args.scenarios or None)
+    elif args.composites is not None:
+        orchestrator.run_composites(layer_file=args.composites or None)
+    elif args.service_areas:
+        orchestrator.run_service_areas()
+    elif args.simplify_preservations:
+        orchestrator.run_polygon_simplification()
+    elif args.counterfactuals:
+        orchestrator.run_counterfactuals()
+    elif args.features_only:
         orchestrator.run_feature_engineering()
     elif args.train_only:
         orchestrator.run_model_training(model_type=args.model)
     elif args.interpolate_only:
-        orchestrator.run_grid_interpolation(resolution=args.resolution)
+        orchestrator.run_grid_interpolation(
+            resolution=args.resolution,
+            method=args.interpolation,
+            idw_options={'power': args.idw_power, 'k': args.idw_k, 'radius': args.idw_radius},
+            tiled=args.tiled,
+            tile_size=args.tile_size,
+            workers=args.workers,
+            extent=args.extent,
+            pyramid=args.pyramid,
+            pyramid_levels=args.pyramid_levels,
+            adaptive=args.adaptive,
+            covariates=args.covariates,
+            export_spread=args.geojson_spread,
+            drop_no_signal=args.geojson_signal_only
+        )
     elif args.validate:
-        print("Validation mode not yet implemented")
-        # TODO: Implement validation-only mode
+        orchestrator.run_validation(
+            idw_options={'power': args.idw_power, 'k': args.idw_k, 'radius': args.idw_radius}
+        )
     else:
         # Full pipeline
         success = orchestrator.run_full_pipeline(
             model_type=args.model,
             grid_resolution=args.resolution,
-            boundary_method=args.boundary
+            boundary_method=args.boundary,
+            boundary_eps_km=args.boundary_eps_km
         )
         
         sys.exit(0 if success else 1)
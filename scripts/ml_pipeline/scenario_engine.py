@@ -0,0 +1,371 @@
+"""
+What-If Scenario Engine
+========================
+Score declarative intervention scenarios for every surveyed farmer.
+
+Input: Prepared dataset + trained models + scenario list (built-in or JSON file)
+Output: Model_Predictions.geojson with the baseline (current practices) per
+        farmer, in the schema the web map reads
+        Scenario_Predictions.geojson with one feature per other scenario × farmer
+
+Each scenario is a list of column transforms applied to the model feature
+matrix. All scenarios are stacked into one matrix, so every target model
+runs a single batched predict_proba over scenario × farmer rows.
+
+Scenario file format (JSON list):
+    [{"name": "solar_energy",
+      "label": "Switch energy source to solar",
+      "interventions": [{"feature": "energy__10", "op": "set", "value": 100},
+                        {"feature": "fertilizer_reliance_score", "op": "add",
+                         "value": -1, "min": 0}]}]
+
+Supported ops: set, add, scale (with optional min/max clipping).
+"""
+
+import json
+import pandas as pd
+import numpy as np
+from pathlib import Path
+from typing import Dict, List, Optional
+import warnings
+warnings.filterwarnings('ignore')
+
+from model_store import load_feature_list, load_target_models
+
+
+DEFAULT_SCENARIOS = [
+    {
+        'name': 'baseline',
+        'label': 'Current practices',
+        'interventions': []
+    },
+    {
+        'name': 'solar_energy',
+        'label': 'Switch energy source to solar',
+        'interventions': [
+            {'feature': 'energy__5', 'op': 'set', 'value': 0},   # manual %
+            {'feature': 'energy__6', 'op': 'set', 'value': 0},   # diesel %
+            {'feature': 'energy__7', 'op': 'set', 'value': 0},   # grid %
+            {'feature': 'energy__8', 'op': 'set', 'value': 0},   # benzine %
+            {'feature': 'energy__9', 'op': 'set', 'value': 100},  # solar %
+            # Read as % solar in training: has_solar = energy__10 > 0 (derived below)
+            {'feature': 'energy__10', 'op': 'set', 'value': 100},
+            {'feature': 'energy__11', 'op': 'set', 'value': 0},  # benzine L/week
+        ]
+    },
+    {
+        'name': 'reduce_fertilizer',
+        'label': 'Reduce chemical fertilizer reliance',
+        'interventions': [
+            {'feature': 'fertilizer_reliance_score', 'op': 'add', 'value': -1, 'min': 0},
+        ]
+    },
+    {
+        'name': 'improve_water',
+        'label': 'Improve water sufficiency',
+        'interventions': [
+            {'feature': 'water_sufficiency_score', 'op': 'add', 'value': 1, 'max': 4},
+            {'feature': 'water_scarcity_months', 'op': 'scale', 'value': 0.5},
+        ]
+    },
+    {
+        'name': 'regen_package',
+        'label': 'Adopt two more regenerative techniques, lower chemical inputs',
+        'interventions': [
+            {'feature': 'regen_technique_count', 'op': 'add', 'value': 2},
+            {'feature': 'fertilizer_reliance_score', 'op': 'add', 'value': -1, 'min': 0},
+            {'feature': 'pesticide_reliance_score', 'op': 'add', 'value': -1, 'min': 0},
+        ]
+    },
+]
+
+# Features derived from others in FeatureEngineer; recomputed (in order)
+# when a scenario touches one of their inputs.
+DERIVED_FEATURES = [
+    ('has_solar', ['energy__10'],
+     lambda X: (X['energy__10'] > 0).astype(float)),
+    ('manual_labor_pct', ['energy__5'],
+     lambda X: X['energy__5']),
+    ('high_manual_labor', ['manual_labor_pct'],
+     lambda X: (X['manual_labor_pct'] >= 50).astype(float)),
+    ('resource_intensity', ['fertilizer_reliance_score', 'pesticide_reliance_score', 'manual_labor_pct'],
+     lambda X: (X['fertilizer_reliance_score'] + X['pesticide_reliance_score'] + X['manual_labor_pct'] / 50) / 3),
+]
+
+# Output property for each model (matches app.js AI layers)
+PREDICTION_PROPERTIES = {
+    'Regen': 'Pred_Regen_Adoption',
+    'Water': 'Pred_Water_Risk',
+    'Econ': 'Pred_Production_Level',
+    'Labor': 'Pred_Labor_Shortage',
+    'Climate': 'Pred_Climate_Vuln'
+}
+
+# Prediction properties of the web map's Model_Predictions.geojson layer
+BASELINE_PROPERTIES = ['Pred_Regen_Adoption', 'Pred_Water_Risk', 'Pred_Production_Level']
+
+# No production-level model exists: the 0/1/2 level is banded from the
+# economic vulnerability probability (high vulnerability → low production).
+PRODUCTION_LEVEL_BREAKS = (0.33, 0.66)
+
+
+class ScenarioEngine:
+    """Apply intervention scenarios and score them in one batch per model."""
+
+    def __init__(
+        self,
+        data_path: str = "data/ml_prepared_data.csv",
+        models_dir: str = "data/models"
+    ):
+        self.data_path = Path(data_path)
+        self.models_dir = Path(models_dir)
+        self.df = None
+        self.features = []
+        self.models = {}
+
+    def load_data_and_models(self):
+        """Load prepared farmer data, feature list and models."""
+
+        if not self.data_path.exists():
+            raise FileNotFoundError(f"Data not found: {self.data_path}")
+
+        self.df = pd.read_csv(self.data_path)
+        print(f"✓ Loaded {len(self.df)} farmers")
+
+        self.features = load_feature_list(self.models_dir)
+        self.models = load_target_models(self.models_dir)
+
+    @staticmethod
+    def load_scenarios(scenario_file: Optional[str] = None) -> List[Dict]:
+        """Load scenarios from a JSON file, or return the built-in list."""
+
+        if scenario_file is None:
+            return DEFAULT_SCENARIOS
+
+        with open(scenario_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def apply_scenario(self, X: pd.DataFrame, scenario: Dict) -> pd.DataFrame:
+        """Apply one scenario's interventions as column transforms."""
+
+        X = X.copy()
+        touched = set()
+
+        for step in scenario.get('interventions', []):
+            feature, op, value = step['feature'], step['op'], step['value']
+            if feature not in X.columns:
+                raise ValueError(
+                    f"Scenario '{scenario['name']}': unknown feature '{feature}'"
+                )
+
+            if op == 'set':
+                column = pd.Series(float(value), index=X.index)
+            elif op == 'add':
+                column = X[feature] + value
+            elif op == 'scale':
+                column = X[feature] * value
+            else:
+                raise ValueError(f"Scenario '{scenario['name']}': unknown op '{op}'")
+
+            X[feature] = column.clip(lower=step.get('min'), upper=step.get('max'))
+            touched.add(feature)
+
+        for feature, inputs, compute in DERIVED_FEATURES:
+            if feature in X.columns and touched.intersection(inputs) \
+                    and all(col in X.columns for col in inputs):
+                X[feature] = compute(X)
+                touched.add(feature)
+
+        return X
+
+    def score_scenarios(self, scenarios: List[Dict]) -> Dict[str, np.ndarray]:
+        """Score all scenarios; returns probabilities shaped (scenarios, farmers)."""
+
+        X_base = self.df[self.features].astype(float)
+        stacked = pd.concat(
+            [self.apply_scenario(X_base, scenario) for scenario in scenarios],
+            ignore_index=True
+        )
+        print(f"✓ Built {len(scenarios)} scenarios × {len(X_base)} farmers = {len(stacked)} rows")
+
+        n_scenarios, n_farmers = len(scenarios), len(X_base)
+        probabilities = {}
+        for name, model in self.models.items():
+            proba = model.predict_proba(stacked)[:, 1]
+            probabilities[name] = proba.reshape(n_scenarios, n_farmers)
+
+        return probabilities
+
+    @staticmethod
+    def _predicted_class(name: str, proba: float) -> str:
+        """Discrete class label (as string, like the app expects)."""
+
+        if name == 'Econ':
+            low, high = PRODUCTION_LEVEL_BREAKS
+            return '2' if proba < low else '1' if proba < high else '0'
+        return '1' if proba >= 0.5 else '0'
+
+    def _farmer_attributes(self) -> List[Dict]:
+        """Per-farmer descriptive properties carried into the output."""
+
+        village_col = next((c for c in self.df.columns if c.startswith('water_') and 'القرية' in c), None)
+        source_cols = {
+            'Village_Name': village_col,
+            'Practices_Regen': 'regenerative_agriculture__3',
+            'Water_Availability': 'water__7',
+            'Production_Level': 'food__5'
+        }
+        columns = {
+            prop: (self.df[col].tolist() if col in self.df.columns else [None] * len(self.df))
+            for prop, col in source_cols.items()
+        }
+        return [
+            {prop: (None if pd.isna(values[i]) else values[i]) for prop, values in columns.items()}
+            for i in range(len(self.df))
+        ]
+
+    def export_geojson(
+        self,
+        scenarios: List[Dict],
+        probabilities: Dict[str, np.ndarray],
+        output_file: str = "data/geojson/Scenario_Predictions.geojson"
+    ):
+        """Write scenario predictions as a deterministic GeoJSON file."""
+
+        attrs = self._farmer_attributes()
+        lons = self.df['longitude'].values
+        lats = self.df['latitude'].values
+        feature_ids = self.df['feature_id'].values
+
+        features = []
+        source_row = 0
+        for s_idx, scenario in enumerate(scenarios):
+            for f_idx in range(len(self.df)):
+                source_row += 1
+                properties = {
+                    'Y': f"{lats[f_idx]}",
+                    'X': f"{lons[f_idx]}",
+                    **attrs[f_idx],
+                }
+                for name, proba in probabilities.items():
+                    p = float(proba[s_idx, f_idx])
+                    properties[PREDICTION_PROPERTIES[name]] = self._predicted_class(name, p)
+                    properties[f'Prob_{name}'] = round(p, 4)
+                properties.update({
+                    'scenario': scenario['name'],
+                    'scenario_label': scenario.get('label', scenario['name']),
+                    'feature_id': str(feature_ids[f_idx]),
+                    'theme': 'Scenario_Predictions',
+                    'source_file': 'scripts/ml_pipeline/scenario_engine.py',
+                    'source_row': source_row
+                })
+                features.append({
+                    "type": "Feature",
+                    "geometry": {
+                        "type": "Point",
+                        "coordinates": [float(lons[f_idx]), float(lats[f_idx])]
+                    },
+                    "properties": properties
+                })
+
+        output_path = Path(output_file)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(output_path, 'w', encoding='utf-8') as f:
+            json.dump({"type": "FeatureCollection", "features": features}, f, ensure_ascii=False)
+
+        print(f"\n✓ Exported {len(features)} scenario predictions to {output_path}")
+        print(f"  File size: {output_path.stat().st_size / 1024:.1f} KB")
+
+    def export_baseline_geojson(
+        self,
+        probabilities: Dict[str, np.ndarray],
+        output_file: str = "data/geojson/Model_Predictions.geojson"
+    ):
+        """Write per-farmer baseline predictions in the Model_Predictions layer schema.
+
+        ``probabilities`` are per model, shaped (farmers,). Properties are
+        the ones the web map reads: Y, X, the survey answers, Pred_* classes,
+        theme, source_file and source_row.
+        """
+
+        attrs = self._farmer_attributes()
+        lons = self.df['longitude'].values
+        lats = self.df['latitude'].values
+        predicted = {
+            PREDICTION_PROPERTIES[name]: [self._predicted_class(name, float(p)) for p in proba]
+            for name, proba in probabilities.items()
+        }
+
+        features = []
+        for f_idx in range(len(self.df)):
+            properties = {'Y': f"{lats[f_idx]}", 'X': f"{lons[f_idx]}", **attrs[f_idx]}
+            properties.update({prop: predicted[prop][f_idx] for prop in BASELINE_PROPERTIES if prop in predicted})
+            properties.update({
+                'theme': 'Model_Predictions',
+                'source_file': 'scripts/ml_pipeline/scenario_engine.py',
+                'source_row': f_idx + 1
+            })
+            features.append({
+                "type": "Feature",
+                "geometry": {
+                    "type": "Point",
+                    "coordinates": [float(lons[f_idx]), float(lats[f_idx])]
+                },
+                "properties": properties
+            })
+
+        output_path = Path(output_file)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(output_path, 'w', encoding='utf-8') as f:
+            json.dump({"type": "FeatureCollection", "features": features}, f, ensure_ascii=False)
+
+        print(f"\n✓ Exported {len(features)} baseline predictions to {output_path}")
+
+    def run_pipeline(
+        self,
+        scenario_file: Optional[str] = None,
+        output_file: str = "data/geojson/Scenario_Predictions.geojson",
+        baseline_file: str = "data/geojson/Model_Predictions.geojson"
+    ):
+        """Complete scenario pipeline.
+
+        The ``baseline`` scenario (current practices, added when the list
+        has none) goes to ``baseline_file`` for the web map; every other
+        scenario goes to ``output_file``.
+        """
+
+        print("\n=== Starting Scenario Engine ===\n")
+
+        self.load_data_and_models()
+        scenarios = self.load_scenarios(scenario_file)
+        if not any(scenario['name'] == 'baseline' for scenario in scenarios):
+            scenarios = [DEFAULT_SCENARIOS[0]] + list(scenarios)
+        probabilities = self.score_scenarios(scenarios)
+
+        print("\n=== Mean Probability by Scenario ===")
+        for s_idx, scenario in enumerate(scenarios):
+            summary = ", ".join(
+                f"{name}={proba[s_idx].mean():.3f}" for name, proba in probabilities.items()
+            )
+            print(f"  {scenario['name']:<20} {summary}")
+
+        base = next(i for i, scenario in enumerate(scenarios) if scenario['name'] == 'baseline')
+        self.export_baseline_geojson({name: proba[base] for name, proba in probabilities.items()}, baseline_file)
+        others = [i for i in range(len(scenarios)) if i != base]
+        self.export_geojson(
+            [scenarios[i] for i in others],
+            {name: proba[others] for name, proba in probabilities.items()},
+            output_file
+        )
+
+        print("\n=== Scenario Engine Complete ===")
+
+
+if __name__ == "__main__":
+    import sys
+
+    # Parse command line arguments
+    scenario_file = sys.argv[1] if len(sys.argv) > 1 else None
+
+    engine = ScenarioEngine()
+    engine.run_pipeline(scenario_file=scenario_file)
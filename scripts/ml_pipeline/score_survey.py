@@ -0,0 +1,403 @@
+"""
+Batch Scoring of New Survey Exports
+====================================
+Score a fresh survey CSV with the persisted models, without retraining.
+
+Input: Survey CSV in the "MZSurvey farmers ENGLISH_with_coords.csv" layout
+       + data/models/ (models, feature_list.json, feature_transforms.json)
+Output: Per-farmer predictions as CSV and GeoJSON
+
+The CSV is streamed in fixed-size chunks through the same FeatureEngineer
+transforms used at training time, with the categorical levels and median
+fills saved by FeatureEngineer.save_transform_state(), so memory use is
+bounded by the chunk size rather than the input size.
+
+The export's short English answers are translated to the phrases of the
+canonical theme data (SURVEY_VALUE_MAP), and the energy-source answer is
+turned into the per-source shares the energy theme records. Every model
+input a row does not answer is filled with its training median; coverage
+is reported per feature, and a chunk where most inputs are imputed is
+refused (predictions would be near-constant), unless ``max_imputed`` is
+raised.
+"""
+
+import re
+import json
+import time
+import argparse
+import pandas as pd
+import numpy as np
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+import warnings
+warnings.filterwarnings('ignore')
+
+from feature_engineering import FeatureEngineer
+from model_store import load_feature_list, load_target_models
+
+
+# Survey export columns → merged theme columns expected by FeatureEngineer
+SURVEY_COLUMN_MAP = {
+    '13. Water Source': 'water__6',
+    '16. Water Availability': 'water__7',
+    '17. Water Scarcity Months': 'water__8',
+    '14. Energy Source': 'energy__3',
+    '10. Main Crops': 'food__3',
+    '19. Food Production Level': 'food__5',
+    '8. Land Size': 'general_info__3',
+    '9. Soil Type': 'general_info__4',
+    '53. Climate Changes': 'general_info__5',
+    '54. Impact on Production': 'general_info__6',
+    '38. Soil Enhancers': 'regenerative_agriculture__4',
+    '39. Chem Fertilizer Reliance': 'regenerative_agriculture__5',
+    '43. Pest Control Method': 'regenerative_agriculture__6',
+    '44. Pesticide Reliance': 'regenerative_agriculture__7',
+    '63. Raise Poultry?': 'food__8',
+}
+
+# Short export answers → the canonical (training) wording FeatureEngineer matches on;
+# None = answered, nothing to record (e.g. no poultry)
+SURVEY_VALUE_MAP = {
+    '8. Land Size': {
+        '< 5 Dunums': 'Less than 5 dunums (< 5000 square metres)',
+        '< 1 Hectare': 'Less than 1 hectare (< 10,000 m2)',
+        '> 1 Hectare': 'More than 1 hectare (>10,000 m2)',
+        '> 2 Hectares': 'More than 2 hectares (>20,000 m2)',
+    },
+    '16. Water Availability': {
+        'Always enough': 'always',
+        'Sometimes enough': 'Sometimes enough',
+        'Rarely enough': 'It rarely is',
+        'Totally insufficient': 'Completely insufficient',
+    },
+    '19. Food Production Level': {
+        'Small (Home use)': 'Small production',
+        'Medium (Local sale)': 'Average production',
+        'Large (Markets)': 'Great production',
+    },
+    '39. Chem Fertilizer Reliance': {
+        'Not used': 'It is not used',
+        'It is not used': 'It is not used',
+        'Partial': 'Partial credit',
+        'Total': 'Total dependence',
+    },
+    '44. Pesticide Reliance': {
+        'Not used': 'It is not used',
+        'It is not used': 'It is not used',
+        'Partial': 'Partial credit',
+        'Total': 'Total dependence',
+    },
+    '63. Raise Poultry?': {'Yes': 'Poultry', 'No': None},
+}
+
+# Energy theme: % of farm energy per source (one answer may list several, "Grid/Manual")
+ENERGY_SOURCE_COLUMN = '14. Energy Source'
+ENERGY_CONSUMPTION_COLUMNS = ('15. Energy Consumption', 'أخرى (يرجى التحديد): ____________.3')
+ENERGY_SHARE_COLUMNS = {
+    'manual': 'energy__5',
+    'diesel': 'energy__6',
+    'grid': 'energy__7',
+    'benzine': 'energy__8',
+    'solar': 'energy__9',
+}
+DIESEL_LITRES_COLUMN = 'energy__10'   # Diesel L/week
+BENZINE_LITRES_COLUMN = 'energy__11'  # Benzine L/week
+KWH_COLUMN = 'energy__12'             # kW/week
+
+# Theme columns each engineered feature is derived from (others: the feature itself)
+FEATURE_SOURCES = {
+    'water_scarcity_months': ['water__8'],
+    'water_sufficiency_score': ['water__7'],
+    'has_solar': ['energy__10'],
+    'manual_labor_pct': ['energy__5'],
+    'crop_diversity': ['food__3'],
+    'production_level_score': ['food__5'],
+    'has_animals': ['food__8'],
+    'farm_size_score': ['general_info__3'],
+    'climate_aware': ['general_info__5'],
+    'regen_technique_count': ['regenerative_agriculture__3'],
+    'fertilizer_reliance_score': ['regenerative_agriculture__5'],
+    'pesticide_reliance_score': ['regenerative_agriculture__7'],
+    'resource_intensity': ['regenerative_agriculture__5', 'regenerative_agriculture__7', 'energy__5'],
+    'small_farm': ['general_info__3'],
+    'small_production': ['food__5'],
+    'high_manual_labor': ['energy__5'],
+    'medium_large_farm': ['general_info__3'],
+}
+
+# Refuse a chunk when more than this share of its model inputs is median-filled
+MAX_IMPUTED = 0.5
+
+VILLAGE_COLUMN = '4. Village'
+COORD_COLUMNS = ('X', 'Y')
+
+ARABIC_DIGITS = str.maketrans('٠١٢٣٤٥٦٧٨٩', '0123456789')
+
+
+def energy_shares(answer) -> Dict[str, float]:
+    """Per-source % of farm energy for one answer ("Grid/Manual" → 50/50); {} if unanswered."""
+
+    if not isinstance(answer, str) or not answer.strip():
+        return {}
+    sources = {key for key in ENERGY_SHARE_COLUMNS
+               for part in re.split(r'[/,]', answer.lower()) if key in part.strip()}
+    if not sources:
+        return {}
+    return {column: (100.0 / len(sources) if key in sources else 0.0)
+            for key, column in ENERGY_SHARE_COLUMNS.items()}
+
+
+def weekly_litres(*answers) -> float:
+    """First number in a consumption answer ("300L/week", "٣٠٠ ليتر اسبوعيا"); NaN if none."""
+
+    for answer in answers:
+        if isinstance(answer, str):
+            match = re.search(r'\d+(?:\.\d+)?', answer.translate(ARABIC_DIGITS))
+            if match:
+                return float(match.group())
+    return np.nan
+
+
+class SurveyScorer:
+    """Stream new survey rows through saved transforms and models."""
+
+    def __init__(self, models_dir: str = "data/models", chunk_size: int = 5000,
+                 max_imputed: float = MAX_IMPUTED):
+        self.models_dir = Path(models_dir)
+        self.chunk_size = chunk_size
+        self.max_imputed = max_imputed
+        self.engineer = FeatureEngineer(verbose=False)
+        self.features = []
+        self.models = {}
+        self.observed_counts = {}
+
+    def load(self):
+        """Load feature list, fitted transforms and models."""
+        self.features = load_feature_list(self.models_dir)
+        self.engineer.load_transform_state(self.models_dir / "feature_transforms.json")
+        self.models = load_target_models(self.models_dir)
+
+        missing = [f for f in self.features if f not in self.engineer.median_fills]
+        if missing:
+            raise ValueError(f"Feature transforms missing median fills for: {missing}")
+
+    def to_merged_layout(self, chunk: pd.DataFrame, offset: int) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """Map survey export columns onto the merged theme layout.
+
+        Also returns, per theme column, which rows answered it (an answered
+        "No" can still leave the theme value empty).
+        """
+
+        lon_col, lat_col = COORD_COLUMNS
+        merged = pd.DataFrame({
+            'feature_id': [f"score_{offset + i}" for i in range(len(chunk))],
+            'longitude': pd.to_numeric(chunk.get(lon_col), errors='coerce'),
+            'latitude': pd.to_numeric(chunk.get(lat_col), errors='coerce'),
+            'village': chunk.get(VILLAGE_COLUMN),
+        }, index=chunk.index)
+        answered = pd.DataFrame(index=chunk.index)
+
+        for survey_col, theme_col in SURVEY_COLUMN_MAP.items():
+            if survey_col not in chunk.columns:
+                continue
+            # object dtype keeps .str transforms valid for all-empty chunks
+            values = chunk[survey_col].astype(object).where(chunk[survey_col].notna(), None)
+            if survey_col in SURVEY_VALUE_MAP:
+                wording = SURVEY_VALUE_MAP[survey_col]
+                values = values.map(lambda v: wording.get(str(v).strip(), v) if v is not None else None)
+            merged[theme_col] = values.astype(object)
+            answered[theme_col] = chunk[survey_col].notna()
+
+        if ENERGY_SOURCE_COLUMN in chunk.columns:
+            shares = pd.DataFrame(chunk[ENERGY_SOURCE_COLUMN].map(energy_shares).tolist(),
+                                  index=chunk.index, columns=list(ENERGY_SHARE_COLUMNS.values()))
+            merged[shares.columns] = shares
+            known = shares.notna().all(axis=1)
+
+            consumption = [chunk[c] if c in chunk.columns else pd.Series(None, index=chunk.index)
+                           for c in ENERGY_CONSUMPTION_COLUMNS]
+            litres = pd.Series([weekly_litres(*answers) for answers in zip(*consumption)], index=chunk.index)
+            # Weekly amounts: 0 for sources the farm does not use, NaN when not reported
+            merged[DIESEL_LITRES_COLUMN] = np.where(shares['energy__6'] > 0, litres,
+                                                    np.where(known, 0.0, np.nan))
+            merged[BENZINE_LITRES_COLUMN] = np.where(known & (shares['energy__8'] == 0), 0.0, np.nan)
+            merged[KWH_COLUMN] = np.where(known & (shares['energy__7'] == 0), 0.0, np.nan)
+            for column in list(shares.columns) + [DIESEL_LITRES_COLUMN, BENZINE_LITRES_COLUMN, KWH_COLUMN]:
+                answered[column] = merged[column].notna()
+
+        return merged.reset_index(drop=True), answered.reset_index(drop=True)
+
+    def transform(self, merged: pd.DataFrame, answered: Optional[pd.DataFrame] = None
+                  ) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """Apply training-time feature transforms; columns match feature_list.json.
+
+        Returns the model inputs and a same-shaped mask of values that come
+        from the survey (False = filled with the training median).
+        """
+
+        df = self.engineer.engineer_features(merged)
+        df = self.engineer.create_target_variables(df)
+        df = self.engineer.encode_categorical_features(df, fitted=True)
+
+        X = df.reindex(columns=self.features)
+        X = X.apply(pd.to_numeric, errors='coerce')
+
+        observed = X.notna()
+        if answered is not None:
+            for feature in self.features:
+                sources = FEATURE_SOURCES.get(feature, [feature])
+                if all(src in answered.columns for src in sources):
+                    observed[feature] &= answered[sources].all(axis=1).values
+                else:
+                    observed[feature] = False
+
+        return X.fillna({f: self.engineer.median_fills[f] for f in self.features}), observed
+
+    def score_chunk(self, chunk: pd.DataFrame, offset: int) -> pd.DataFrame:
+        """Score one chunk of survey rows; refuses chunks that are mostly imputed."""
+
+        merged, answered = self.to_merged_layout(chunk, offset)
+        X, observed = self.transform(merged.copy(), answered)
+
+        for feature, count in observed.sum().items():
+            self.observed_counts[feature] = self.observed_counts.get(feature, 0) + int(count)
+        imputed = 1.0 - float(observed.values.mean()) if observed.size else 1.0
+        if imputed > self.max_imputed:
+            missing = [f for f in self.features if not observed[f].any()]
+            raise ValueError(
+                f"{imputed:.0%} of model inputs in rows {offset}-{offset + len(chunk) - 1} would be "
+                f"median-filled (limit {self.max_imputed:.0%}); predictions would be near-constant. "
+                f"Never answered: {', '.join(missing) or 'none'}"
+            )
+
+        scores = merged[['feature_id', 'village', 'longitude', 'latitude']].copy()
+        for name, model in self.models.items():
+            proba = model.predict_proba(X)[:, 1]
+            scores[f'Prob_{name}'] = np.round(proba, 4)
+            scores[f'Pred_{name}'] = (proba >= 0.5).astype(int)
+        return scores
+
+    def coverage(self, n_rows: int) -> Dict[str, float]:
+        """Share of scored rows where each model input came from the survey."""
+        return {f: self.observed_counts.get(f, 0) / max(n_rows, 1) for f in self.features}
+
+    @staticmethod
+    def _geojson_features(scores: pd.DataFrame):
+        """Yield GeoJSON feature strings for rows with valid coordinates."""
+
+        located = scores.dropna(subset=['longitude', 'latitude'])
+        prop_cols = [c for c in located.columns if c not in ('longitude', 'latitude')]
+        for row in located.itertuples(index=False):
+            record = row._asdict()
+            properties = {
+                col: (None if pd.isna(record[col]) else
+                      record[col].item() if isinstance(record[col], np.generic) else record[col])
+                for col in prop_cols
+            }
+            yield json.dumps({
+                "type": "Feature",
+                "geometry": {
+                    "type": "Point",
+                    "coordinates": [float(record['longitude']), float(record['latitude'])]
+                },
+                "properties": properties
+            }, ensure_ascii=False)
+
+    def score_file(
+        self,
+        input_csv: str,
+        output_csv: Optional[str] = "data/survey_scores.csv",
+        output_geojson: Optional[str] = "data/geojson/Survey_Scores.geojson"
+    ) -> Dict:
+        """Stream a survey CSV through the models and write predictions."""
+
+        input_path = Path(input_csv)
+        if not input_path.exists():
+            raise FileNotFoundError(f"Survey CSV not found: {input_path}")
+        if not self.models:
+            self.load()
+
+        print(f"\n=== Scoring {input_path.name} (chunk size {self.chunk_size}) ===\n")
+
+        csv_file = geo_file = None
+        if output_csv:
+            Path(output_csv).parent.mkdir(parents=True, exist_ok=True)
+            csv_file = open(output_csv, 'w', encoding='utf-8', newline='')
+        if output_geojson:
+            Path(output_geojson).parent.mkdir(parents=True, exist_ok=True)
+            geo_file = open(output_geojson, 'w', encoding='utf-8')
+            geo_file.write('{"type": "FeatureCollection", "features": [\n')
+
+        n_rows = n_features = 0
+        self.observed_counts = {}
+        start_time = time.time()
+        try:
+            reader = pd.read_csv(input_path, chunksize=self.chunk_size, encoding='utf-8-sig')
+            for chunk in reader:
+                scores = self.score_chunk(chunk, offset=n_rows)
+
+                if csv_file:
+                    scores.to_csv(csv_file, index=False, header=(n_rows == 0))
+                if geo_file:
+                    for feature in self._geojson_features(scores):
+                        geo_file.write((',\n' if n_features else '') + feature)
+                        n_features += 1
+
+                n_rows += len(scores)
+                elapsed = time.time() - start_time
+                print(f"  {n_rows} rows scored ({n_rows / max(elapsed, 1e-9):.0f} rows/s)")
+        finally:
+            if csv_file:
+                csv_file.close()
+            if geo_file:
+                geo_file.write('\n]}\n')
+                geo_file.close()
+
+        elapsed = time.time() - start_time
+        coverage = self.coverage(n_rows)
+        stats = {
+            'rows': n_rows,
+            'located_rows': n_features,
+            'seconds': elapsed,
+            'rows_per_second': n_rows / max(elapsed, 1e-9),
+            'coverage': coverage
+        }
+
+        print("\nInput coverage (rows answered; the rest use the training median):")
+        for feature, share in coverage.items():
+            flag = "✓" if share >= 0.5 else "⚠️ "
+            print(f"  {flag} {feature}: {share:.0%}")
+        imputed = [f for f, share in coverage.items() if share == 0]
+        if imputed:
+            print(f"⚠️  {len(imputed)}/{len(coverage)} inputs never answered by this export: {', '.join(imputed)}")
+
+        print(f"\n✓ Scored {n_rows} rows in {elapsed:.2f}s ({stats['rows_per_second']:.0f} rows/s)")
+        if output_csv:
+            print(f"✓ Wrote {output_csv}")
+        if output_geojson:
+            print(f"✓ Wrote {output_geojson} ({n_features} located features)")
+
+        return stats
+
+
+def main():
+    """CLI entry point."""
+
+    parser = argparse.ArgumentParser(description="Score a survey CSV with the persisted models")
+    parser.add_argument('input_csv', help='Survey CSV (MZSurvey farmers ENGLISH_with_coords.csv layout)')
+    parser.add_argument('--output-csv', default='data/survey_scores.csv', help='Predictions CSV path')
+    parser.add_argument('--output-geojson', default='data/geojson/Survey_Scores.geojson',
+                        help='Predictions GeoJSON path')
+    parser.add_argument('--chunk-size', type=int, default=5000, help='Rows per scoring chunk')
+    parser.add_argument('--models-dir', default='data/models', help='Directory with persisted models')
+    parser.add_argument('--max-imputed', type=float, default=MAX_IMPUTED,
+                        help='Refuse chunks with a larger share of median-filled inputs (default: 0.5)')
+    args = parser.parse_args()
+
+    scorer = SurveyScorer(models_dir=args.models_dir, chunk_size=args.chunk_size,
+                          max_imputed=args.max_imputed)
+    scorer.score_file(args.input_csv, output_csv=args.output_csv, output_geojson=args.output_geojson)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+"""
+Voronoi Service Areas
+======================
+Polygon layer: the area closer to each survey location than to any other.
+
+Input: Prepared dataset + trained models (survey-point Prob_*/Std_* fields)
+       data/geojson/Farmers_Boundary.geojson (clip extent, buffered)
+Output: data/geojson/AI_Service_Areas.geojson with one polygon per unique
+        survey location (properties: location, surveys, area_km2, site
+        coordinates, mean Prob_*/Std_* of its surveys)
+
+Surveys sharing a coordinate (village centroids) are merged into one site
+first, with their predictions averaged as for the grid, so the
+tessellation never sees duplicate points. Four far-away frame points are
+added before scipy's Voronoi, which makes every site's cell finite; cells
+are convex, so each is the convex hull of its Voronoi vertices, built for
+all sites in one vectorized shapely call.
+
+Cells are clipped to the buffered survey boundary through an STRtree over
+the boundary parts: each cell is only tested against the parts whose
+bounding boxes it overlaps, cells lying inside a part are kept as they
+are, and only cells crossing a part's edge are intersected. Sites outside
+the boundary (surveys left out of every region) keep their Voronoi cell
+clipped to a disc of ``outside_radius`` degrees around the site instead,
+flagged ``outside``, so every site has exactly one feature.
+"""
+
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from typing import List, Tuple
+from scipy.spatial import Voronoi
+
+from interpolate_grid import GridInterpolator, field_columns, HAS_SHAPELY
+
+if HAS_SHAPELY:
+    import shapely
+
+
+# Metres per degree of latitude (and of longitude at the equator)
+METRES_PER_DEGREE = 111320.0
+
+
+def voronoi_cells(sites: np.ndarray) -> np.ndarray:
+    """Finite Voronoi cell polygon of every (distinct) site."""
+
+    lo, hi = sites.min(axis=0), sites.max(axis=0)
+    centre, span = (lo + hi) / 2, max(float((hi - lo).max()), 1.0)
+    frame = centre + 100 * span * np.array([[-1, -1], [1, -1], [1, 1], [-1, 1]])
+
+    vor = Voronoi(np.vstack([sites, frame]))
+    regions = [vor.regions[r] for r in vor.point_region[:len(sites)]]
+    lengths = np.fromiter((len(r) for r in regions), dtype=np.int64, count=len(regions))
+    vertex_idx = np.concatenate(regions)
+    if (vertex_idx < 0).any():
+        raise ValueError("unbounded Voronoi cell inside the frame")
+
+    points = shapely.multipoints(vor.vertices[vertex_idx], indices=np.repeat(np.arange(len(sites)), lengths))
+    return shapely.convex_hull(points)
+
+
+def clip_cells(cells: np.ndarray, boundary) -> Tuple[np.ndarray, np.ndarray]:
+    """Clip cells to a (multi)polygon; returns kept cell indices and clipped cells."""
+
+    parts = shapely.get_parts(boundary)
+    shapely.prepare(parts)
+    tree = shapely.STRtree(parts)
+    cell_idx, part_idx = tree.query(cells, predicate='intersects')
+
+    pieces = cells[cell_idx].copy()
+    crossing = ~shapely.contains(parts[part_idx], cells[cell_idx])
+    pieces[crossing] = shapely.intersection(cells[cell_idx[crossing]], parts[part_idx[crossing]])
+
+    # A cell overlapping several boundary parts: union of its pieces
+    kept, first, counts = np.unique(cell_idx, return_index=True, return_counts=True)
+    clipped = pieces[first]
+    for j in np.flatnonzero(counts > 1):
+        clipped[j] = shapely.union_all(pieces[cell_idx == kept[j]])
+
+    # Drop slivers that are only lines or points
+    areal = shapely.area(clipped) > 0
+    return kept[areal], clipped[areal]
+
+
+class ServiceAreaBuilder:
+    """Voronoi cells of unique survey locations with their mean predictions."""
+
+    def __init__(self, buffer: float = 0.02, outside_radius: float = 0.02):
+        self.buffer = buffer
+        self.outside_radius = outside_radius
+        self.interpolator = GridInterpolator()
+
+    def sites(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray, List[str]]:
+        """Unique survey locations, survey count per location and mean fields."""
+
+        interp = self.interpolator
+        interp.load_data_and_models()
+        survey_predictions = interp.predict_survey_points()
+        fields = field_columns(survey_predictions)
+        coords, values = interp.aggregate_locations(survey_predictions, fields)
+        # Same sorted grouping as aggregate_locations
+        counts = survey_predictions.groupby(['longitude', 'latitude'], sort=True).size().values
+
+        print(f"✓ {len(survey_predictions)} surveys at {len(coords)} unique locations")
+        return coords, counts, values, fields
+
+    def build(self, coords: np.ndarray, boundary=None) -> Tuple[np.ndarray, np.ndarray]:
+        """Voronoi cells of ``coords`` clipped to ``boundary``, one per site.
+        
+        Returns the cells and a per-site mask of sites with no area inside
+        the boundary; their cell is clipped to the ``outside_radius`` disc
+        around the site instead.
+        """
+
+        cells = voronoi_cells(coords)
+        print(f"✓ Built {len(cells)} Voronoi cells")
+
+        outside = np.zeros(len(cells), dtype=bool)
+        if boundary is None:
+            return cells, outside
+
+        kept, clipped = clip_cells(cells, boundary)
+        print(f"✓ Clipped to boundary ({len(shapely.get_parts(boundary))} part(s)): {len(kept)} cells kept")
+        outside[:] = True
+        outside[kept] = False
+        if outside.any():
+            discs = shapely.buffer(shapely.points(coords[outside]), self.outside_radius)
+            cells[outside] = shapely.intersection(cells[outside], discs)
+            print(f"⚠️  {int(outside.sum())} location(s) outside the boundary: cell clipped to "
+                  f"{self.outside_radius}° around the site (outside=true)")
+        cells[kept] = clipped
+        return cells, outside
+
+    def export_geojson(
+        self,
+        cells: np.ndarray,
+        properties: pd.DataFrame,
+        output_file: str = "data/geojson/AI_Service_Areas.geojson",
+        coord_precision: int = 5,
+        value_precision: int = 3
+    ):
+        """Write cells as polygon features (one %-template per feature)."""
+
+        # Snap to the output precision first (keeps polygons valid)
+        geometries = shapely.to_geojson(shapely.set_precision(cells, 10.0 ** -coord_precision))
+
+        columns = field_columns(properties)
+        rows = properties[['location', 'surveys', 'area_km2', 'longitude', 'latitude'] + columns].copy()
+        rows.insert(3, 'outside', np.where(properties['outside'], 'true', 'false'))
+        template = (
+            '{"type":"Feature","geometry":%s,"properties":{"location":%d,"surveys":%d,"area_km2":%.3f,'
+            f'"outside":%s,"site":[%.{coord_precision}f,%.{coord_precision}f],'
+            + ','.join(f'"{col}":%.{value_precision}f' for col in columns)
+            + '}}'
+        )
+
+        output_path = Path(output_file)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(output_path, 'w', encoding='utf-8') as f:
+            f.write('{"type":"FeatureCollection","features":[\n')
+            f.write(',\n'.join(template % (geometry, *row)
+                               for geometry, row in zip(geometries.tolist(), rows.values.tolist())))
+            f.write('\n]}\n')
+
+        print(f"\n✓ Exported {len(rows)} service areas to {output_path}")
+        print(f"  File size: {output_path.stat().st_size / 1024:.1f} KB")
+
+    def run_pipeline(self, output_file: str = "data/geojson/AI_Service_Areas.geojson") -> pd.DataFrame:
+        """Unique locations → clipped Voronoi cells → polygon layer (one row per location)."""
+
+        print("\n=== Starting Voronoi Service Areas ===\n")
+
+        if not HAS_SHAPELY:
+            print("⚠️  shapely not available, skipping service areas")
+            return pd.DataFrame()
+
+        coords, counts, values, fields = self.sites()
+        boundary = self.interpolator.study_boundary(buffer=self.buffer)
+        cells, outside = self.build(coords, boundary)
+
+        # Equirectangular area at each cell's latitude
+        centroids = shapely.get_coordinates(shapely.centroid(cells))
+        area_km2 = (shapely.area(cells) * METRES_PER_DEGREE ** 2
+                    * np.cos(np.radians(centroids[:, 1])) / 1e6)
+
+        properties = pd.DataFrame({
+            'location': np.arange(len(coords)),
+            'surveys': counts,
+            'area_km2': area_km2,
+            'outside': outside,
+            'longitude': coords[:, 0],
+            'latitude': coords[:, 1]
+        })
+        properties[fields] = values
+
+        self.export_geojson(cells, properties, output_file)
+
+        print(f"  Median area {np.median(area_km2):.1f} km², total {area_km2.sum():.0f} km²")
+        print("\n=== Voronoi Service Areas Complete ===")
+        return properties
+
+
+if __name__ == "__main__":
+    import sys
+
+    # e.g. python service_areas.py 0.02
+    buffer = float(sys.argv[1]) if len(sys.argv) > 1 else 0.02
+
+    builder = ServiceAreaBuilder(buffer=buffer)
+    builder.run_pipeline()
@@ -0,0 +1,376 @@
+"""
+Polygon Simplification
+=======================
+Per-zoom, topology-preserving simplified copies of a polygon layer.
+
+Input: data/geojson/Preservations.geojson (any Polygon/MultiPolygon layer)
+Output: data/geojson/preservations/Preservations_z<zoom>.geojson  one variant per zoom
+        data/geojson/preservations/Preservations_index.json       zoom range → variant
+
+Each variant is built for a zoom level: the tolerance is ``pixels``
+screen pixels at that zoom (MapLibre 512px tiles), and the kept vertices
+are rounded to the coarsest decimal grid finer than half the tolerance,
+so they are written with 3-6 decimals instead of 15. The last variant
+keeps every vertex (only rounded, 6 decimals ≈ 0.1m).
+
+Topology is preserved across features, as in TopoJSON: rings are cut into
+arcs at junctions (vertices where rings sharing a border diverge), and
+every arc is simplified once with Douglas-Peucker, junctions fixed, before
+rounding. Borders shared by two features (or duplicated features) are
+therefore simplified identically and stay shared. Arcs are simplified in a
+canonical direction, so an arc traversed the other way round by a
+neighbour gives the same result. Features whose result is invalid, or
+that vanish entirely, get their arcs re-simplified with half the
+tolerance and one more decimal, down to full precision if needed; rings
+that collapse below three vertices are otherwise dropped (small islands
+at low zoom). Only a feature still invalid with every arc at full
+precision falls back to shapely's coverage_simplify, together with the
+features sharing arcs with it.
+"""
+
+import json
+import numpy as np
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from grid_pyramid import TILE_SIZE, MAX_ZOOM
+from isobands import HAS_SHAPELY
+
+if HAS_SHAPELY:
+    import shapely
+    from shapely.geometry import shape
+
+
+DEFAULT_ZOOMS = (6, 8, 10, 12)
+
+# Full-detail variant: quantized only
+FULL_DECIMALS = 6
+
+
+def zoom_tolerance(zoom: float, pixels: float = 1.0) -> float:
+    """Degrees spanned by ``pixels`` screen pixels at ``zoom``."""
+
+    return pixels * 360.0 / (TILE_SIZE * 2 ** zoom)
+
+
+def douglas_peucker(points: np.ndarray, tolerance: float) -> np.ndarray:
+    """Mask of the vertices Douglas-Peucker keeps on an open polyline (ends fixed).
+
+    A closed arc (first point == last) keeps the vertex farthest from its
+    start first, so it splits into two halves like an open one.
+    """
+
+    n = len(points)
+    keep = np.zeros(n, dtype=bool)
+    keep[[0, -1]] = True
+    stack = [(0, n - 1)]
+    while stack:
+        i, j = stack.pop()
+        if j <= i + 1:
+            continue
+        a, d = points[i], points[j] - points[i]
+        rel = points[i + 1:j] - a
+        length = np.hypot(d[0], d[1])
+        if length == 0:
+            dist = np.hypot(rel[:, 0], rel[:, 1])
+        else:
+            dist = np.abs(d[0] * rel[:, 1] - d[1] * rel[:, 0]) / length
+        k = int(np.argmax(dist))
+        if dist[k] > tolerance:
+            keep[i + 1 + k] = True
+            stack.extend([(i, i + 1 + k), (i + 1 + k, j)])
+    return keep
+
+
+def quantize_ring(ring: Sequence[Sequence[float]], grid: float) -> np.ndarray:
+    """Integer grid coordinates of an open ring, repeated vertices removed."""
+
+    q = np.rint(np.asarray(ring, dtype=float)[:, :2] / grid).astype(np.int64)
+    q = q[np.any(q != np.roll(q, 1, axis=0), axis=1)] if len(q) > 1 else q
+    return q
+
+
+def junctions(rings: List[np.ndarray]) -> Tuple[List[np.ndarray], np.ndarray]:
+    """Vertex ids per ring, and a mask of junction vertex ids.
+
+    A vertex is a junction when its occurrences have different (unordered)
+    neighbour pairs, i.e. where rings that share it run apart.
+    """
+
+    all_points = np.concatenate(rings)
+    _, vertex_ids = np.unique(all_points, axis=0, return_inverse=True)
+    vertex_ids = vertex_ids.ravel()
+    splits = np.cumsum([len(r) for r in rings])[:-1]
+    ids = np.split(vertex_ids, splits)
+
+    prev = np.concatenate([np.roll(r, 1) for r in ids])
+    nxt = np.concatenate([np.roll(r, -1) for r in ids])
+    pairs = np.column_stack([vertex_ids, np.minimum(prev, nxt), np.maximum(prev, nxt)])
+    distinct = np.unique(pairs, axis=0)
+    per_vertex = np.bincount(distinct[:, 0], minlength=int(vertex_ids.max()) + 1)
+    return ids, per_vertex > 1
+
+
+class PolygonSimplifier:
+    """Zoom-level variants of a polygon layer with shared borders kept shared."""
+
+    def __init__(self, input_file: str = "data/geojson/Preservations.geojson",
+                 output_dir: Optional[str] = None, pixels: float = 1.0):
+        self.input_path = Path(input_file)
+        self.output_dir = Path(output_dir) if output_dir else self.input_path.parent / self.input_path.stem.lower()
+        self.pixels = pixels
+        self.collection = None
+
+    def load(self):
+        """Read the layer; every feature's polygons as lists of rings."""
+
+        with open(self.input_path, 'r', encoding='utf-8') as f:
+            self.collection = json.load(f)
+
+        self.polygons = []
+        for feature in self.collection['features']:
+            geometry = feature['geometry']
+            parts = [geometry['coordinates']] if geometry['type'] == 'Polygon' else geometry['coordinates']
+            self.polygons.append(parts)
+
+        n_vertices = sum(len(ring) for parts in self.polygons for polygon in parts for ring in polygon)
+        size = self.input_path.stat().st_size / 1024
+        print(f"✓ Loaded {len(self.polygons)} features, {n_vertices} vertices ({size:.1f} KB)")
+
+    def build_arcs(self):
+        """Cut every ring into arcs at junctions, on the full-detail grid."""
+
+        grid = 10.0 ** -FULL_DECIMALS
+
+        # Flat ring list: (feature, part, ring index) → quantized open ring
+        keys, rings = [], []
+        for f_idx, parts in enumerate(self.polygons):
+            for p_idx, polygon in enumerate(parts):
+                for r_idx, ring in enumerate(polygon):
+                    q = quantize_ring(ring[:-1] if ring[0] == ring[-1] else ring, grid)
+                    if len(q) >= 3:
+                        keys.append((f_idx, p_idx, r_idx))
+                        rings.append(q)
+
+        ids, is_junction = junctions(rings)
+        self.vertex_xy = {}
+        for q, r in zip(rings, ids):
+            self.vertex_xy.update(zip(r.tolist(), (q * grid).tolist()))
+
+        # Each ring as a sequence of (canonical arc, reversed?)
+        self.ring_arcs = {}
+        for key, r in zip(keys, ids):
+            r = r.tolist()
+            cuts = [i for i, v in enumerate(r) if is_junction[v]]
+            if not cuts:
+                # Closed arc starting at its smallest vertex
+                start = r.index(min(r))
+                r = r[start:] + r[:start]
+                arcs = [r + [r[0]]]
+            else:
+                r = r[cuts[0]:] + r[:cuts[0]]
+                cuts = [c - cuts[0] for c in cuts] + [len(r)]
+                r = r + [r[0]]
+                arcs = [r[a:b + 1] for a, b in zip(cuts[:-1], cuts[1:])]
+            # Canonical direction, so shared arcs simplify identically
+            self.ring_arcs[key] = [(min(tuple(a), tuple(a[::-1])), tuple(a[::-1]) < tuple(a)) for a in arcs]
+
+        n_arcs = len({arc for arcs in self.ring_arcs.values() for arc, _ in arcs})
+        n_shared = sum(len(arcs) for arcs in self.ring_arcs.values()) - n_arcs
+        print(f"✓ {len(rings)} rings → {n_arcs} arcs ({n_shared} shared), "
+              f"{int(is_junction.sum())} junctions")
+
+    def simplify_level(self, tolerance: float, decimals: int) -> Tuple[List[List], int]:
+        """Simplified MultiPolygon coordinates per feature, plus fallback count.
+
+        Arcs of features that come out invalid (or vanish) are refined, with
+        half the tolerance and one more decimal per round, until they are
+        at full precision. A junction is rounded to the finest decimals of
+        the arcs meeting there, so every ring rounds it alike. Only features
+        still broken with all their arcs at full precision fall back, together
+        with the features sharing arcs with them (see group_fallback).
+        """
+
+        vertex_xy, ring_arcs = self.vertex_xy, self.ring_arcs
+        grid = 10.0 ** -FULL_DECIMALS
+
+        arc_tolerance = {arc: tolerance for arcs in ring_arcs.values() for arc, _ in arcs}
+        arc_decimals = dict.fromkeys(arc_tolerance, decimals)
+        cache = {}
+        while True:
+            for arc, arc_tol in arc_tolerance.items():
+                if arc not in cache:
+                    points = np.array([vertex_xy[v] for v in arc], dtype=float)
+                    cache[arc] = [v for v, k in zip(arc, douglas_peucker(points, arc_tol)) if k]
+
+            junction_decimals = {}
+            for arc, places in arc_decimals.items():
+                for v in (arc[0], arc[-1]):
+                    junction_decimals[v] = max(junction_decimals.get(v, decimals), places)
+
+            simplified = {}
+            for key, arcs in ring_arcs.items():
+                points = []
+                for arc, reverse in arcs:
+                    kept = (cache[arc][::-1] if reverse else cache[arc])[:-1]
+                    places = [junction_decimals[kept[0]]] + [arc_decimals[arc]] * (len(kept) - 1)
+                    points.extend([round(vertex_xy[v][0], d), round(vertex_xy[v][1], d)]
+                                  for v, d in zip(kept, places))
+                points = [p for i, p in enumerate(points) if p != points[i - 1]]
+                if len(points) >= 3:
+                    simplified[key] = points + points[:1]
+
+            features, broken = [], set()
+            for f_idx, parts in enumerate(self.polygons):
+                coords = []
+                for p_idx, polygon in enumerate(parts):
+                    if (f_idx, p_idx, 0) not in simplified:
+                        continue  # Outer ring collapsed: drop the part
+                    coords.append([simplified[(f_idx, p_idx, 0)]] + [
+                        simplified[(f_idx, p_idx, r_idx)] for r_idx in range(1, len(polygon))
+                        if (f_idx, p_idx, r_idx) in simplified
+                    ])
+                if not coords or not shapely.is_valid(shape({'type': 'MultiPolygon', 'coordinates': coords})):
+                    broken.add(f_idx)
+                features.append(coords)
+
+            # Refine every arc of a broken feature not yet at full precision
+            # (neighbours sharing those arcs follow, so borders stay shared)
+            refine = {
+                arc for key, arcs in ring_arcs.items() if key[0] in broken for arc, _ in arcs
+                if arc_tolerance[arc] > 0 or arc_decimals[arc] < FULL_DECIMALS
+            }
+            if not refine:
+                break
+            for arc in refine:
+                # Below half a grid cell Douglas-Peucker keeps every vertex anyway
+                arc_tolerance[arc] = arc_tolerance[arc] / 2 if arc_tolerance[arc] / 2 >= grid / 2 else 0.0
+                arc_decimals[arc] = min(arc_decimals[arc] + 1, FULL_DECIMALS)
+                cache.pop(arc, None)
+
+        group = self.arc_neighbours(broken)
+        if group:
+            for f_idx, coords in self.group_fallback(sorted(group), tolerance, decimals).items():
+                features[f_idx] = coords
+        return features, len(group)
+
+    def arc_neighbours(self, features: set) -> set:
+        """``features`` plus every feature sharing an arc with one of them."""
+
+        if not features:
+            return set()
+        arcs = {arc for key, ring in self.ring_arcs.items() if key[0] in features for arc, _ in ring}
+        return set(features) | {key[0] for key, ring in self.ring_arcs.items()
+                                if any(arc in arcs for arc, _ in ring)}
+
+    def group_fallback(self, group: List[int], tolerance: float, decimals: int) -> Dict[int, List]:
+        """Simplify features that stay broken at full precision together with their neighbours.
+
+        The source geometries are repaired with make_valid (they are what
+        stays invalid), then shapely.coverage_simplify keeps the edges shared
+        inside the group shared; the result is snapped to the level grid
+        (full precision for features smaller than one grid cell).
+        """
+
+        geometries = shapely.make_valid(np.array([
+            shape({'type': 'MultiPolygon', 'coordinates': self.polygons[f]}) for f in group
+        ]))
+        simple = shapely.coverage_simplify(geometries, tolerance) if tolerance > 0 else geometries
+        result = {}
+        for f_idx, geometry in zip(group, simple):
+            places = decimals
+            snapped = shapely.set_precision(geometry, 10.0 ** -places)
+            if shapely.is_empty(snapped):
+                places = FULL_DECIMALS
+                snapped = shapely.set_precision(geometry, 10.0 ** -places)
+            geojson = shapely.to_geojson(shapely.multipolygons(shapely.get_parts(snapped)))
+            result[f_idx] = json.loads(geojson, parse_float=lambda v, d=places: round(float(v), d))['coordinates']
+        return result
+
+    def write_variant(self, features: List[List], path: Path) -> Tuple[int, float]:
+        """Write one variant; returns its vertex count and size in KB."""
+
+        collection = {
+            key: value for key, value in self.collection.items() if key != 'features'
+        }
+        collection['features'] = [
+            {**feature, 'geometry': {'type': 'MultiPolygon', 'coordinates': coords}}
+            for feature, coords in zip(self.collection['features'], features)
+        ]
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(collection, f, ensure_ascii=False, separators=(',', ':'))
+
+        n_vertices = sum(len(ring) for coords in features for polygon in coords for ring in polygon)
+        return n_vertices, path.stat().st_size / 1024
+
+    def run_pipeline(self, zooms: Sequence[int] = DEFAULT_ZOOMS) -> Dict:
+        """Build every zoom variant and the index."""
+
+        print("\n=== Starting Polygon Simplification ===\n")
+
+        if not HAS_SHAPELY:
+            print("⚠️  shapely not available, skipping simplification")
+            return {}
+
+        self.load()
+        self.build_arcs()
+        stem = self.input_path.stem
+        zooms = sorted(zooms)
+
+        # Variant i serves [zooms[i], zooms[i+1]); full detail one step past the last
+        step = zooms[-1] - zooms[-2] if len(zooms) > 1 else 2
+        bounds = [0] + list(zooms[1:]) + [zooms[-1] + step, MAX_ZOOM]
+
+        levels = []
+        for i, zoom in enumerate(list(zooms) + [None]):
+            if zoom is None:
+                tolerance, decimals, name = 0.0, FULL_DECIMALS, f"{stem}_full.geojson"
+            else:
+                tolerance = zoom_tolerance(zoom, self.pixels)
+                decimals = min(int(np.ceil(-np.log10(tolerance / 2))), FULL_DECIMALS)
+                name = f"{stem}_z{zoom}.geojson"
+
+            features, fallbacks = self.simplify_level(tolerance, decimals)
+            n_vertices, size = self.write_variant(features, self.output_dir / name)
+
+            levels.append({
+                'minzoom': bounds[i],
+                'maxzoom': bounds[i + 1],
+                'tolerance': tolerance,
+                'decimals': decimals,
+                'file': name,
+                'vertices': n_vertices,
+                'size_kb': round(size, 1),
+                'fallbacks': fallbacks
+            })
+            note = f", {fallbacks} feature(s) via coverage fallback" if fallbacks else ""
+            label = f"z{zoom}" if zoom is not None else "full"
+            print(f"  {label:>5}: tolerance {tolerance:.6f}°, {decimals} decimals → "
+                  f"{n_vertices} vertices, {size:.1f} KB{note}")
+
+        index = {
+            'name': stem,
+            'source': self.input_path.name,
+            'pixels': self.pixels,
+            # Lowest zoom first
+            'levels': levels
+        }
+        index_path = self.output_dir / f"{stem}_index.json"
+        with open(index_path, 'w', encoding='utf-8') as f:
+            json.dump(index, f, indent=2)
+        print(f"\n✓ Wrote {len(levels)} variants + {index_path}")
+
+        print("\n=== Polygon Simplification Complete ===")
+        return index
+
+
+if __name__ == "__main__":
+    import sys
+
+    # e.g. python simplify_polygons.py data/geojson/Preservations.geojson 6 8 10 12
+    input_file = sys.argv[1] if len(sys.argv) > 1 else "data/geojson/Preservations.geojson"
+    zooms = [int(z) for z in sys.argv[2:]] or DEFAULT_ZOOMS
+
+    simplifier = PolygonSimplifier(input_file)
+    simplifier.run_pipeline(zooms)
@@ -0,0 +1,21 @@
+"""
+Shared test setup: pipeline modules import each other by flat name and
+read data/ relative to the repository root, like run_pipeline.py.
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+PIPELINE_DIR = Path(__file__).resolve().parents[1]
+REPO_ROOT = PIPELINE_DIR.parents[1]
+
+sys.path.insert(0, str(PIPELINE_DIR))
+
+
+@pytest.fixture(autouse=True)
+def repo_root(monkeypatch) -> Path:
+    """Run every test from the repository root."""
+    monkeypatch.chdir(REPO_ROOT)
+    return REPO_ROOT
@@ -0,0 +1,45 @@
+"""Adaptive quadtree grid (adaptive_grid.py)."""
+
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from adaptive_grid import QuadtreeGrid
+from run_pipeline import PipelineOrchestrator
+
+
+def test_survey_counts_without_surveys_are_zero():
+    quadtree = QuadtreeGrid()
+    ix, iy = np.array([0, 1, 2]), np.array([0, 0, 1])
+
+    # No surveys at all, and only surveys south-west of the lattice origin
+    for surveys in (np.empty((0, 2)), np.array([[35.0, 33.0]])):
+        counts = quadtree.survey_counts(surveys, (35.5, 33.5), 0.04, ix, iy)
+        assert counts.tolist() == [0, 0, 0]
+    assert quadtree.survey_counts(np.array([[35.5, 33.5]]), (35.5, 33.5), 0.04,
+                                  ix[:0], iy[:0]).tolist() == []
+
+
+def test_non_finite_values_become_null(tmp_path):
+    cells = pd.DataFrame({
+        'west': [35.5, 35.54], 'south': [33.7, 33.7], 'east': [35.54, 35.58], 'north': [33.74, 33.74],
+        'level': [0, 0], 'size': [0.04, 0.04], 'surveys': [1, 0],
+        'Prob_Water': [0.25, np.nan], 'Prob_Climate': [np.inf, 0.5],
+    })
+    output = tmp_path / "adaptive.geojson"
+
+    QuadtreeGrid().export_geojson(cells, str(output))
+
+    features = json.loads(output.read_text(encoding='utf-8'))['features']
+    assert [f['properties'] for f in features] == [
+        {'level': 0, 'size': 0.04, 'surveys': 1, 'Prob_Water': 0.25, 'Prob_Climate': None},
+        {'level': 0, 'size': 0.04, 'surveys': 0, 'Prob_Water': None, 'Prob_Climate': 0.5},
+    ]
+    assert features[1]['geometry']['coordinates'][0][2] == [35.58, 33.74]
+
+
+def test_adaptive_grid_rejects_pyramid():
+    with pytest.raises(ValueError, match="pyramid"):
+        PipelineOrchestrator().run_grid_interpolation(adaptive=True, pyramid=True)
@@ -0,0 +1,70 @@
+"""Survey region boundaries (generate_boundary.py)."""
+
+import numpy as np
+import pytest
+import shapely
+from shapely.geometry import MultiPolygon, Polygon
+
+from generate_boundary import BoundaryGenerator, alpha_shape_polygons, ring_area
+
+
+def generator_for(coords, **kwargs):
+    generator = BoundaryGenerator(**kwargs)
+    generator.coords = np.asarray(coords, dtype=float)
+    return generator
+
+
+def test_isolated_surveys_get_their_own_region():
+    rng = np.random.default_rng(0)
+    cluster = np.array([35.55, 33.70]) + rng.normal(scale=0.01, size=(20, 2))
+    # Two surveys at one remote village, one at another: DBSCAN noise
+    isolated = np.array([[36.10, 33.95], [36.10, 33.95], [35.20, 33.30]])
+    generator = generator_for(np.vstack([cluster, isolated]))
+
+    labels = generator.cluster_regions(eps_km=8.0, min_samples=3)
+    regions = generator.compute_regions(labels)
+
+    assert (labels >= 0).all()
+    assert len(regions) == 3
+    outline = shapely.union_all([MultiPolygon([Polygon(p[0], p[1:]) for p in polygons])
+                                 for polygons in regions])
+    assert shapely.intersects_xy(outline, generator.coords[:, 0], generator.coords[:, 1]).all()
+
+
+def test_alpha_shape_pads_points_outside_kept_triangles():
+    # A dense village grid plus one survey only reachable by wide triangles
+    xs, ys = np.meshgrid(np.arange(5) * 0.01, np.arange(5) * 0.01)
+    points = np.vstack([np.column_stack([xs.ravel(), ys.ravel()]), [[0.2, 0.02]]]) + [35.5, 33.7]
+
+    polygons = alpha_shape_polygons(points, alpha=0.05)
+
+    shapes = [Polygon(p[0], p[1:]) for p in polygons]
+    assert all(shape.is_valid for shape in shapes)
+    assert all(ring_area(np.array(p[0])) > 0 for p in polygons)
+    assert shapely.intersects_xy(shapely.union_all(shapes), points[:, 0], points[:, 1]).all()
+    # The far survey gets a padded part of its own, not a wide triangle
+    assert len(polygons) == 2
+    assert max(shape.area for shape in shapes) < 0.05 ** 2
+
+
+def test_no_regions_and_area_description():
+    generator = generator_for(np.empty((0, 2)), area_name="Chouf")
+
+    assert generator.compute_regions(np.empty(0, dtype=int), workers=4) == []
+    assert generator.description().endswith("in Chouf")
+    assert "Mount Lebanon" not in generator_for(np.empty((0, 2))).description()
+
+
+@pytest.mark.parametrize('method, eps_km', [('alpha_shape', 8.0), ('alpha_shape', 0), ('convex_hull', 8.0)])
+def test_every_survey_lies_in_its_region(repo_root, method, eps_km):
+    generator = BoundaryGenerator(data_path=str(repo_root / "data" / "ml_prepared_data.csv"))
+    generator.load_coordinates()
+
+    labels = generator.cluster_regions(eps_km=eps_km)
+    regions = generator.compute_regions(labels, method=method, workers=1)
+
+    for region, polygons in enumerate(regions):
+        outline = shapely.union_all([Polygon(p[0], p[1:]) for p in polygons])
+        coords = generator.coords[labels == region]
+        assert outline.is_valid
+        assert shapely.intersects_xy(outline, coords[:, 0], coords[:, 1]).all(), region
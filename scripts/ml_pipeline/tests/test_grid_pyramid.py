@@ -0,0 +1,20 @@
+"""Raster pyramid levels (grid_pyramid.py)."""
+
+import json
+
+from interpolate_grid import GridInterpolator
+
+
+def test_default_study_grid_gets_coarser_levels(tmp_path):
+    GridInterpolator().run_pipeline(pyramid=True, export_bands=False, output_dir=str(tmp_path))
+
+    with open(tmp_path / "rasters" / "AI_Grid_Predictions_pyramid.json", encoding='utf-8') as f:
+        index = json.load(f)
+
+    finest = index['levels'][-1]
+    assert finest['level'] == 0 and min(finest['shape']) < 128
+    # At least one level coarser than the finest raster, each with its overlays
+    assert len(index['levels']) >= 2
+    for entry in index['levels'][:-1]:
+        assert (tmp_path / "rasters" / entry['raster']).exists()
+        assert entry['overlays']
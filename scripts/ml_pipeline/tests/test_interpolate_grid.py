@@ -0,0 +1,48 @@
+"""Grid GeoJSON export (interpolate_grid.py)."""
+
+import json
+
+import numpy as np
+import pandas as pd
+
+from interpolate_grid import GridInterpolator
+
+
+def export(tmp_path, grid_df, **kwargs):
+    output = tmp_path / "grid.geojson"
+    GridInterpolator().export_geojson(grid_df, str(output), **kwargs)
+    return json.loads(output.read_text(encoding='utf-8'))['features']
+
+
+def test_non_finite_values_become_null(tmp_path):
+    grid_df = pd.DataFrame({
+        'longitude': [35.5, 35.6, 35.7],
+        'latitude': [33.7, 33.7, 33.7],
+        'Prob_Financial': [0.25, np.nan, np.inf],
+        'Prob_Water': [0.5, 0.75, -np.inf],
+    })
+
+    features = export(tmp_path, grid_df)
+
+    assert [f['properties'] for f in features] == [
+        {'Prob_Financial': 0.25, 'Prob_Water': 0.5},
+        {'Prob_Financial': None, 'Prob_Water': 0.75},
+        {'Prob_Financial': None, 'Prob_Water': None},
+    ]
+    assert features[0]['geometry']['coordinates'] == [35.5, 33.7]
+
+
+def test_drop_no_signal_uses_survey_distance(tmp_path):
+    # Distance-weighted values never reach exactly 0.5, so the value is no test
+    grid_df = pd.DataFrame({
+        'longitude': [35.50, 35.53, 35.60, 35.80],
+        'latitude': [33.70, 33.70, 33.70, 33.70],
+        'Prob_Regen': [0.40, 0.45, 0.49, 0.4999],
+        'Std_Regen': [0.1, 0.1, 0.1, 0.1],
+    })
+    surveys = np.array([[35.50, 33.70]])
+
+    features = export(tmp_path, grid_df, drop_no_signal=True, survey_coords=surveys)
+
+    assert [f['geometry']['coordinates'][0] for f in features] == [35.5, 35.53]
+    assert all(set(f['properties']) == {'Prob_Regen'} for f in features)
@@ -0,0 +1,30 @@
+"""Isoband polygons (isobands.py)."""
+
+import warnings
+
+import numpy as np
+
+from isobands import isoband_features
+
+
+def lattice(z):
+    ny, nx = z.shape
+    return 35.5 + np.arange(nx) * 0.01, 33.7 + np.arange(ny) * 0.01
+
+
+def test_field_without_finite_values_is_skipped(capsys):
+    z = np.full((6, 8), np.nan)
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        assert isoband_features('Prob_Water', *lattice(z), z) == []
+    assert "no finite values" in capsys.readouterr().out
+
+
+def test_partly_masked_field_keeps_its_classes():
+    z = np.tile(np.linspace(0.0, 1.0, 8), (6, 1))
+    z[:2] = np.nan
+
+    features = isoband_features('Prob_Water', *lattice(z), z)
+
+    assert {f['properties']['class'] for f in features} == {0, 1, 2, 3, 4}
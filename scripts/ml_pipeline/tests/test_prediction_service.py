@@ -0,0 +1,88 @@
+"""Request handling of the local prediction service (prediction_service.py)."""
+
+import asyncio
+import json
+
+import pytest
+
+from prediction_service import PredictionService
+
+
+@pytest.fixture
+def service():
+    service = PredictionService()
+    service.load()
+    return service
+
+
+def exchange(service, raw_requests):
+    """Send raw HTTP requests on one connection; return (status, body) per response."""
+
+    async def run():
+        batch_task = service.batcher.start()
+        server = await asyncio.start_server(service.handle_connection, '127.0.0.1', 0)
+        port = server.sockets[0].getsockname()[1]
+        try:
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            writer.write(b''.join(raw_requests))
+            await writer.drain()
+            responses = []
+            while len(responses) < len(raw_requests):
+                status_line = await reader.readline()
+                if not status_line:
+                    break
+                headers = {}
+                while (line := await reader.readline()) not in (b'\r\n', b''):
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers['content-length']))
+                responses.append((int(status_line.split()[1]), json.loads(body)))
+            writer.close()
+            return responses
+        finally:
+            server.close()
+            batch_task.cancel()
+
+    return asyncio.run(run())
+
+
+def post(body: bytes, length=None) -> bytes:
+    length = len(body) if length is None else length
+    return (b"POST /predict HTTP/1.1\r\nHost: test\r\n"
+            + f"Content-Length: {length}\r\n\r\n".encode('ascii') + body)
+
+
+@pytest.mark.parametrize('body', [
+    b'{"features": {"has_solar": null}}',
+    b'{"features": {"has_solar": "yes"}}',
+    b'[1, 2, 3]',
+    b'"features"',
+    b'{"featureId": "%s", "overrides": []}',
+    b'not json',
+    b'\xff\xfe',
+])
+def test_malformed_bodies_get_400_and_keep_connection(service, body):
+    if b'%s' in body:
+        body = body % next(iter(service.farmers)).encode('ascii')
+    valid = post(json.dumps({'features': {'has_solar': 1}}).encode('utf-8'))
+
+    responses = exchange(service, [post(body), valid])
+
+    assert responses[0][0] == 400
+    assert 'error' in responses[0][1]
+    # The connection survives the bad request and still serves predictions
+    assert responses[1][0] == 200
+    assert any(key.startswith('Prob_') for key in responses[1][1])
+
+
+def test_malformed_feature_vectors_get_400(service):
+    width = len(service.features)
+    for values in ([None] * width, [[0.0]] * width, ['1'] * width):
+        status, result = exchange(service, [post(json.dumps({'features': values}).encode('utf-8'))])[0]
+        assert status == 400, values
+        assert 'error' in result
+
+
+def test_invalid_content_length_gets_400(service):
+    responses = exchange(service, [post(b'{}', length='abc')])
+    assert responses == [(400, {'error': "Invalid Content-Length: 'abc'"})]
@@ -0,0 +1,55 @@
+"""Composite layer expressions (raster_algebra.py)."""
+
+import numpy as np
+import pytest
+
+from raster_algebra import FUNCTIONS, RasterAlgebra, parse_expression
+
+
+@pytest.fixture
+def algebra():
+    algebra = RasterAlgebra()
+    algebra.fields = {
+        'Prob_Water': np.array([[0.2, 0.8], [np.nan, 0.6]]),
+        'Prob_Climate': np.array([[0.4, 0.4], [np.nan, 1.0]]),
+    }
+    return algebra
+
+
+@pytest.mark.parametrize('expression, message', [
+    ('where(Prob_Water > 0.5, 1)', r'where\(\) takes 3 argument'),
+    ('abs + 1', 'function abs used as a value'),
+    ('weighted(Prob_Water, 1, Prob_Climate)', 'value, weight pairs'),
+])
+def test_bad_expressions_are_rejected_when_parsed(expression, message):
+    with pytest.raises(ValueError, match=message):
+        parse_expression(expression)
+
+
+def test_bad_layers_are_skipped_and_the_rest_evaluated(algebra, capsys):
+    layers = [
+        {'name': 'Arity', 'expression': 'where(Prob_Water > 0.5, 1)'},
+        {'name': 'Function_Value', 'expression': 'abs + 1'},
+        {'name': 'Unpaired', 'expression': 'weighted(Prob_Water, 1, Prob_Climate)'},
+        {'name': 'Compound', 'expression': 'weighted(Prob_Water, 1, Prob_Climate, 1)'},
+    ]
+
+    results = algebra.evaluate_layers(layers)
+
+    assert list(results) == ['Compound']
+    np.testing.assert_allclose(results['Compound'], [[0.3, 0.6], [np.nan, 0.8]])
+    assert capsys.readouterr().out.count('⚠️') == 3
+
+
+def test_evaluation_errors_skip_the_layer(algebra, monkeypatch, capsys):
+    def broken(*args):
+        raise TypeError("unexpected input")
+    monkeypatch.setitem(FUNCTIONS, 'sqrt', broken)
+
+    results = algebra.evaluate_layers([
+        {'name': 'Broken', 'expression': 'sqrt(Prob_Water)'},
+        {'name': 'Gap', 'expression': 'Prob_Climate - Prob_Water'},
+    ])
+
+    assert list(results) == ['Gap']
+    assert 'Broken: evaluation failed (TypeError' in capsys.readouterr().out
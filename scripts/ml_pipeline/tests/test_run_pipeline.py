@@ -0,0 +1,103 @@
+"""Pipeline orchestration (run_pipeline.py)."""
+
+import json
+import os
+import shutil
+
+import pytest
+import shapely
+from shapely.geometry import shape
+
+import run_pipeline
+from run_pipeline import PipelineOrchestrator, publish_staged, swap_directory
+
+
+def test_clean_full_run_masks_grid_to_new_boundary(repo_root, tmp_path, monkeypatch):
+    # Only the canonical survey layers: no prepared data, models or boundary yet
+    shutil.copytree(repo_root / "data" / "geojson" / "canonical", tmp_path / "data" / "geojson" / "canonical")
+    monkeypatch.chdir(tmp_path)
+
+    orchestrator = PipelineOrchestrator()
+    assert orchestrator.run_full_pipeline()
+
+    steps = list(orchestrator.timings)
+    assert steps.index('boundary_generation') < steps.index('grid_interpolation')
+
+    geojson = tmp_path / "data" / "geojson"
+    with open(geojson / "Farmers_Boundary.geojson", encoding='utf-8') as f:
+        regions = [shape(feature['geometry']) for feature in json.load(f)['features']]
+    with open(geojson / "AI_Grid_Predictions.geojson", encoding='utf-8') as f:
+        cells = [feature['geometry']['coordinates'] for feature in json.load(f)['features']]
+
+    # The grid is masked to the buffered regions, not the hull of all surveys
+    mask = shapely.union_all(regions).buffer(0.02 + 1e-5)
+    assert cells
+    assert all(shapely.contains_xy(mask, x, y) for x, y in cells)
+
+
+def test_preview_leaves_production_files_alone(repo_root, tmp_path, monkeypatch):
+    shutil.copytree(repo_root / "data" / "geojson" / "canonical", tmp_path / "data" / "geojson" / "canonical")
+    shutil.copytree(repo_root / "data" / "models", tmp_path / "data" / "models")
+    shutil.copy2(repo_root / "data" / "ml_prepared_data.csv", tmp_path / "data")
+    monkeypatch.chdir(tmp_path)
+    production = {path: path.read_bytes() for path in (tmp_path / "data").rglob('*')
+                  if path.is_file() and 'canonical' not in path.parts}
+
+    orchestrator = PipelineOrchestrator()
+    orchestrator.run_preview()
+
+    assert {path: path.read_bytes() for path in production} == production
+    assert not (tmp_path / "data" / "geojson" / "AI_Grid_Predictions.geojson").exists()
+    preview = tmp_path / "data" / "preview"
+    assert (preview / "geojson" / "AI_Grid_Predictions.geojson").exists()
+    assert (preview / "models" / "feature_list.json").exists()
+    assert not list((tmp_path / "data").glob(".staging-*"))
+
+    # Only a refine promotes the preview into data/
+    assert orchestrator.run_refine((tmp_path / "data" / ".pipeline_run").read_text())
+    assert (tmp_path / "data" / "ml_prepared_data.csv").read_bytes() == \
+        (preview / "ml_prepared_data.csv").read_bytes()
+    assert (tmp_path / "data" / "geojson" / "AI_Grid_Predictions.geojson").exists()
+    manifest = json.loads((tmp_path / "data" / ".published.json").read_text())
+    assert manifest['run'] == (tmp_path / "data" / ".pipeline_run").read_text()
+    assert "geojson/AI_Grid_Predictions.geojson" in manifest['files']
+
+
+def write_files(root, files):
+    for name, text in files.items():
+        (root / name).parent.mkdir(parents=True, exist_ok=True)
+        (root / name).write_text(text)
+
+
+def read_files(root):
+    return {path.relative_to(root).as_posix(): path.read_text()
+            for path in root.rglob('*') if path.is_file()}
+
+
+def test_failed_publish_restores_the_previous_set(tmp_path, monkeypatch):
+    target, staging = tmp_path / "data", tmp_path / ".staging-1"
+    write_files(target, {"a.csv": "old a", "models/b.json": "old b"})
+    write_files(staging, {"a.csv": "new a", "models/b.json": "new b", "models/c.json": "new c"})
+
+    def failing_replace(src, dst, real_replace=os.replace):
+        if str(src).endswith("c.json") and staging.name in str(src):
+            raise OSError("disk full")
+        real_replace(src, dst)
+    monkeypatch.setattr(run_pipeline.os, 'replace', failing_replace)
+
+    with pytest.raises(OSError):
+        publish_staged(staging, target, run_id="1")
+
+    assert read_files(target) == {"a.csv": "old a", "models/b.json": "old b"}
+    assert not (tmp_path / ".staging-1-previous").exists()
+
+
+def test_swap_directory_replaces_the_whole_preview(tmp_path):
+    preview, staging = tmp_path / "preview", tmp_path / ".staging-2"
+    write_files(preview, {"a.csv": "old a", "stale.json": "old"})
+    write_files(staging, {"a.csv": "new a"})
+
+    assert swap_directory(staging, preview) == 1
+
+    assert read_files(preview) == {"a.csv": "new a"}
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["preview"]
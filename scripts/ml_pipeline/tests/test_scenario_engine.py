@@ -0,0 +1,41 @@
+"""What-if scenarios (scenario_engine.py)."""
+
+import json
+
+from scenario_engine import DEFAULT_SCENARIOS, ScenarioEngine
+
+# Properties of the web map's Model_Predictions.geojson layer
+MODEL_PREDICTIONS_SCHEMA = [
+    'Y', 'X', 'Village_Name', 'Practices_Regen', 'Water_Availability', 'Production_Level',
+    'Pred_Regen_Adoption', 'Pred_Water_Risk', 'Pred_Production_Level',
+    'theme', 'source_file', 'source_row',
+]
+
+
+def test_baseline_keeps_map_schema_and_scenarios_go_elsewhere(tmp_path):
+    engine = ScenarioEngine()
+    engine.run_pipeline(output_file=str(tmp_path / "scenarios.geojson"),
+                        baseline_file=str(tmp_path / "baseline.geojson"))
+
+    with open(tmp_path / "baseline.geojson", encoding='utf-8') as f:
+        baseline = json.load(f)['features']
+    with open(tmp_path / "scenarios.geojson", encoding='utf-8') as f:
+        scenarios = json.load(f)['features']
+
+    assert len(baseline) == len(engine.df)
+    assert all(list(feature['properties']) == MODEL_PREDICTIONS_SCHEMA for feature in baseline)
+    assert [f['properties']['source_row'] for f in baseline] == list(range(1, len(baseline) + 1))
+    assert len(scenarios) == (len(DEFAULT_SCENARIOS) - 1) * len(engine.df)
+    assert 'baseline' not in {f['properties']['scenario'] for f in scenarios}
+
+
+def test_solar_scenario_matches_training_derivation():
+    engine = ScenarioEngine()
+    engine.load_data_and_models()
+    solar = next(s for s in DEFAULT_SCENARIOS if s['name'] == 'solar_energy')
+
+    X = engine.apply_scenario(engine.df[engine.features].astype(float), solar)
+
+    # FeatureEngineer: has_solar = energy__10 > 0
+    assert (X['has_solar'] == (X['energy__10'] > 0)).all()
+    assert (X['has_solar'] == 1).all()
@@ -0,0 +1,45 @@
+"""Batch scoring of survey exports (score_survey.py)."""
+
+import pandas as pd
+import pytest
+
+from score_survey import SurveyScorer, energy_shares, weekly_litres
+
+SURVEY_EXPORT = "data/MZSurvey farmers ENGLISH_with_coords.csv"
+
+
+def score(tmp_path, csv_path, **kwargs):
+    scorer = SurveyScorer(**kwargs)
+    stats = scorer.score_file(csv_path, output_csv=str(tmp_path / "scores.csv"),
+                              output_geojson=str(tmp_path / "scores.geojson"))
+    return stats, pd.read_csv(tmp_path / "scores.csv")
+
+
+def test_energy_answers_become_source_shares():
+    assert energy_shares("Grid/Manual") == {
+        'energy__5': 50.0, 'energy__6': 0.0, 'energy__7': 50.0, 'energy__8': 0.0, 'energy__9': 0.0
+    }
+    assert energy_shares("Solar")['energy__9'] == 100.0
+    assert energy_shares(float('nan')) == {}
+    assert weekly_litres("Liters  diesel /week", "٣٠٠ ليتر اسيوعيا") == 300.0
+    assert weekly_litres("600L/week (Potato)") == 600.0
+
+
+def test_real_export_predictions_vary(tmp_path):
+    stats, scores = score(tmp_path, SURVEY_EXPORT)
+
+    assert stats['rows'] == len(scores) == 29
+    # Most model inputs come from the survey, not from training medians
+    assert sum(stats['coverage'].values()) / len(stats['coverage']) > 0.8
+    for col in [c for c in scores.columns if c.startswith('Prob_')]:
+        assert scores[col].nunique() >= 5, col
+        assert scores[col].std() > 0.02, col
+
+
+def test_mostly_imputed_export_is_refused(tmp_path):
+    export = pd.read_csv(SURVEY_EXPORT, encoding='utf-8-sig')
+    bare = tmp_path / "coords_only.csv"
+    export[['4. Village', 'X', 'Y']].to_csv(bare, index=False)
+
+    with pytest.raises(ValueError, match="median-filled"):
+        score(tmp_path, str(bare))
@@ -0,0 +1,39 @@
+"""Voronoi service areas (service_areas.py)."""
+
+import json
+
+import numpy as np
+import shapely
+
+from service_areas import ServiceAreaBuilder
+
+
+def test_sites_outside_boundary_keep_a_local_cell():
+    coords = np.array([[35.50, 33.70], [35.52, 33.71], [35.51, 33.73], [35.90, 34.00]])
+    boundary = shapely.box(35.45, 33.65, 35.60, 33.80)
+
+    cells, outside = ServiceAreaBuilder(outside_radius=0.02).build(coords, boundary)
+
+    assert len(cells) == len(coords)
+    assert outside.tolist() == [False, False, False, True]
+    assert (shapely.area(cells) > 0).all()
+    assert shapely.intersects_xy(cells, coords[:, 0], coords[:, 1]).all()
+    # Inside the boundary, or within the disc around the outside site
+    assert shapely.covers(boundary, cells[:3]).all()
+    assert shapely.hausdorff_distance(cells[3], shapely.Point(coords[3])) <= 0.02 + 1e-9
+
+
+def test_one_feature_per_survey_location(tmp_path):
+    builder = ServiceAreaBuilder()
+    output = tmp_path / "areas.geojson"
+    # A boundary around the western sites only, so some fall outside it
+    builder.interpolator.study_boundary = lambda buffer: shapely.box(35.0, 33.0, 35.55, 34.5)
+
+    properties = builder.run_pipeline(str(output))
+
+    coords, _, _, _ = builder.sites()
+    with open(output, encoding='utf-8') as f:
+        features = json.load(f)['features']
+    assert len(properties) == len(features) == len(coords)
+    assert sorted(f['properties']['location'] for f in features) == list(range(len(coords)))
+    assert 0 < sum(f['properties']['outside'] for f in features) < len(coords)
@@ -0,0 +1,53 @@
+"""Per-zoom protected-area variants (simplify_polygons.py)."""
+
+import json
+
+import shapely
+from shapely.geometry import shape
+
+from simplify_polygons import PolygonSimplifier
+
+PRESERVATIONS = "data/geojson/Preservations.geojson"
+
+
+def test_preservations_simplify_without_fallback(tmp_path):
+    index = PolygonSimplifier(PRESERVATIONS, output_dir=str(tmp_path)).run_pipeline()
+
+    # Every feature must come from the shared-arc simplification; a fallback
+    # would simplify it on its own and break borders shared with neighbours
+    assert {level['file']: level['fallbacks'] for level in index['levels']} == \
+        {level['file']: 0 for level in index['levels']}
+
+    with open(PRESERVATIONS, encoding='utf-8') as f:
+        source = json.load(f)['features']
+    for level in index['levels']:
+        with open(tmp_path / level['file'], encoding='utf-8') as f:
+            features = json.load(f)['features']
+        assert len(features) == len(source)
+        geometries = [shape(feature['geometry']) for feature in features]
+        assert all(not g.is_empty and shapely.is_valid(g) for g in geometries), level['file']
+
+
+def test_broken_feature_falls_back_with_its_neighbours(tmp_path):
+    # A self-intersecting feature stays invalid at full precision; its
+    # square neighbour shares the x=1 border with it
+    square = [[0, 0], [1, 0], [1, 1], [0, 1], [0, 0]]
+    bow_tie = [[1, 0], [2, 1], [2, 0], [1, 1], [1, 0]]
+    island = [[5, 5], [6, 5], [6, 6], [5, 6], [5, 5]]
+    source = tmp_path / "layer.geojson"
+    source.write_text(json.dumps({'type': 'FeatureCollection', 'features': [
+        {'type': 'Feature', 'properties': {}, 'geometry': {'type': 'Polygon', 'coordinates': [ring]}}
+        for ring in (square, bow_tie, island)
+    ]}), encoding='utf-8')
+
+    simplifier = PolygonSimplifier(str(source), output_dir=str(tmp_path / "out"))
+    simplifier.load()
+    simplifier.build_arcs()
+    features, fallbacks = simplifier.simplify_level(0.01, 3)
+
+    assert fallbacks == 2
+    geometries = [shape({'type': 'MultiPolygon', 'coordinates': coords}) for coords in features]
+    assert all(shapely.is_valid(g) and not g.is_empty for g in geometries)
+    # The border stays shared: the two touch along it without overlapping
+    assert shapely.intersection(geometries[0], geometries[1]).length == 1.0
+    assert shapely.intersection(geometries[0], geometries[1]).area == 0
@@ -0,0 +1,216 @@
+"""
+Interpolation Validation
+=========================
+Cross-validate grid interpolation methods against the survey predictions.
+
+Input: Prepared dataset + trained models (survey-point Prob_*/Std_* fields)
+Output: data/interpolation_validation.json with RMSE/MAE per method × field
+        (leave-one-out and spatial k-fold; raw and as mapped)
+
+Validation runs on unique survey locations (surveys sharing a village
+coordinate are averaged, as for the grid), so leave-one-out leaves out a
+whole location. Errors are reported twice: for the interpolated values
+(clipped to [0, 1]; this compares the methods), and as mapped, after the
+distance pull toward 0.5 with the distance to the nearest remaining
+location.
+
+Leave-one-out reuses one KD-tree and is computed in vectorized form:
+    - nearest: second-nearest neighbour of every location (one query)
+    - idw: k+1 nearest neighbours with the location itself dropped
+    - kriging: variograms fitted once; every location kriged from its k
+      nearest other locations in the batched solver
+    - linear: removing a vertex only changes the Delaunay triangles around
+      it, so each location is interpolated from a triangulation of its
+      Delaunay neighbours (a handful of points) instead of the full set;
+      hull locations fall back to nearest, as on the grid
+
+Spatial k-fold groups locations into ``n_folds`` clusters (k-means on
+coordinates) and interpolates each held-out cluster from the others, which
+tests extrapolation into unsurveyed areas rather than gap filling.
+"""
+
+import json
+import numpy as np
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from scipy.spatial import cKDTree, Delaunay, QhullError
+from sklearn.cluster import KMeans
+
+from interpolate_grid import GridInterpolator, field_columns, probability_mask, IDW_DEFAULTS
+from kriging import OrdinaryKriging
+
+
+METHODS = ('nearest', 'linear', 'idw', 'kriging')
+
+
+class InterpolationValidator:
+    """Leave-one-out and spatial k-fold errors for each interpolation method."""
+
+    def __init__(
+        self,
+        methods: List[str] = METHODS,
+        n_folds: int = 5,
+        max_distance: float = 0.05,
+        idw_options: Optional[Dict] = None
+    ):
+        self.methods = list(methods)
+        self.n_folds = n_folds
+        self.max_distance = max_distance
+        self.idw_options = {**IDW_DEFAULTS, **(idw_options or {})}
+        self.interpolator = GridInterpolator()
+        self.fields = []
+        self.coords = None
+        self.values = None
+        self.tree = None
+
+    def load(self):
+        """Survey-point predictions aggregated to unique locations."""
+
+        self.interpolator.load_data_and_models()
+        survey_predictions = self.interpolator.predict_survey_points()
+        self.fields = field_columns(survey_predictions)
+        self.coords, self.values = self.interpolator.aggregate_locations(survey_predictions, self.fields)
+        self.tree = cKDTree(self.coords)
+        print(f"✓ Validating on {len(self.coords)} unique survey locations, {len(self.fields)} fields")
+
+    def linear_loo(self, nearest_other: np.ndarray) -> np.ndarray:
+        """Linear leave-one-out from each location's Delaunay neighbours."""
+
+        triangulation = Delaunay(self.coords)
+        indptr, neighbours = triangulation.vertex_neighbor_vertices
+        predictions = self.values[nearest_other].copy()
+
+        for i in range(len(self.coords)):
+            ring = neighbours[indptr[i]:indptr[i + 1]]
+            try:
+                local = Delaunay(self.coords[ring])
+            except QhullError:
+                continue  # Degenerate (collinear) ring: keep the nearest fallback
+            simplex = int(local.find_simplex(self.coords[i]))
+            if simplex < 0:
+                continue  # Hull location: outside the remaining hull
+            # Barycentric weights of location i in its enclosing ring triangle
+            T = local.transform[simplex]
+            b = T[:2].dot(self.coords[i] - T[2])
+            weights = np.append(b, 1 - b.sum())
+            predictions[i] = weights @ self.values[ring[local.simplices[simplex]]]
+
+        return predictions
+
+    def leave_one_out(self, method: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Held-out (locations, fields) predictions for one method.
+
+        Returns the raw predictions and each location's distance to the
+        nearest remaining location.
+        """
+
+        distances, idx = self.tree.query(self.coords, k=2, workers=-1)
+        nearest_other, distance_other = idx[:, 1], distances[:, 1]
+
+        if method == 'nearest':
+            predictions = self.values[nearest_other]
+        elif method == 'idw':
+            predictions = self.interpolator.idw_values(
+                self.tree, self.values, self.coords, leave_one_out=True, **self.idw_options
+            )
+            missing = np.isnan(predictions).any(axis=1)
+            predictions[missing] = self.values[nearest_other[missing]]
+        elif method == 'kriging':
+            kriging = OrdinaryKriging(self.coords, self.values)
+            predictions, _ = kriging.predict(self.coords, leave_one_out=True)
+        else:
+            predictions = self.linear_loo(nearest_other)
+
+        return predictions, distance_other
+
+    def spatial_kfold(self, method: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Held-out predictions with locations grouped into spatial clusters.
+
+        Returns the raw predictions and each location's distance to the
+        nearest location outside its fold.
+        """
+
+        folds = KMeans(n_clusters=self.n_folds, n_init=10, random_state=42).fit_predict(self.coords)
+        predictions = np.empty_like(self.values)
+        distances = np.empty(len(self.coords))
+        for fold in range(self.n_folds):
+            test = folds == fold
+            predictions[test], _ = self.interpolator.interpolate_values(
+                self.coords[~test], self.values[~test], self.coords[test], method,
+                self.max_distance, idw_options=self.idw_options, bounded=False
+            )
+            distances[test], _ = cKDTree(self.coords[~test]).query(self.coords[test])
+        return predictions, distances
+
+    def errors(self, predictions: np.ndarray, distances: np.ndarray) -> Dict[str, Dict[str, Dict[str, float]]]:
+        """RMSE and MAE per field, raw and as mapped."""
+
+        variants = {
+            'raw': np.clip(predictions, 0, 1),
+            'mapped': self.interpolator.distance_weighted(predictions, distances, self.max_distance,
+                                                          mask=probability_mask(self.fields))
+        }
+        report = {}
+        for variant, values in variants.items():
+            residuals = values - self.values
+            report[variant] = {
+                field: {
+                    'rmse': round(float(np.sqrt(np.mean(residuals[:, j] ** 2))), 4),
+                    'mae': round(float(np.mean(np.abs(residuals[:, j]))), 4)
+                }
+                for j, field in enumerate(self.fields)
+            }
+        return report
+
+    def run_validation(self, output_file: str = "data/interpolation_validation.json") -> Dict:
+        """Validate every method and write the report."""
+
+        print("\n=== Starting Interpolation Validation ===\n")
+
+        self.load()
+
+        results = {}
+        for method in self.methods:
+            results[method] = {
+                'leave_one_out': self.errors(*self.leave_one_out(method)),
+                f'spatial_{self.n_folds}_fold': self.errors(*self.spatial_kfold(method))
+            }
+
+        for scheme in ('leave_one_out', f'spatial_{self.n_folds}_fold'):
+            print(f"\n{scheme} RMSE (MAE):")
+            print(f"  {'field':<14}" + ''.join(f"{m:>18}" for m in self.methods))
+            for field in self.fields:
+                cells = [results[m][scheme]['raw'][field] for m in self.methods]
+                print(f"  {field:<14}" + ''.join(f"{c['rmse']:>10.3f} ({c['mae']:.3f})" for c in cells))
+            for variant in ('raw', 'mapped'):
+                mean_rmse = {m: np.mean([e['rmse'] for e in results[m][scheme][variant].values()])
+                             for m in self.methods}
+                best = min(mean_rmse, key=mean_rmse.get)
+                label = 'Best mean RMSE' if variant == 'raw' else '  with distance pull (as mapped)'
+                print(f"  {label}: {best} ({mean_rmse[best]:.3f}); "
+                      + ', '.join(f"{m} {r:.3f}" for m, r in mean_rmse.items()))
+
+        output_path = Path(output_file)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        report = {
+            'locations': len(self.coords),
+            'max_distance': self.max_distance,
+            'idw': self.idw_options,
+            'methods': results
+        }
+        with open(output_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n✓ Saved {output_path}")
+
+        print("\n=== Interpolation Validation Complete ===")
+        return report
+
+
+if __name__ == "__main__":
+    import sys
+
+    # e.g. python validate_interpolation.py linear idw
+    methods = [a for a in sys.argv[1:] if a in METHODS] or METHODS
+
+    validator = InterpolationValidator(methods=methods)
+    validator.run_validation()